@@ -0,0 +1,132 @@
+import argparse
+import statistics
+import sys
+import time
+
+from PyQt5.QtCore import QCoreApplication, Qt
+
+from Models.Trello.TrelloBoardsModel import TrelloBoardsModel
+from Models.Trello.TrelloCardsModel import TrelloCardsModel, TrelloCardsModelColumns
+from Models.Trello.TrelloListsModel import TrelloListsModel
+from Tests.FakeTrelloServer import FakeTrelloServer
+from Trello.AsyncTrelloClient import AsyncTrelloClient, AsyncTrelloWrapper, TrelloRequestPool
+from Trello.TrelloRateLimiter import TrelloRateLimiter
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+from Utils.LogHelper import LogHelper
+
+
+class TrelloBenchmark(LogHelper):
+    """
+        Loads every board, list and card (including the lazily fetched fields) of a fake Trello server through the
+        Trello models, timing each phase
+        Run from the repository root: python -m Benchmarks.TrelloBenchmark --help
+    """
+    def __init__(self, app: QCoreApplication, server: FakeTrelloServer, concurrency: int, rate_limit: int,
+                 timeout: float):
+        LogHelper.__init__(self, "TrelloBenchmark")
+        self.app = app
+        self.server = server
+        self.timeout = timeout
+        self.timings = []
+        self.phases = []
+
+        TrelloRequestPool.shared().set_max_concurrency(concurrency)
+        self.session_pool = TrelloSessionPool(max_connections=concurrency,
+                                              rate_limiter=TrelloRateLimiter(max_requests=rate_limit))
+        self.session_pool.add_timing_hook(self.timings.append)
+        self.trello_client = AsyncTrelloClient()
+        self.trello_client.client = PooledTrelloClient(self.session_pool, "key", "secret", "token", "token_secret",
+                                                       api_url=server.api_url)
+
+    def wait(self, condition):
+        deadline = time.perf_counter() + self.timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("Benchmark phase timed out")
+            TrelloRequestPool.shared().thread_pool.waitForDone(1)
+            self.app.processEvents()
+
+    def run_phase(self, name: str, start, condition):
+        requests_before = self.server.stats["requests"]
+        bytes_before = self.server.stats["bytes"]
+        start_time = time.perf_counter()
+        start()
+        self.wait(condition)
+        self.phases.append((name, time.perf_counter() - start_time, self.server.stats["requests"] - requests_before,
+                            self.server.stats["bytes"] - bytes_before))
+
+    def run(self):
+        boards_model = TrelloBoardsModel(self.trello_client)
+        self.run_phase("boards", boards_model.request_boards,
+                       lambda: boards_model.rowCount() == len(self.server.boards))
+
+        lists_models = [TrelloListsModel(self.trello_client) for board in self.server.boards]
+
+        def request_lists():
+            for row, lists_model in enumerate(lists_models):
+                lists_model.set_board(boards_model.get_board(row))
+        self.run_phase("lists", request_lists,
+                       lambda: all(lists_model.rowCount() == len(self.server.lists[board["id"]])
+                                   for lists_model, board in zip(lists_models, self.server.boards)))
+
+        trello_lists = [lists_model.get_list(row) for lists_model in lists_models
+                        for row in range(lists_model.rowCount())]
+        cards_models = [TrelloCardsModel() for trello_list in trello_lists]
+
+        def request_cards():
+            for cards_model, trello_list in zip(cards_models, trello_lists):
+                cards_model.set_list(AsyncTrelloWrapper(trello_list))
+        self.run_phase("cards", request_cards,
+                       lambda: all(cards_model.rowCount() == len(self.server.cards[trello_list.id])
+                                   for cards_model, trello_list in zip(cards_models, trello_lists)))
+
+        def read_labels() -> list:
+            return [cards_model.data(cards_model.index(row, TrelloCardsModelColumns.labels), Qt.DisplayRole)
+                    for cards_model in cards_models for row in range(cards_model.rowCount())]
+        self.run_phase("lazy fields", read_labels,
+                       lambda: all(labels is not None for labels in read_labels()))
+
+    def report(self):
+        print("%-12s %10s %10s %12s" % ("phase", "time (ms)", "requests", "bytes"))
+        for name, elapsed, requests, byte_count in self.phases:
+            print("%-12s %10.1f %10i %12i" % (name, elapsed * 1000, requests, byte_count))
+
+        if len(self.timings):
+            latencies = sorted(timing.elapsed * 1000 for timing in self.timings)
+            reused = sum(1 for timing in self.timings if timing.connection_reused)
+            print("HTTP requests: %i, latency p50 %.1fms p95 %.1fms max %.1fms, connections reused %i%%" %
+                  (len(latencies), statistics.median(latencies), latencies[int(len(latencies) * 0.95)],
+                   latencies[-1], reused * 100 / len(latencies)))
+        print("Client: %s" % ", ".join("%s=%s" % item for item in self.session_pool.get_stats().items()))
+        print("Server: %s" % ", ".join("%s=%s" % item for item in sorted(self.server.stats.items())))
+
+
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the Trello client against a local fake Trello server")
+    parser.add_argument("--boards", type=int, default=2)
+    parser.add_argument("--lists", type=int, default=10, help="Lists per board")
+    parser.add_argument("--cards", type=int, default=50, help="Cards per list")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds every request takes")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a request failing with a 500")
+    parser.add_argument("--server-rate-limit", type=int, default=None,
+                        help="Requests the server accepts per 10 seconds before answering 429")
+    parser.add_argument("--rate-limit", type=int, default=100, help="Requests the client sends per 10 seconds")
+    parser.add_argument("--concurrency", type=int, default=4, help="Request pool threads")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds a phase may take")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    server = FakeTrelloServer(latency=args.latency, error_rate=args.error_rate, rate_limit=args.server_rate_limit)
+    server.scale(args.boards, args.lists, args.cards)
+    server.start()
+    try:
+        benchmark = TrelloBenchmark(app, server, args.concurrency, args.rate_limit, args.timeout)
+        benchmark.run()
+        benchmark.report()
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
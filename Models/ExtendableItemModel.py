@@ -3,8 +3,8 @@ from typing import Optional, Callable, Any
 import datetime
 from PyQt5.QtCore import Qt
 from enum import IntEnum
-from PyQt5.QtCore import QAbstractItemModel, QModelIndex
-from Utils.LogHelper import LogHelper
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, pyqtSignal
+from Utils.LogHelper import LogHelper, LogLevel
 
 
 class ItemModelDataSetType(IntEnum):
@@ -13,7 +13,7 @@ class ItemModelDataSetType(IntEnum):
     """
     Obj = 0 # Object based data set, columns reference members/properties of objects
     List = 1 # List/array base set, columns reference indices
-    ObjTree = 2 # *not yet supported / fully tested* Object tree (for tree models), columns reference members/properties
+    ObjTree = 2 # Object tree (for tree models), columns reference members/properties, children via child_nodes_name
     Dict = 3 # Dict based set, columns reference keys
 
 class ItemModelColumn:
@@ -33,9 +33,36 @@ class ItemModelColumn:
             raise IndexError("Row out of range")
         return self.data_set.src[row_no]
 
+    def get_value(self, data_source):
+        """
+            Reads the column value from a row's data source
+        """
+        if self.data_set.type in [ItemModelDataSetType.Obj, ItemModelDataSetType.ObjTree]:
+            if not hasattr(data_source, self.data_id):
+                raise KeyError("Data ID not in data source object")
+            return getattr(data_source, self.data_id)
+        elif self.data_set.type == ItemModelDataSetType.Dict:
+            if self.data_id not in data_source:
+                raise KeyError("Data ID not in data source object")
+            return data_source[self.data_id]
+        elif self.data_set.type == ItemModelDataSetType.List:
+            if self.data_id >= len(data_source):
+                raise KeyError("Data ID of data set range")
+            return data_source[self.data_id]
+        else:
+            raise Exception("Unhandled data source type")
+
     def __repr__(self):
         return "ItemModelColumn(%i:%s %s:%s %s)" % (self.column_no, self.display_name, self.data_set, self.data_id, "Formatted" if self.formatter is not None else "")
 
+class ItemModelTreeLink:
+    """
+        Cached position of a tree node, allows parent/row lookups without searching the tree
+    """
+    def __init__(self, parent_node, row: int):
+        self.parent_node = parent_node
+        self.row = row
+
 class ItemModelDataSet:
     """
         Provides information about a data set
@@ -47,6 +74,44 @@ class ItemModelDataSet:
         self.type = None
         self.managed = False
         self.id = None
+        self.tree_links = dict()
+
+    def get_child_nodes(self, node) -> list:
+        """
+            Child list of a tree node, the root list (src) when node is None
+        """
+        if node is None:
+            return self.src
+        return getattr(node, self.child_nodes_name)
+
+    def link_nodes(self, parent_node, first_row: int=0):
+        """
+            (Re)builds the cached links of the children of parent_node from first_row onwards, including subtrees
+            of nodes that are not linked yet
+        """
+        child_nodes = self.get_child_nodes(parent_node)
+        for row in range(first_row, len(child_nodes)):
+            node = child_nodes[row]
+            link = self.tree_links.get(id(node))
+            if link is None:
+                self.tree_links[id(node)] = ItemModelTreeLink(parent_node, row)
+                self.link_nodes(node)
+            else:
+                link.parent_node = parent_node
+                link.row = row
+
+    def unlink_nodes(self, nodes: list):
+        """
+            Drops the cached links of nodes and their subtrees
+        """
+        for node in nodes:
+            if self.tree_links.pop(id(node), None) is not None:
+                self.unlink_nodes(self.get_child_nodes(node))
+
+    def get_link(self, node) -> ItemModelTreeLink:
+        if id(node) not in self.tree_links:
+            raise KeyError("Node not in tree")
+        return self.tree_links[id(node)]
 
     def __repr__(self):
         return "ItemModelDataSet(%s %s %s Data: %s)"  % (self.id, self.type, "Managed" if self.managed else "", hex(id(self.src)))
@@ -60,11 +125,14 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
         sets when rows are added and removing items from those sets when rows are removed.
 
     """
+    update_applied = pyqtSignal(name="updateApplied")
+
     def __init__(self, parent=None, name: str = "ExtendableItemModel"):
         QAbstractItemModel.__init__(self, parent)
         LogHelper.__init__(self, name)
         self.column_definitions = dict()
         self.data_sets = list()
+        self.tree_data_set = None
         self.previous_values = dict()
 
     def __reset_previous_values_for_row(self, row):
@@ -88,7 +156,8 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
         self.previous_values.get(index.row(), dict()).pop(index.column())
 
 
-    def add_data_set(self, str_id: str, data_set: list, ds_type: ItemModelDataSetType=ItemModelDataSetType.Obj, managed: bool=False):
+    def add_data_set(self, str_id: str, data_set: list, ds_type: ItemModelDataSetType=ItemModelDataSetType.Obj, managed: bool=False,
+                     child_nodes_name: str=None):
         """
             Register a data set with the model (for use with added columns)
 
@@ -96,15 +165,27 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
         :param data_set: Reference to set
         :param ds_type: Type of data set, see ItemModelDataSetType
         :param managed: Whether to manage the data set when rows are removed/added, and when cells are modified
+        :param child_nodes_name: Name of the member holding the child node list (ObjTree DS only)
         :return: Internal data set information
         """
+        if ds_type == ItemModelDataSetType.ObjTree:
+            if child_nodes_name is None:
+                raise KeyError("Tree data sets require a child nodes member")
+            if self.tree_data_set is not None:
+                raise KeyError("Tree data set already registered")
 
         ds = ItemModelDataSet()
         ds.id = str_id
         ds.src = data_set
         ds.type = ds_type
         ds.managed = managed
+        ds.child_nodes_name = child_nodes_name
         self.data_sets.append(ds)
+
+        if ds_type == ItemModelDataSetType.ObjTree:
+            ds.link_nodes(None)
+            self.tree_data_set = ds
+
         self.log_extra_debug("Added DS:", repr(self.data_sets[-1]))
         return ds
 
@@ -138,7 +219,7 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
         :param enum_class: Class of enum
         :param data_set: Target data set
         """
-        assert(data_set.type in [ItemModelDataSetType.Obj, ItemModelDataSetType.Dict])
+        assert(data_set.type in [ItemModelDataSetType.Obj, ItemModelDataSetType.ObjTree, ItemModelDataSetType.Dict])
         for col in enum_class:
             self.add_column(col.value, col.name, data_set, col.name)
 
@@ -152,11 +233,41 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
 
     def index(self, row: int, column: int, parent=None, *args, **kwargs):
         if 0 <= row < self.rowCount(parent) and 0 <= column < self.columnCount(parent):
+            if self.tree_data_set is not None:
+                child_nodes = self.tree_data_set.get_child_nodes(self.get_node(parent))
+                return self.createIndex(row, column, child_nodes[row])
             return self.createIndex(row, column, None)
         else:
             self.log_warning("Invalid index requested")
             return QModelIndex()
 
+    def parent(self, index: QModelIndex=None):
+        if index is None:
+            # QObject::parent()
+            return QAbstractItemModel.parent(self)
+
+        if self.tree_data_set is None or not index.isValid():
+            return QModelIndex()
+
+        parent_node = self.tree_data_set.get_link(index.internalPointer()).parent_node
+        if parent_node is None:
+            return QModelIndex()
+        return self.createIndex(self.tree_data_set.get_link(parent_node).row, 0, parent_node)
+
+    @staticmethod
+    def get_node(index: QModelIndex):
+        """
+            Tree node referenced by an index, None for the (invisible) root
+        """
+        if index is None or not index.isValid():
+            return None
+        return index.internalPointer()
+
+    def index_from_node(self, node, column: int=0) -> QModelIndex:
+        if node is None:
+            return QModelIndex()
+        return self.createIndex(self.tree_data_set.get_link(node).row, column, node)
+
     @staticmethod
     def validate_index(index: QModelIndex) -> None:
         if not index.isValid():
@@ -167,27 +278,27 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
             raise KeyError("Unregistered column")
         return self.column_definitions[column_no]
 
+    def has_index_data_source(self, col_def: ItemModelColumn, index: QModelIndex) -> bool:
+        """
+            Flat data sets only have top level rows, their columns are empty for the child rows of a tree
+        """
+        return col_def.data_set.type == ItemModelDataSetType.ObjTree or self.tree_data_set is None or \
+            self.tree_data_set.get_link(index.internalPointer()).parent_node is None
+
+    def get_index_data_source(self, col_def: ItemModelColumn, index: QModelIndex):
+        if not self.has_index_data_source(col_def, index):
+            raise KeyError("Data set has no child rows")
+
+        if col_def.data_set.type == ItemModelDataSetType.ObjTree:
+            return index.internalPointer()
+        return col_def.get_data_source(index.row())
+
     def get_data_set_column_value(self, index: QModelIndex, format: bool=False):
         self.validate_index(index)
         col_def = self.get_column_definition(index.column())
-        data_source = col_def.get_data_source(index.row())
+        data_source = self.get_index_data_source(col_def, index)
 
-        data = None
-
-        if col_def.data_set.type in [ItemModelDataSetType.Obj, ItemModelDataSetType.ObjTree]:
-            if not hasattr(data_source, col_def.data_id):
-                raise KeyError("Data ID not in data source object")
-            data = getattr(data_source, col_def.data_id)
-        elif col_def.data_set.type == ItemModelDataSetType.Dict:
-            if col_def.data_id not in data_source:
-                raise KeyError("Data ID not in data source object")
-            data = data_source[col_def.data_id]
-        elif col_def.data_set.type == ItemModelDataSetType.List:
-            if col_def.data_id >= len(data_source):
-                raise KeyError("Data ID of data set range")
-            data = data_source[col_def.data_id]
-        else:
-            raise Exception("Unhandled data source type")
+        data = col_def.get_value(data_source)
 
         """ self.log_extra_debug("Got managed data",
                              index=index,
@@ -204,7 +315,7 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
     def set_data_set_column_value(self, index: QModelIndex, value):
         self.validate_index(index)
         col_def = self.get_column_definition(index.column())
-        data_source = col_def.get_data_source(index.row())
+        data_source = self.get_index_data_source(col_def, index)
 
         if col_def.data_set.type in [ItemModelDataSetType.Obj, ItemModelDataSetType.ObjTree]:
             if not hasattr(data_source, col_def.data_id):
@@ -231,17 +342,21 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
             raise Exception("Unhandled data source type")
 
         if changed:
-            self.log_extra_debug("Set managed data", index="%i,%i" % (index.row(), index.column()),
-                                                     data_id=col_def.data_id,
-                                                     column=col_def.display_name,
-                                                     value=value,
-                                                     previous_value=previous_value)
+            if self.is_log_enabled(LogLevel.ExtraDebug):
+                self.log_extra_debug("Set managed data", index="%i,%i" % (index.row(), index.column()),
+                                                         data_id=col_def.data_id,
+                                                         column=col_def.display_name,
+                                                         value=value,
+                                                         previous_value=previous_value)
 
             self.setData(index, previous_value, ItemModelRoles.PreviousValue)
             self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
 
     def data(self, index: QModelIndex, role=Qt.DisplayRole):
         if role in [Qt.DisplayRole, Qt.EditRole]:
+            self.validate_index(index)
+            if not self.has_index_data_source(self.get_column_definition(index.column()), index):
+                return None
             return self.get_data_set_column_value(index, role == Qt.DisplayRole)
         elif role == ItemModelRoles.PreviousValue:
             return self.get_previous_value(index)
@@ -268,6 +383,11 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
         return len(self.column_definitions)
 
     def rowCount(self, parent=None, *args, **kwargs):
+        if parent is not None and parent.isValid():
+            # Only the first column has children, as parent() always refers to it
+            if self.tree_data_set is not None and parent.column() == 0:
+                return len(self.tree_data_set.get_child_nodes(parent.internalPointer()))
+            return 0
         if len(self.data_sets):
             return len(self.data_sets[0].src)
         if len(self.column_definitions):
@@ -280,26 +400,41 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
         elif data_set.type in [ItemModelDataSetType.Obj, ItemModelDataSetType.ObjTree]:
             return None
 
+    def construct_data_sources(self, data_set: ItemModelDataSet, pos: int, count: int) -> list:
+        """
+            Constructs the data sources of count rows inserted at pos
+            Override for batch construction, defaults to construct_data_source per row
+        """
+        return [self.construct_data_source(data_set, i) for i in range(pos, pos+count)]
+
     def insert_managed_rows(self, pos, count):
         rows_inserted = False
         for data_set in self.data_sets:
-            if data_set.managed:
-                for i in range(pos, pos+count):
-                    row_data = self.construct_data_source(data_set, i)
-                    data_set.src.insert(i, row_data)
-                    rows_inserted = True
+            if data_set.managed and data_set.type != ItemModelDataSetType.ObjTree:
+                data_set.src[pos:pos] = self.construct_data_sources(data_set, pos, count)
+                rows_inserted = True
 
-        if rows_inserted:
+        if rows_inserted and self.is_log_enabled(LogLevel.ExtraDebug):
             for i in range(pos, pos+count):
                 row_data = dict()
                 for col in self.column_definitions.values():
-                    row_data[col.display_name] = str(self.get_data_set_column_value(self.index(pos, col.column_no)))
+                    row_data[col.display_name] = str(self.get_data_set_column_value(self.index(i, col.column_no)))
 
 
                 self.log_extra_debug("Inserted managed row data",
                                      **row_data)
 
     def insertRows(self, pos, count, parent=None, *args, **kwargs):
+        if parent is None:
+            parent = QModelIndex()
+
+        if self.tree_data_set is not None and self.tree_data_set.managed:
+            nodes = self.construct_data_sources(self.tree_data_set, pos, count)
+            return self.insert_nodes(pos, nodes, parent)
+
+        if parent.isValid():
+            return False
+
         self.beginInsertRows(parent, pos, pos+count-1)
         for i in range(pos, pos+count):
             self.__reset_previous_values_for_row(i)
@@ -309,12 +444,230 @@ class ExtendableItemModel(QAbstractItemModel, LogHelper):
 
     def remove_managed_rows(self, pos, count):
         for data_set in self.data_sets:
-            if data_set.managed:
-                for i in range(pos, pos+count):
-                    del data_set.src[pos]
+            if data_set.managed and data_set.type != ItemModelDataSetType.ObjTree:
+                del data_set.src[pos:pos+count]
 
     def removeRows(self, pos, count, parent=None, *args, **kwargs):
+        if parent is None:
+            parent = QModelIndex()
+
+        if self.tree_data_set is not None and self.tree_data_set.managed:
+            self.remove_nodes(pos, count, parent)
+            return True
+
+        if parent.isValid():
+            return False
+
         self.beginRemoveRows(parent, pos, pos+count-1)
         self.remove_managed_rows(pos, count)
         self.endRemoveRows()
-        return True
\ No newline at end of file
+        return True
+
+    def insert_nodes(self, pos: int, nodes: list, parent: QModelIndex=None) -> bool:
+        """
+            Inserts complete subtrees under parent in a single row insertion
+            Managed row aligned data sets are extended when inserting top level nodes
+        :param pos: Row to insert at (relative to parent)
+        :param nodes: Nodes to insert, their children are inserted with them
+        :param parent: Parent index, invalid for top level nodes
+        """
+        if self.tree_data_set is None:
+            raise KeyError("No tree data set registered")
+        if parent is None:
+            parent = QModelIndex()
+        if len(nodes) == 0:
+            return False
+
+        parent_node = self.get_node(parent)
+        child_nodes = self.tree_data_set.get_child_nodes(parent_node)
+
+        self.beginInsertRows(parent, pos, pos+len(nodes)-1)
+        child_nodes[pos:pos] = nodes
+        self.tree_data_set.link_nodes(parent_node, pos)
+        if parent_node is None:
+            for i in range(pos, pos+len(nodes)):
+                self.__reset_previous_values_for_row(i)
+            self.insert_managed_rows(pos, len(nodes))
+        self.endInsertRows()
+        return True
+
+    def remove_nodes(self, pos: int, count: int, parent: QModelIndex=None) -> list:
+        """
+            Removes nodes (and their subtrees) from under parent in a single row removal
+        :return: The removed nodes
+        """
+        if self.tree_data_set is None:
+            raise KeyError("No tree data set registered")
+        if parent is None:
+            parent = QModelIndex()
+
+        parent_node = self.get_node(parent)
+        child_nodes = self.tree_data_set.get_child_nodes(parent_node)
+        removed_nodes = child_nodes[pos:pos+count]
+        if pos < 0 or not len(removed_nodes):
+            return []
+        # Clamped to the nodes there are
+        count = len(removed_nodes)
+
+        self.beginRemoveRows(parent, pos, pos+count-1)
+        del child_nodes[pos:pos+count]
+        self.tree_data_set.unlink_nodes(removed_nodes)
+        self.tree_data_set.link_nodes(parent_node, pos)
+        if parent_node is None:
+            self.remove_managed_rows(pos, count)
+        self.endRemoveRows()
+        return removed_nodes
+
+    @staticmethod
+    def __stable_positions(positions: list) -> set:
+        """
+            Indices into positions forming its longest increasing subsequence, ie. the rows that can keep their
+            relative order
+        """
+        tails = []
+        tail_indices = []
+        predecessors = [None]*len(positions)
+        for i, position in enumerate(positions):
+            lo, hi = 0, len(tails)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if tails[mid] < position:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            predecessors[i] = tail_indices[lo-1] if lo > 0 else None
+            if lo == len(tails):
+                tails.append(position)
+                tail_indices.append(i)
+            else:
+                tails[lo] = position
+                tail_indices[lo] = i
+
+        stable = set()
+        i = tail_indices[-1] if len(tail_indices) else None
+        while i is not None:
+            stable.add(i)
+            i = predecessors[i]
+        return stable
+
+    def apply_keyed_update(self, new_items: list, key: Callable[[Any], Any], data_set: ItemModelDataSet = None,
+                           columns: list = None):
+        """
+            Replaces the contents of an unmanaged data set using row level signals instead of a model reset
+            Rows are matched by key: unmatched rows are removed/inserted, matched rows are moved into the new order
+            (the fewest moves possible) and replaced, emitting dataChanged where their column values differ
+        :param new_items: New contents of the data set
+        :param key: Returns the identity of an item
+        :param data_set: Data set to update, defaults to the first registered data set
+        :param columns: Column numbers compared for changes, defaults to all columns of the data set
+        """
+        if data_set is None:
+            data_set = self.data_sets[0]
+        if data_set.managed or data_set.type == ItemModelDataSetType.ObjTree:
+            raise KeyError("Keyed updates require an unmanaged flat data set")
+
+        src = data_set.src
+        aligned_sets = [ds.src for ds in self.data_sets if ds.managed and ds.type != ItemModelDataSetType.ObjTree]
+
+        new_keys = [key(item) for item in new_items]
+        new_positions = {item_key: i for i, item_key in enumerate(new_keys)}
+        if len(new_positions) != len(new_keys):
+            raise KeyError("Duplicate keys in update")
+        current_keys = [key(item) for item in src]
+
+        if len(current_keys) and len(new_keys) and not any(item_key in new_positions for item_key in current_keys):
+            # Nothing survives, a reset is cheaper than removing and inserting every row
+            self.beginResetModel()
+            self.remove_managed_rows(0, len(src))
+            src[:] = new_items
+            self.insert_managed_rows(0, len(src))
+            self.endResetModel()
+            self.log_debug("Keyed update reset model", rows=len(src))
+            self.update_applied.emit()
+            return
+
+        # Removals, contiguous runs from the bottom up
+        removed_rows = [row for row, item_key in enumerate(current_keys) if item_key not in new_positions]
+        removals = 0
+        while len(removed_rows):
+            last = removed_rows.pop()
+            first = last
+            while len(removed_rows) and removed_rows[-1] == first - 1:
+                first = removed_rows.pop()
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del src[first:last+1]
+            del current_keys[first:last+1]
+            self.remove_managed_rows(first, last-first+1)
+            self.endRemoveRows()
+            removals += 1
+
+        # Moves, rows outside the longest run already in order are moved after their new predecessor
+        stable_rows = self.__stable_positions([new_positions[item_key] for item_key in current_keys])
+        stable_keys = set(current_keys[row] for row in stable_rows)
+        current_key_set = set(current_keys)
+        surviving_keys = [item_key for item_key in new_keys if item_key in current_key_set]
+        # Current row of each key, kept up to date while moving
+        key_rows = {item_key: row for row, item_key in enumerate(current_keys)}
+        moves = 0
+        for i, item_key in enumerate(surviving_keys):
+            if item_key in stable_keys:
+                continue
+            row = key_rows[item_key]
+            destination = key_rows[surviving_keys[i-1]] + 1 if i > 0 else 0
+            if row == destination:
+                continue
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+            insert_row = destination if destination < row else destination - 1
+            for rows in [src, current_keys] + aligned_sets:
+                rows.insert(insert_row, rows.pop(row))
+            for shifted_row in range(min(row, insert_row), max(row, insert_row) + 1):
+                key_rows[current_keys[shifted_row]] = shifted_row
+            self.endMoveRows()
+            moves += 1
+
+        # Insertions, contiguous runs from the top down
+        inserted_rows = [row for row, item_key in enumerate(new_keys) if item_key not in current_key_set]
+        insertions = 0
+        while len(inserted_rows):
+            first = inserted_rows.pop(0)
+            last = first
+            while len(inserted_rows) and inserted_rows[0] == last + 1:
+                last = inserted_rows.pop(0)
+            self.beginInsertRows(QModelIndex(), first, last)
+            src[first:first] = new_items[first:last+1]
+            self.insert_managed_rows(first, last-first+1)
+            self.endInsertRows()
+            insertions += 1
+
+        # Replace surviving items, signalling the changed cells
+        if columns is None:
+            columns = [col.column_no for col in self.column_definitions.values() if col.data_set is data_set]
+        column_definitions = [self.get_column_definition(column_no) for column_no in columns]
+        changed_rows = 0
+        for row, item_key in enumerate(new_keys):
+            if item_key not in current_key_set:
+                continue
+            previous_item = src[row]
+            item = new_items[row]
+            src[row] = item
+
+            changed_columns = []
+            for col_def in column_definitions:
+                try:
+                    changed = col_def.get_value(previous_item) != col_def.get_value(item)
+                except KeyError:
+                    changed = False
+                if changed:
+                    changed_columns.append(col_def.column_no)
+
+            if len(changed_columns):
+                self.dataChanged.emit(self.index(row, min(changed_columns)), self.index(row, max(changed_columns)),
+                                      [Qt.DisplayRole, Qt.EditRole])
+                changed_rows += 1
+
+        self.log_debug("Keyed update applied",
+                       removals=removals,
+                       moves=moves,
+                       insertions=insertions,
+                       changed_rows=changed_rows)
+        self.update_applied.emit()
@@ -0,0 +1,303 @@
+from functools import cmp_to_key
+from typing import Callable, Any
+
+from PyQt5.QtCore import QAbstractProxyModel, QModelIndex, Qt
+
+from Models.ExtendableItemModel import ExtendableItemModel
+from Utils.LogHelper import LogHelper
+
+
+class ExtendableSortFilterProxyModel(QAbstractProxyModel, LogHelper):
+    """
+        Sort/filter proxy for (flat) extendable item models
+        Sort keys and filter values are read straight from the source column definitions rather than through data(),
+        the sorted row mapping is maintained incrementally as source rows are inserted, removed or changed
+
+    """
+    def __init__(self, parent=None, name: str = "ExtendableSortFilterProxyModel"):
+        QAbstractProxyModel.__init__(self, parent)
+        LogHelper.__init__(self, name)
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.column_filters = dict()
+        self.sort_keys = []
+        self.proxy_rows = []
+        self.source_rows = None
+
+    def setSourceModel(self, model: ExtendableItemModel):
+        previous_model = self.sourceModel()
+        if previous_model is not None:
+            previous_model.rowsInserted.disconnect(self.on_source_rows_inserted)
+            previous_model.rowsAboutToBeRemoved.disconnect(self.on_source_rows_about_to_be_removed)
+            previous_model.rowsRemoved.disconnect(self.on_source_rows_removed)
+            previous_model.rowsMoved.disconnect(self.on_source_rows_moved)
+            previous_model.dataChanged.disconnect(self.on_source_data_changed)
+            previous_model.modelReset.disconnect(self.invalidate)
+            previous_model.layoutChanged.disconnect(self.invalidate)
+
+        self.beginResetModel()
+        QAbstractProxyModel.setSourceModel(self, model)
+        model.rowsInserted.connect(self.on_source_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self.on_source_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self.on_source_rows_removed)
+        model.rowsMoved.connect(self.on_source_rows_moved)
+        model.dataChanged.connect(self.on_source_data_changed)
+        model.modelReset.connect(self.invalidate)
+        model.layoutChanged.connect(self.invalidate)
+        self.__build()
+        self.endResetModel()
+
+    # Sorting / filtering
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        self.sort_keys = [self.__read_sort_key(row) for row in range(self.sourceModel().rowCount())]
+        self.__relayout()
+
+    def set_column_filter(self, column_no: int, predicate: Callable[[Any], bool]=None):
+        """
+            Filters rows by a column value, rows are accepted when every column predicate accepts them
+        :param column_no: Source column number
+        :param predicate: Called with the (unformatted) column value, None removes the filter
+        """
+        if predicate is None:
+            self.column_filters.pop(column_no, None)
+        else:
+            self.column_filters[column_no] = predicate
+        self.invalidate()
+
+    def filter_accepts_row(self, source_row: int) -> bool:
+        for column_no, predicate in self.column_filters.items():
+            if not predicate(self.__read_value(source_row, column_no)):
+                return False
+        return True
+
+    def invalidate(self):
+        self.beginResetModel()
+        self.__build()
+        self.endResetModel()
+
+    def __read_value(self, source_row: int, column_no: int):
+        col_def = self.sourceModel().get_column_definition(column_no)
+        try:
+            return col_def.get_value(col_def.get_data_source(source_row))
+        except KeyError:
+            return None
+
+    def __read_sort_key(self, source_row: int):
+        if self.sort_column < 0:
+            return None
+        value = self.__read_value(source_row, self.sort_column)
+        return value is None, value
+
+    def __less(self, source_row_a: int, source_row_b: int) -> bool:
+        key_a = self.sort_keys[source_row_a]
+        key_b = self.sort_keys[source_row_b]
+        if key_a != key_b:
+            try:
+                less = key_a < key_b
+            except TypeError:
+                less = str(key_a) < str(key_b)
+            return less if self.sort_order == Qt.AscendingOrder else not less
+        return source_row_a < source_row_b
+
+    def __find_proxy_row(self, source_row: int) -> int:
+        """
+            Binary searches the position source_row sorts at
+        """
+        lo, hi = 0, len(self.proxy_rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.__less(self.proxy_rows[mid], source_row):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __compare(self, source_row_a: int, source_row_b: int) -> int:
+        if self.__less(source_row_a, source_row_b):
+            return -1
+        return 1 if self.__less(source_row_b, source_row_a) else 0
+
+    def __sort_proxy_rows(self):
+        self.proxy_rows.sort(key=cmp_to_key(self.__compare))
+        self.source_rows = None
+
+    def __build(self):
+        model = self.sourceModel()
+        row_count = model.rowCount() if model is not None else 0
+        self.sort_keys = [self.__read_sort_key(row) for row in range(row_count)]
+        self.proxy_rows = [row for row in range(row_count) if self.filter_accepts_row(row)]
+        self.__sort_proxy_rows()
+
+    def __relayout(self):
+        self.layoutAboutToBeChanged.emit()
+        persistent_indexes = self.persistentIndexList()
+        persistent_source_rows = [self.proxy_rows[index.row()] for index in persistent_indexes]
+
+        self.__sort_proxy_rows()
+
+        source_map = self.__get_source_rows()
+        self.changePersistentIndexList(persistent_indexes,
+                                       [self.createIndex(source_map[source_row], index.column())
+                                        for index, source_row in zip(persistent_indexes, persistent_source_rows)])
+        self.layoutChanged.emit()
+
+    def __get_source_rows(self) -> dict:
+        if self.source_rows is None:
+            self.source_rows = {source_row: proxy_row for proxy_row, source_row in enumerate(self.proxy_rows)}
+        return self.source_rows
+
+    # Source model changes
+    def on_source_rows_inserted(self, parent: QModelIndex, first: int, last: int):
+        if parent.isValid():
+            return
+        count = last - first + 1
+        self.proxy_rows = [source_row + count if source_row >= first else source_row for source_row in self.proxy_rows]
+        self.sort_keys[first:first] = [self.__read_sort_key(row) for row in range(first, last+1)]
+        self.source_rows = None
+
+        for source_row in range(first, last+1):
+            if self.filter_accepts_row(source_row):
+                proxy_row = self.__find_proxy_row(source_row)
+                self.beginInsertRows(QModelIndex(), proxy_row, proxy_row)
+                self.proxy_rows.insert(proxy_row, source_row)
+                self.source_rows = None
+                self.endInsertRows()
+
+    def on_source_rows_about_to_be_removed(self, parent: QModelIndex, first: int, last: int):
+        if parent.isValid():
+            return
+        removed_proxy_rows = sorted(proxy_row for proxy_row, source_row in enumerate(self.proxy_rows)
+                                    if first <= source_row <= last)
+        while len(removed_proxy_rows):
+            last_proxy_row = removed_proxy_rows.pop()
+            first_proxy_row = last_proxy_row
+            while len(removed_proxy_rows) and removed_proxy_rows[-1] == first_proxy_row - 1:
+                first_proxy_row = removed_proxy_rows.pop()
+            self.beginRemoveRows(QModelIndex(), first_proxy_row, last_proxy_row)
+            del self.proxy_rows[first_proxy_row:last_proxy_row+1]
+            self.source_rows = None
+            self.endRemoveRows()
+
+    def on_source_rows_removed(self, parent: QModelIndex, first: int, last: int):
+        if parent.isValid():
+            return
+        count = last - first + 1
+        self.proxy_rows = [source_row - count if source_row > last else source_row for source_row in self.proxy_rows]
+        del self.sort_keys[first:last+1]
+        self.source_rows = None
+
+    def on_source_rows_moved(self, parent: QModelIndex, start: int, end: int, destination: QModelIndex, row: int):
+        count = end - start + 1
+        insert_row = row if row < start else row - count
+
+        def moved_row(source_row: int) -> int:
+            if start <= source_row <= end:
+                return insert_row + source_row - start
+            if source_row > end:
+                source_row -= count
+            if source_row >= insert_row:
+                source_row += count
+            return source_row
+
+        moved_keys = self.sort_keys[start:end+1]
+        del self.sort_keys[start:end+1]
+        self.sort_keys[insert_row:insert_row] = moved_keys
+
+        self.layoutAboutToBeChanged.emit()
+        persistent_indexes = self.persistentIndexList()
+        persistent_source_rows = [moved_row(self.proxy_rows[index.row()]) for index in persistent_indexes]
+        self.proxy_rows = [moved_row(source_row) for source_row in self.proxy_rows]
+        self.__sort_proxy_rows()
+        source_map = self.__get_source_rows()
+        self.changePersistentIndexList(persistent_indexes,
+                                       [self.createIndex(source_map[source_row], index.column())
+                                        for index, source_row in zip(persistent_indexes, persistent_source_rows)])
+        self.layoutChanged.emit()
+
+    def on_source_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=None):
+        if top_left.parent().isValid():
+            return
+
+        content_changed = roles is None or len(roles) == 0 or Qt.EditRole in roles or Qt.DisplayRole in roles
+        left = top_left.column()
+        right = bottom_right.column()
+        sort_changed = content_changed and left <= self.sort_column <= right
+        filter_changed = content_changed and any(left <= column_no <= right for column_no in self.column_filters)
+
+        for source_row in range(top_left.row(), bottom_right.row()+1):
+            if sort_changed:
+                self.sort_keys[source_row] = self.__read_sort_key(source_row)
+
+            proxy_row = self.__get_source_rows().get(source_row)
+            accepted = self.filter_accepts_row(source_row) if filter_changed else proxy_row is not None
+
+            if proxy_row is None:
+                if accepted:
+                    proxy_row = self.__find_proxy_row(source_row)
+                    self.beginInsertRows(QModelIndex(), proxy_row, proxy_row)
+                    self.proxy_rows.insert(proxy_row, source_row)
+                    self.source_rows = None
+                    self.endInsertRows()
+                continue
+
+            if not accepted:
+                self.beginRemoveRows(QModelIndex(), proxy_row, proxy_row)
+                del self.proxy_rows[proxy_row]
+                self.source_rows = None
+                self.endRemoveRows()
+                continue
+
+            if sort_changed:
+                del self.proxy_rows[proxy_row]
+                new_proxy_row = self.__find_proxy_row(source_row)
+                self.proxy_rows.insert(proxy_row, source_row)
+                if new_proxy_row != proxy_row:
+                    destination = new_proxy_row if new_proxy_row < proxy_row else new_proxy_row + 1
+                    self.beginMoveRows(QModelIndex(), proxy_row, proxy_row, QModelIndex(), destination)
+                    del self.proxy_rows[proxy_row]
+                    self.proxy_rows.insert(new_proxy_row, source_row)
+                    self.source_rows = None
+                    self.endMoveRows()
+                    proxy_row = new_proxy_row
+
+            if roles is None:
+                roles = []
+            self.dataChanged.emit(self.index(proxy_row, left), self.index(proxy_row, right), roles)
+
+    # Proxy mapping
+    def mapToSource(self, proxy_index: QModelIndex) -> QModelIndex:
+        if not proxy_index.isValid() or proxy_index.row() >= len(self.proxy_rows):
+            return QModelIndex()
+        return self.sourceModel().index(self.proxy_rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index: QModelIndex) -> QModelIndex:
+        if not source_index.isValid():
+            return QModelIndex()
+        proxy_row = self.__get_source_rows().get(source_index.row())
+        if proxy_row is None:
+            return QModelIndex()
+        return self.createIndex(proxy_row, source_index.column())
+
+    def index(self, row: int, column: int, parent=None, *args, **kwargs):
+        if (parent is None or not parent.isValid()) and 0 <= row < len(self.proxy_rows) \
+                and 0 <= column < self.columnCount():
+            return self.createIndex(row, column)
+        return QModelIndex()
+
+    def parent(self, index: QModelIndex=None):
+        if index is None:
+            # QObject::parent()
+            return QAbstractProxyModel.parent(self)
+        return QModelIndex()
+
+    def rowCount(self, parent=None, *args, **kwargs):
+        if parent is not None and parent.isValid():
+            return 0
+        return len(self.proxy_rows)
+
+    def columnCount(self, parent=None, *args, **kwargs):
+        if self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
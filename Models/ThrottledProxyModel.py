@@ -0,0 +1,150 @@
+from PyQt5.QtCore import QAbstractProxyModel, QModelIndex, QTimer
+
+from Models.ExtendableItemModel import ExtendableItemModel
+from Utils.LogHelper import LogHelper
+
+
+class ThrottledProxyModel(QAbstractProxyModel, LogHelper):
+    """
+        Pass-through proxy for (flat) extendable item models that coalesces dataChanged signals
+        Changed cells are merged into one bounding range and forwarded at most once per interval, structural changes are
+        forwarded immediately (after any pending changes) so views never see an inconsistent row count
+
+    """
+    def __init__(self, parent=None, interval_ms: int = 16, name: str = "ThrottledProxyModel"):
+        QAbstractProxyModel.__init__(self, parent)
+        LogHelper.__init__(self, name)
+
+        self.pending_range = None
+        self.pending_roles = set()
+        self.coalesced_signals = 0
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(interval_ms)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def set_interval(self, interval_ms: int):
+        self.flush_timer.setInterval(interval_ms)
+
+    def setSourceModel(self, model: ExtendableItemModel):
+        previous_model = self.sourceModel()
+        if previous_model is not None:
+            for signal, slot in self.__source_connections(previous_model):
+                signal.disconnect(slot)
+
+        self.beginResetModel()
+        self.pending_range = None
+        QAbstractProxyModel.setSourceModel(self, model)
+        for signal, slot in self.__source_connections(model):
+            signal.connect(slot)
+        self.endResetModel()
+
+    def __source_connections(self, model: ExtendableItemModel) -> list:
+        return [(model.dataChanged, self.on_source_data_changed),
+                (model.headerDataChanged, self.headerDataChanged),
+                (model.rowsAboutToBeInserted, self.on_source_rows_about_to_be_inserted),
+                (model.rowsInserted, self.endInsertRows),
+                (model.rowsAboutToBeRemoved, self.on_source_rows_about_to_be_removed),
+                (model.rowsRemoved, self.endRemoveRows),
+                (model.rowsAboutToBeMoved, self.on_source_rows_about_to_be_moved),
+                (model.rowsMoved, self.endMoveRows),
+                (model.modelAboutToBeReset, self.on_source_about_to_be_reset),
+                (model.modelReset, self.endResetModel),
+                (model.layoutAboutToBeChanged, self.on_source_about_to_be_reset),
+                (model.layoutChanged, self.endResetModel),
+                (model.columnsAboutToBeInserted, self.on_source_about_to_be_reset),
+                (model.columnsInserted, self.endResetModel),
+                (model.columnsAboutToBeRemoved, self.on_source_about_to_be_reset),
+                (model.columnsRemoved, self.endResetModel)]
+
+    def flush(self):
+        """
+            Forwards the merged pending changes
+        """
+        self.flush_timer.stop()
+        if self.pending_range is None:
+            return
+
+        top, left, bottom, right = self.pending_range
+        roles = list(self.pending_roles) if self.pending_roles is not None else []
+        self.pending_range = None
+        self.pending_roles = set()
+
+        self.log_extra_debug("Flushing changes", top=top, left=left, bottom=bottom, right=right,
+                             coalesced_signals=self.coalesced_signals)
+        self.coalesced_signals = 0
+        self.dataChanged.emit(self.index(top, left), self.index(bottom, right), roles)
+
+    # Source model changes
+    def on_source_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=None):
+        if top_left.parent().isValid():
+            return
+
+        if self.pending_range is None:
+            self.pending_range = (top_left.row(), top_left.column(), bottom_right.row(), bottom_right.column())
+        else:
+            top, left, bottom, right = self.pending_range
+            self.pending_range = (min(top, top_left.row()), min(left, top_left.column()),
+                                  max(bottom, bottom_right.row()), max(right, bottom_right.column()))
+
+        # No roles means every role changed
+        if roles is None or len(roles) == 0:
+            self.pending_roles = None
+        elif self.pending_roles is not None:
+            self.pending_roles.update(roles)
+
+        self.coalesced_signals += 1
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def on_source_rows_about_to_be_inserted(self, parent: QModelIndex, first: int, last: int):
+        self.flush()
+        self.beginInsertRows(QModelIndex(), first, last)
+
+    def on_source_rows_about_to_be_removed(self, parent: QModelIndex, first: int, last: int):
+        self.flush()
+        self.beginRemoveRows(QModelIndex(), first, last)
+
+    def on_source_rows_about_to_be_moved(self, parent: QModelIndex, start: int, end: int, destination: QModelIndex,
+                                         row: int):
+        self.flush()
+        self.beginMoveRows(QModelIndex(), start, end, QModelIndex(), row)
+
+    def on_source_about_to_be_reset(self):
+        self.flush_timer.stop()
+        self.pending_range = None
+        self.pending_roles = set()
+        self.beginResetModel()
+
+    # Proxy mapping
+    def mapToSource(self, proxy_index: QModelIndex) -> QModelIndex:
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(proxy_index.row(), proxy_index.column())
+
+    def mapFromSource(self, source_index: QModelIndex) -> QModelIndex:
+        if not source_index.isValid():
+            return QModelIndex()
+        return self.createIndex(source_index.row(), source_index.column())
+
+    def index(self, row: int, column: int, parent=None, *args, **kwargs):
+        if (parent is None or not parent.isValid()) and 0 <= row < self.rowCount() and 0 <= column < self.columnCount():
+            return self.createIndex(row, column)
+        return QModelIndex()
+
+    def parent(self, index: QModelIndex=None):
+        if index is None:
+            # QObject::parent()
+            return QAbstractProxyModel.parent(self)
+        return QModelIndex()
+
+    def rowCount(self, parent=None, *args, **kwargs):
+        if self.sourceModel() is None or (parent is not None and parent.isValid()):
+            return 0
+        return self.sourceModel().rowCount()
+
+    def columnCount(self, parent=None, *args, **kwargs):
+        if self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
@@ -0,0 +1,212 @@
+import datetime
+
+import trello
+from PyQt5.QtCore import QObject, QTimer, pyqtSlot
+
+from Models.Trello.TrelloCardsModel import TrelloCardsModel
+from Trello.AsyncTrelloClient import TrelloRequestPriority
+from Trello.TrelloActionSync import TrelloActionSync
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCardLoader import TrelloCardLoader
+from Trello.TrelloCardRecord import TrelloCardRecord, TRELLO_CARD_LIST_FIELDS
+from Trello.TrelloCardStore import TrelloCardStore
+from Trello.TrelloSessionPool import PooledTrelloClient
+from Utils.JsonSettings import load_json_settings, save_json_settings
+
+
+# Card fields fetched for the backlog, the list fields and the due date it's filtered by
+TRELLO_BACKLOG_CARD_FIELDS = TRELLO_CARD_LIST_FIELDS + ("due",)
+
+# Format of Trello's due dates, always UTC so they sort like the dates they stand for
+TRELLO_DUE_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+class TrelloBacklogModel(TrelloCardsModel):
+    """
+        Open cards of a set of boards and lists, ordered by due date
+        All sources are fetched at once through the batcher. Afterwards the backlog follows the card store and the
+        action sync of its boards, so cards fetched, loaded or synced anywhere update their rows. Cards are fetched
+        with their due date and labels, so the backlog can be filtered (see due_before and has_labels) right away
+    """
+    def __init__(self, parent: QObject = None):
+        TrelloCardsModel.__init__(self, parent, "TrelloBacklogModel")
+        self.client = None
+        self.action_sync = None
+        self.cards = dict()
+        self.card_store = TrelloCardStore.shared()
+        self.card_store.cards_added.connect(self.on_cards_added)
+
+        self.settings = dict(board_ids=[],
+                             list_ids=[],
+                             interval=60)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+
+    def load_from_file(self, file_name) -> bool:
+        data = load_json_settings(file_name)
+        if data is None:
+            return False
+        self.settings.update(data)
+        return True
+
+    def save_to_file(self, file_name) -> bool:
+        return save_json_settings(file_name, self.settings)
+
+    def set_client(self, client: PooledTrelloClient):
+        self.client = client
+        self.refresh()
+
+    def get_client(self):
+        return self.client
+
+    def set_action_sync(self, action_sync: TrelloActionSync):
+        TrelloCardsModel.set_action_sync(self, action_sync)
+        self.action_sync = action_sync
+        self.poll_timer.start(self.settings["interval"] * 1000)
+
+    # Sources
+    def add_board(self, board_id: str):
+        if board_id not in self.settings["board_ids"]:
+            self.settings["board_ids"].append(board_id)
+            self.refresh()
+
+    def add_list(self, list_id: str):
+        if list_id not in self.settings["list_ids"]:
+            self.settings["list_ids"].append(list_id)
+            self.refresh()
+
+    def remove_board(self, board_id: str):
+        if board_id in self.settings["board_ids"]:
+            self.settings["board_ids"].remove(board_id)
+            self.__remove_unwanted()
+
+    def remove_list(self, list_id: str):
+        if list_id in self.settings["list_ids"]:
+            self.settings["list_ids"].remove(list_id)
+            self.__remove_unwanted()
+
+    def is_wanted(self, card: TrelloCardRecord) -> bool:
+        return not card.closed and (card.idBoard in self.settings["board_ids"] or
+                                    card.idList in self.settings["list_ids"])
+
+    def get_board_ids(self) -> set:
+        """
+            The boards of the backlog, including those of its lists (once their cards are known)
+        """
+        return set(self.settings["board_ids"]).union(card.idBoard for card in self.cards.values())
+
+    # Fetching
+    def refresh(self):
+        """
+            Fetches the cards of every source, in parallel
+        """
+        if self.client is None:
+            return
+        generation = self.generation.advance()
+        sources = [("boards", board_id) for board_id in self.settings["board_ids"]] + \
+                  [("lists", list_id) for list_id in self.settings["list_ids"]]
+        for collection, source_id in sources:
+            self.generation.track(TrelloBatcher.shared().get(
+                self.client, "/%s/%s/cards/open" % (collection, source_id),
+                dict(fields=",".join(TRELLO_BACKLOG_CARD_FIELDS)),
+                converter=TrelloCardLoader.cards_from_json,
+                slot_callback=lambda cards, source=(collection, source_id): self.on_got_source_cards(source, cards,
+                                                                                                     generation),
+                error_callback=self.on_cards_error))
+
+    def on_got_source_cards(self, source: tuple, cards: list, generation: int):
+        """
+            Replaces the cards of a source, cards it no longer holds leave unless another source holds them
+        """
+        if not self.generation.is_current(generation):
+            return
+        collection, source_id = source
+        id_field = "idBoard" if collection == "boards" else "idList"
+        card_ids = {card.id for card in cards}
+        for card in list(self.cards.values()):
+            if getattr(card, id_field) == source_id and card.id not in card_ids:
+                del self.cards[card.id]
+
+        for card in cards:
+            self.__put_card(card)
+        self.__apply()
+        # Shared, so the other models see them too
+        self.card_store.add_cards(cards)
+        self.log_debug("Backlog source fetched", collection=collection, source_id=source_id, cards=len(cards))
+
+    @pyqtSlot()
+    def poll(self):
+        if self.action_sync is None or self.client is None:
+            return
+        for board_id in self.get_board_ids():
+            self.action_sync.sync(trello.Board(self.client, board_id))
+
+    # Incremental updates
+    def __put_card(self, card: TrelloCardRecord) -> bool:
+        """
+            Adds or replaces a card, keeping the due date of the held version when card lacks it
+        :return: Whether the backlog changed
+        """
+        held_card = self.cards.get(card.id)
+        if held_card is card:
+            return False
+        if held_card is not None and card.dateLastActivity == held_card.dateLastActivity:
+            if "due" in card.lazy_fields and "due" not in held_card.lazy_fields:
+                card = card.replace(due=held_card.due)
+        if "due" in card.lazy_fields and self.client is not None:
+            self.card_loader.load(self.client, card, TrelloRequestPriority.Low)
+        self.cards[card.id] = card
+        return True
+
+    def __update_cards(self, card_ids) -> bool:
+        changed = False
+        for card_id in card_ids:
+            card = self.card_store.get_card(card_id)
+            if card is not None and self.is_wanted(card):
+                changed = self.__put_card(card) or changed
+            elif card_id in self.cards:
+                del self.cards[card_id]
+                changed = True
+        return changed
+
+    @pyqtSlot(list, name="on_cardsAdded")
+    def on_cards_added(self, card_ids: list):
+        if self.__update_cards(card_ids):
+            self.__apply()
+
+    @pyqtSlot(str, list, name="on_cardsSynced")
+    def on_cards_synced(self, board_id: str, card_ids: list):
+        if self.__update_cards(card_ids):
+            self.__apply()
+
+    @pyqtSlot(str, name="on_boardStale")
+    def on_board_stale(self, board_id: str):
+        if board_id in self.get_board_ids():
+            self.refresh()
+
+    def __remove_unwanted(self):
+        for card in list(self.cards.values()):
+            if not self.is_wanted(card):
+                del self.cards[card.id]
+        self.__apply()
+
+    def __apply(self):
+        cards = sorted(self.cards.values(), key=lambda card: (card.due is None, card.due or "", card.idList, card.pos))
+        self.apply_keyed_update(cards, lambda card: card.id)
+
+    # Filters, for ExtendableSortFilterProxyModel.set_column_filter
+    @staticmethod
+    def due_before(date: datetime.datetime):
+        """
+            Accepts the due column of cards due before date
+        """
+        bound = date.astimezone(datetime.timezone.utc).strftime(TRELLO_DUE_FORMAT)
+        return lambda due: due is not None and due < bound
+
+    @staticmethod
+    def has_labels(label_ids):
+        """
+            Accepts the idLabels column of cards with any of the labels
+        """
+        label_ids = frozenset(label_ids)
+        return lambda card_label_ids: card_label_ids is not None and not label_ids.isdisjoint(card_label_ids)
@@ -1,47 +1,64 @@
+from enum import IntEnum
+
 import trello
-from PyQt5.QtCore import QAbstractTableModel, pyqtSlot, QModelIndex, Qt
+from PyQt5.QtCore import pyqtSlot
 
+from Models.ExtendableItemModel import ExtendableItemModel, ItemModelDataSetType
 from Trello.AsyncTrelloClient import AsyncTrelloClient
-from Utils.LogHelper import LogHelper
+from Trello.TrelloCache import TrelloCache
+from Trello.TrelloPrefetcher import TrelloPrefetcher
+
+
+class TrelloBoardsModelColumns(IntEnum):
+    id = 0
+    name = 1
 
 
-class TrelloBoardsModel(QAbstractTableModel, LogHelper):
+class TrelloBoardsModel(ExtendableItemModel):
     def __init__(self, trello_client: AsyncTrelloClient, parent=None):
-        QAbstractTableModel.__init__(self, parent)
-        LogHelper.__init__(self, "TrelloBoardsModel")
+        ExtendableItemModel.__init__(self, parent, "TrelloBoardsModel")
         self.trello_client = trello_client
         self.trello_boards = []
+        self.cache = None
+        self.prefetcher = None
+
+        ds = self.add_data_set("TrelloBoardsModelDS", self.trello_boards, ItemModelDataSetType.Obj, False)
+        self.add_columns(TrelloBoardsModelColumns, ds)
+
+    def set_cache(self, cache: TrelloCache):
+        self.cache = cache
+
+    def set_prefetcher(self, prefetcher: TrelloPrefetcher):
+        self.prefetcher = prefetcher
 
     def request_boards(self):
+        if self.cache is not None and len(self.trello_boards) == 0:
+            cached_boards = self.cache.load_boards(self.trello_client.client)
+            if len(cached_boards):
+                self.apply_keyed_update(cached_boards, lambda board: board.id)
+
         print("Fetching boards...")
         # noinspection PyArgumentList
-        self.trello_client.list_boards(slot_callback=self.on_got_boards)
+        self.trello_client.list_boards(slot_callback=self.on_got_boards, error_callback=self.on_boards_error)
 
     def get_board(self, row_number) -> trello.Board:
         return self.trello_boards[row_number]
 
+    def get_board_row(self, board_id: str) -> int:
+        for row, board in enumerate(self.trello_boards):
+            if board.id == board_id:
+                return row
+        return -1
+
     @pyqtSlot(object, name="on_gotBoards")
     def on_got_boards(self, board_list):
-        if board_list is not None:
-            self.beginResetModel()
-            self.trello_boards = board_list
-            print("Boards fetched. rowCount=%i" % self.rowCount())
-            self.endResetModel()
-        else:
-            self.log_warning("Unable to fetch trello boards")
-
-    def data(self, index: QModelIndex, role=None):
-        if not index.isValid() or index.row() > self.rowCount() or index.column() > self.columnCount():
-            return None
-        if role == Qt.DisplayRole:
-            if index.column() == 0:
-                return self.trello_boards[index.row()].id
-            if index.column() == 1:
-                return self.trello_boards[index.row()].name
-        return None
-
-    def rowCount(self, parent=None, *args, **kwargs):
-        return len(self.trello_boards)
-
-    def columnCount(self, parent=None, *args, **kwargs):
-        return 2
+        self.apply_keyed_update(board_list, lambda board: board.id)
+        if self.cache is not None:
+            self.cache.store_boards(board_list)
+        if self.prefetcher is not None:
+            self.prefetcher.prefetch(board_list)
+        print("Boards fetched. rowCount=%i" % self.rowCount())
+
+    @pyqtSlot(object, name="on_boardsError")
+    def on_boards_error(self, error):
+        self.log_warning("Unable to fetch trello boards", error=error)
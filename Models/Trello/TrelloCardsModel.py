@@ -1,65 +1,176 @@
 from enum import IntEnum
 
-import trello
 from PyQt5.QtCore import QAbstractTableModel, pyqtSlot, QModelIndex, Qt, QObject, QMimeData, QByteArray
 import json
 
 from Trello.AsyncTrelloClient import AsyncTrelloWrapper
+from Trello.TrelloActionSync import TrelloActionSync
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCache import TrelloCache
+from Trello.TrelloCardLoader import TrelloCardLoader
+from Trello.TrelloCardRecord import TrelloCardRecord
+from Trello.TrelloCardStore import TrelloCardStore
+from Trello.TrelloPrefetcher import TrelloPrefetcher
+from Trello.TrelloRequestGeneration import TrelloRequestGeneration
 from Models.ExtendableItemModel import ExtendableItemModel, ItemModelDataSetType
 
 
 class TrelloCardsModelColumns(IntEnum):
     id = 0
     name = 1
-    board = 2
-    client = 3
-    closed = 4
-    pos = 5
-    idBoard = 6
-    idList = 7
-    idLabels = 8
-    idMembers = 9
-    idShort = 10
-    trello_list = 11
-    create_date = 12
-    creation_date = 13
-    dateLastActivity = 14
-    desc = 15
-    due = 16
-    label_ids = 17
-    labels = 18
-    shortUrl = 19
-    url = 20
+    closed = 2
+    pos = 3
+    idBoard = 4
+    idList = 5
+    idShort = 6
+    dateLastActivity = 7
+    shortUrl = 8
+    url = 9
+    desc = 10
+    due = 11
+    idLabels = 12
+    idMembers = 13
+    labels = 14
+
+
+# Columns backed by the card fields TrelloCardLoader fetches on first use
+TRELLO_CARDS_MODEL_LAZY_COLUMNS = [TrelloCardsModelColumns.due,
+                                   TrelloCardsModelColumns.labels]
 
 
 class TrelloCardsModel(ExtendableItemModel):
-    def __init__(self, parent: QObject = None):
-        ExtendableItemModel.__init__(self, parent, "TrelloCardsModel")
+    def __init__(self, parent: QObject = None, name: str = "TrelloCardsModel"):
+        ExtendableItemModel.__init__(self, parent, name)
         self.trello_cards = []
         self.trello_board = None
         self.list = None
+        self.cache = None
+        self.prefetcher = None
+        self.generation = TrelloRequestGeneration()
+        self.card_loader = TrelloCardLoader.shared()
+        self.card_loader.fields_loaded.connect(self.on_card_fields_loaded)
 
         ds = self.add_data_set("TrelloCardsModelDS", self.trello_cards, ItemModelDataSetType.Obj, False)
         self.add_columns(TrelloCardsModelColumns, ds)
 
+    def set_cache(self, cache: TrelloCache):
+        self.cache = cache
+
+    def set_action_sync(self, action_sync: TrelloActionSync):
+        action_sync.cards_synced.connect(self.on_cards_synced)
+        action_sync.board_stale.connect(self.on_board_stale)
+
+    def set_prefetcher(self, prefetcher: TrelloPrefetcher):
+        self.prefetcher = prefetcher
+
     def set_list(self, list: AsyncTrelloWrapper):
         self.list = list
+        cached_cards = self.cache.load_cards(list.trello_obj) if self.cache is not None else []
+        prefetched = self.prefetcher is not None and self.prefetcher.claim("/lists/%s/cards/open" % list.trello_obj.id)
+        if len(cached_cards) or prefetched:
+            self.apply_cards(cached_cards)
+        if prefetched:
+            # The cached cards were fetched moments ago
+            self.generation.advance()
+            return
         self.request_cards()
 
+    def get_client(self):
+        """
+            The client lazy fields are fetched with
+        """
+        return self.list.trello_obj.client
+
     def request_cards(self):
         print("Fetching cards for %s" % str(self.list.name))
-        # noinspection PyArgumentList
-        self.list.list_cards(slot_callback=self.on_got_cards)
-
-    @pyqtSlot(object, name="on_gotCards")
-    def on_got_cards(self, cards: list):
-        self.beginResetModel()
-        self.trello_cards.clear()
-        self.trello_cards[0:0] = cards
-        self.endResetModel()
+        trello_list = self.list.trello_obj
+        generation = self.generation.advance()
+        self.generation.track(TrelloBatcher.shared().get(
+            trello_list.client, "/lists/%s/cards/open" % trello_list.id, TrelloCardLoader.get_list_cards_params(),
+            converter=TrelloCardLoader.cards_from_json,
+            slot_callback=lambda cards: self.on_got_cards(trello_list.id, cards, generation),
+            error_callback=self.on_cards_error))
+
+    @pyqtSlot(str, object, int, name="on_gotCards")
+    def on_got_cards(self, list_id: str, cards: list, generation: int):
+        """
+        :param list_id: The list the cards were requested for
+        :param generation: The request's generation, cards of a list that's no longer selected are only cached
+        """
+        if self.cache is not None:
+            self.cache.store_cards(list_id, cards)
+        if not self.generation.is_current(generation):
+            self.log_debug("Dropped cards of a previously selected list", list_id=list_id)
+            return
+        self.apply_cards(cards)
 
         print("Cards fetched. rowCount=%i, columnCount=%i" % (self.rowCount(), self.columnCount()))
 
+    def apply_cards(self, cards: list):
+        card_store = TrelloCardStore.shared()
+        for i, card in enumerate(cards):
+            previous_card = card_store.get_card(card.id)
+            if previous_card is not None:
+                cards[i] = card.carry_over(previous_card)
+        card_store.add_cards(cards)
+        self.apply_keyed_update(cards, lambda card: card.id)
+
+    @pyqtSlot(str, list, name="on_cardsSynced")
+    def on_cards_synced(self, board_id: str, card_ids: list):
+        """
+            Updates the rows of the synced cards, adds the ones that moved into the list and removes those that left
+        """
+        if self.list is None or self.list.board.id != board_id:
+            return
+
+        card_ids = set(card_ids)
+        card_store = TrelloCardStore.shared()
+        cards = [card for card in self.trello_cards if card.id not in card_ids]
+        for card_id in card_ids:
+            card = card_store.get_card(card_id)
+            if card is not None and card.idList == self.list.id and not card.closed:
+                cards.append(card)
+        cards.sort(key=lambda card: card.pos)
+
+        self.apply_keyed_update(cards, lambda card: card.id)
+        if self.cache is not None:
+            self.cache.store_cards(self.list.id, cards)
+
+    @pyqtSlot(str, name="on_boardStale")
+    def on_board_stale(self, board_id: str):
+        if self.list is not None and self.list.board.id == board_id:
+            self.request_cards()
+
+    @pyqtSlot(object, name="on_cardsError")
+    def on_cards_error(self, error):
+        self.log_warning("Unable to fetch trello cards", error=error)
+
+    @pyqtSlot(list, name="on_cardFieldsLoaded")
+    def on_card_fields_loaded(self, cards: list):
+        """
+            Replaces the rows of the cards that were loaded, unless they changed since
+        """
+        loaded_cards = {card.id: card for card in cards}
+        for row, card in enumerate(self.trello_cards):
+            loaded_card = loaded_cards.get(card.id)
+            if loaded_card is not None and loaded_card.dateLastActivity == card.dateLastActivity:
+                self.trello_cards[row] = loaded_card
+                self.dataChanged.emit(self.index(row, min(TRELLO_CARDS_MODEL_LAZY_COLUMNS)),
+                                      self.index(row, max(TRELLO_CARDS_MODEL_LAZY_COLUMNS)),
+                                      [Qt.DisplayRole, Qt.EditRole])
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        """
+            Lazy columns of cards that haven't fetched the column's field yet are empty, until fieldsLoaded
+        """
+        if role in [Qt.DisplayRole, Qt.EditRole] and index.isValid() and \
+                index.column() in TRELLO_CARDS_MODEL_LAZY_COLUMNS:
+            card = self.trello_cards[index.row()]
+            if TrelloCardsModelColumns(index.column()).name in card.lazy_fields:
+                self.card_loader.load(self.get_client(), card)
+                return None
+        return ExtendableItemModel.data(self, index, role)
+
     def flags(self, index: QModelIndex):
         if index.isValid():
             return Qt.ItemIsDropEnabled | Qt.ItemIsDragEnabled | ExtendableItemModel.flags(self, index)
@@ -69,14 +180,14 @@ class TrelloCardsModel(ExtendableItemModel):
     def supportedDragActions(self):
         return Qt.CopyAction
 
-    def get_card(self, row: int) -> trello.Card:
+    def get_card(self, row: int) -> TrelloCardRecord:
         return self.trello_cards[row]
 
-    def get_card_by_id(self, card_id: str):
-        for card in self.trello_cards:
-            if card.id == card_id:
-                return card
-        return None
+    def get_card_by_id(self, card_id: str) -> TrelloCardRecord:
+        """
+            Looks the card up in the card store, so cards of other lists and boards are found too
+        """
+        return TrelloCardStore.shared().get_card(card_id)
 
     def mimeData(self, index_list: list):
         mime_data = QMimeData()
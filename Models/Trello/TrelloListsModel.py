@@ -1,53 +1,97 @@
+from enum import IntEnum
+
 import trello
-from PyQt5.QtCore import QAbstractTableModel, pyqtSlot, QModelIndex, Qt
+from PyQt5.QtCore import pyqtSlot
 
+from Models.ExtendableItemModel import ExtendableItemModel, ItemModelDataSetType
 from Trello.AsyncTrelloClient import AsyncTrelloClient, AsyncTrelloWrapper
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCache import TrelloCache
+from Trello.TrelloPrefetcher import TrelloPrefetcher
+from Trello.TrelloRequestGeneration import TrelloRequestGeneration
+
 
+class TrelloListsModelColumns(IntEnum):
+    id = 0
+    name = 1
+    board = 2
+    client = 3
+    closed = 4
+    pos = 5
 
-class TrelloListsModel(QAbstractTableModel):
+
+class TrelloListsModel(ExtendableItemModel):
     def __init__(self, trello_client: AsyncTrelloClient, parent=None):
-        QAbstractTableModel.__init__(self, parent)
+        ExtendableItemModel.__init__(self, parent, "TrelloListsModel")
         self.trello_client = trello_client
         self.trello_board_lists = []
         self.trello_board = None
+        self.cache = None
+        self.prefetcher = None
+        self.generation = TrelloRequestGeneration()
+
+        ds = self.add_data_set("TrelloListsModelDS", self.trello_board_lists, ItemModelDataSetType.Obj, False)
+        self.add_columns(TrelloListsModelColumns, ds)
+        for col in TrelloListsModelColumns:
+            self.set_column_formatter(col.value, str)
+
+    def set_cache(self, cache: TrelloCache):
+        self.cache = cache
+
+    def set_prefetcher(self, prefetcher: TrelloPrefetcher):
+        self.prefetcher = prefetcher
 
     def set_board(self, board: trello.Board):
         self.trello_board = AsyncTrelloWrapper(board)
+        cached_lists = self.cache.load_lists(board) if self.cache is not None else []
+        prefetched = self.prefetcher is not None and self.prefetcher.claim("/boards/%s/lists" % board.id)
+        if len(cached_lists) or prefetched:
+            self.apply_lists(cached_lists)
+        if prefetched:
+            # The cached lists were fetched moments ago
+            self.generation.advance()
+            return
         self.request_lists()
 
     def get_list(self, row) -> trello.List:
         return self.trello_board_lists[row]
 
-    def get_column_data(self, row):
-        trello_list = self.get_list(row)
-        return [trello_list.id,
-                trello_list.name,
-                trello_list.board,
-                trello_list.client,
-                trello_list.closed,
-                trello_list.pos]
+    def get_list_row(self, list_id: str) -> int:
+        for row, trello_list in enumerate(self.trello_board_lists):
+            if trello_list.id == list_id:
+                return row
+        return -1
 
     def request_lists(self):
         print("Fetching lists..")
-        # noinspection PyArgumentList
-        self.trello_board.all_lists(slot_callback=self.on_got_lists)
+        board = self.trello_board.trello_obj
+        generation = self.generation.advance()
+        self.generation.track(TrelloBatcher.shared().get(
+            board.client, "/boards/%s/lists" % board.id, dict(cards="none", filter="all"),
+            converter=lambda json_obj: [trello.List.from_json(board=board, json_obj=obj) for obj in json_obj],
+            slot_callback=lambda list_list: self.on_got_lists(board.id, list_list, generation),
+            error_callback=self.on_lists_error))
 
-    @pyqtSlot(object, name="on_gotLists")
-    def on_got_lists(self, list_list):
-        self.beginResetModel()
-        self.trello_board_lists = list_list
+    @pyqtSlot(str, object, int, name="on_gotLists")
+    def on_got_lists(self, board_id: str, list_list, generation: int):
+        """
+        :param board_id: The board the lists were requested for
+        :param generation: The request's generation, lists of a board that's no longer selected are only cached
+        """
+        if self.cache is not None:
+            self.cache.store_lists(board_id, list_list)
+        if not self.generation.is_current(generation):
+            self.log_debug("Dropped lists of a previously selected board", board_id=board_id)
+            return
+        self.apply_lists(list_list)
         print("Lists fetched. rowCount=%i, columnCount=%i" % (self.rowCount(), self.columnCount()))
-        self.endResetModel()
-
-    def data(self, index: QModelIndex, role=None):
-        if not index.isValid() or index.row() >= self.rowCount() or index.column() >= self.columnCount():
-            return None
-        if role == Qt.DisplayRole:
-            return str( self.get_column_data(index.row())[index.column()] )
-        return None
 
-    def rowCount(self, parent=None, *args, **kwargs):
-        return len(self.trello_board_lists)
+    def apply_lists(self, list_list):
+        self.apply_keyed_update(list_list, lambda trello_list: trello_list.id,
+                                columns=[TrelloListsModelColumns.name,
+                                         TrelloListsModelColumns.closed,
+                                         TrelloListsModelColumns.pos])
 
-    def columnCount(self, parent=None, *args, **kwargs):
-        return 6
+    @pyqtSlot(object, name="on_listsError")
+    def on_lists_error(self, error):
+        self.log_warning("Unable to fetch trello lists", error=error)
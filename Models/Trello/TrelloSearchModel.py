@@ -0,0 +1,34 @@
+from PyQt5.QtCore import QObject, pyqtSlot
+
+from Models.Trello.TrelloCardsModel import TrelloCardsModel
+from Trello.TrelloCardIndex import TrelloCardIndex
+from Trello.TrelloSessionPool import PooledTrelloClient
+
+
+class TrelloSearchModel(TrelloCardsModel):
+    """
+        Cards of every board and list fetched once, now or in an earlier session, matching a query, looked up in the
+        card index. The results follow the index, so cards fetched or synced while a query is set show up or leave
+    """
+    def __init__(self, parent: QObject = None, card_index: TrelloCardIndex = None):
+        TrelloCardsModel.__init__(self, parent, "TrelloSearchModel")
+        self.client = None
+        self.query = ""
+        self.card_index = card_index if card_index is not None else TrelloCardIndex.shared()
+        self.card_index.index_updated.connect(self.refresh)
+
+    def set_client(self, client: PooledTrelloClient):
+        self.client = client
+
+    def get_client(self):
+        return self.client
+
+    def set_query(self, query: str):
+        self.query = query
+        self.refresh()
+
+    @pyqtSlot(name="on_indexUpdated")
+    def refresh(self):
+        if not len(self.query) and not len(self.trello_cards):
+            return
+        self.apply_keyed_update(self.card_index.search_cards(self.query), lambda card: card.id)
@@ -7,6 +7,7 @@ from PyQt5.QtCore import Qt
 from Models.ExtendableItemModel import ItemModelDataSetType, ItemModelDataSet
 from Models.Tymbox.TymboxModel import TymboxModel, TymboxModelColumnsCount, TymboxModelColumns, \
     TymboxTaskTimePreference, TymboxTask, time_formatter
+from Utils.LogHelper import LogLevel
 
 
 class SequentialTiming(object):
@@ -255,32 +256,34 @@ class SequentialTymboxModel(TymboxModel):
                     elif column == TymboxModelColumns.start_time:
                         self.__start_time_changed(row)
 
+    def __log_timing_data(self, row: int):
+        if self.is_log_enabled(LogLevel.ExtraDebug):
+            self.log_extra_debug("Calculated timing data", row=row,
+                                 earliest_start=self.timing_data[row].earliest_start,
+                                 latest_end=self.timing_data[row].latest_end)
+
     @pyqtSlot(QModelIndex, int, int)
     def on_rowInserted(self, parent: QModelIndex, first: int, last: int):
         for i in range(first, last+1):
             self.timing_data[i].earliest_start = self.calculate_earliest_start(i)
             self.timing_data[i].latest_end = self.calculate_latest_end(i)
-            print("Calculated timing data for row", i, "earliest start:", self.timing_data[i].earliest_start, "latest end:", self.timing_data[i].latest_end)
+            self.__log_timing_data(i)
 
         for i in range(first-1, -1, -1):
             self.timing_data[i].latest_end = self.calculate_latest_end(i)
-            print("Calculated timing data for row", i, "earliest start:", self.timing_data[i].earliest_start,
-                  "latest end:", self.timing_data[i].latest_end)
+            self.__log_timing_data(i)
 
         for i in range(last+1, self.rowCount()):
             self.timing_data[i].earliest_start = self.calculate_earliest_start(i)
-            print("Calculated timing data for row", i, "earliest start:", self.timing_data[i].earliest_start,
-                  "latest end:", self.timing_data[i].latest_end)
+            self.__log_timing_data(i)
 
     @pyqtSlot(QModelIndex, int, int)
     def on_rowRemoved(self, parent: QModelIndex, first: int, last: int):
         if self.rowCount() > 0:
             for i in range(first-1, -1, -1):
                 self.timing_data[i].latest_end = self.calculate_latest_end(i)
-                print("Calculated timing data for row", i, "latest start:", self.timing_data[i].earliest_start,
-                      "latest end:", self.timing_data[i].latest_end)
+                self.__log_timing_data(i)
 
             for i in range(last, self.rowCount()):
                 self.timing_data[i].earliest_start = self.calculate_earliest_start(i)
-                print("Calculated timing data for row", i, "earliest start:", self.timing_data[i].earliest_start,
-                      "latest end:", self.timing_data[i].latest_end)
\ No newline at end of file
+                self.__log_timing_data(i)
\ No newline at end of file
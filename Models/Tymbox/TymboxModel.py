@@ -4,12 +4,14 @@ from enum import IntEnum, unique
 
 import math
 from PyQt5.QtCore import QModelIndex, Qt, QMimeData, QTextStream, QByteArray, QDataStream, QIODevice, pyqtSignal, \
-    QObject
+    QObject, pyqtSlot
 from copy import copy
 
 
 from Models.ExtendableItemModel import ExtendableItemModel, ItemModelDataSetType, ItemModelDataSet
 from Models.Trello.TrelloCardsModel import TrelloCardsModel
+from Trello.TrelloCardRecord import TrelloCardRecord
+from Trello.TrelloCardStore import TrelloCardStore
 
 
 def time_formatter(i: float):
@@ -137,6 +139,12 @@ class TymboxTrelloTask(TymboxTask):
         instance.card_id = data["trello_card_id"]
         return instance
 
+    def get_card(self) -> TrelloCardRecord:
+        """
+            The task's card, None until the card has been fetched (or loaded from the cache)
+        """
+        return TrelloCardStore.shared().get_card(self.card_id)
+
     def serialise(self) -> dict():
         data = super().serialise()
         data["trello_card_id"] = self.card_id
@@ -156,6 +164,8 @@ TymboxModelColumnsCount = len(list(TymboxModelColumns))
 class TymboxModel(ExtendableItemModel):
 
     durationChanged = pyqtSignal(int)
+    # Emitted by remove_task only, not for rows removed by replacing the tasks
+    task_about_to_be_removed = pyqtSignal(TymboxTask, name="taskAboutToBeRemoved")
 
     def __init__(self, parent=None, name: str ="TymboxModel"):
         ExtendableItemModel.__init__(self, parent, name)
@@ -172,6 +182,8 @@ class TymboxModel(ExtendableItemModel):
         self.set_column_formatter(TymboxModelColumns.end_time, time_formatter)
         self.set_column_formatter(TymboxModelColumns.preference_value, time_formatter)
 
+        TrelloCardStore.shared().cards_added.connect(self.on_cards_added)
+
     def set_start_time(self, start_time: int):
         self.start_time = start_time
         # TODO clear
@@ -184,6 +196,20 @@ class TymboxModel(ExtendableItemModel):
     def set_cards_model(self, model: TrelloCardsModel):
         self.cards_model = model
 
+    @pyqtSlot(list, name="on_cardsAdded")
+    def on_cards_added(self, card_ids: list):
+        """
+            Renames the Trello tasks whose card was (re)fetched with a different name
+        """
+        card_ids = set(card_ids)
+        for row, task in enumerate(self.tasks):
+            if isinstance(task, TymboxTrelloTask) and task.card_id in card_ids:
+                card = task.get_card()
+                if card is not None and card.name != task.name:
+                    task.name = card.name
+                    name_index = self.index(row, TymboxModelColumns.name)
+                    self.dataChanged.emit(name_index, name_index)
+
     def get_event(self, row: int) -> TymboxTask:
         return self.tasks[row]
 
@@ -314,6 +340,7 @@ class TymboxModel(ExtendableItemModel):
                 self.log_error("Failed to import task", task)
 
     def remove_task(self, at):
+        self.task_about_to_be_removed.emit(self.get_event(at))
         self.removeRow(at)
 
     def construct_data_source(self, data_set: ItemModelDataSet, pos: int) -> object:
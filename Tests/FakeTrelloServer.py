@@ -0,0 +1,228 @@
+import copy
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+TRELLO_FIXTURE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Fixtures", "TrelloBoard.json")
+
+class FakeTrelloHandler(BaseHTTPRequestHandler):
+    """
+        Answers a request from the server's data, after the server's latency
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def do_PUT(self):
+        self.respond()
+
+    def respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        status_code, value = self.server.fake.handle(self.command, self.path)
+
+        body = json.dumps(value).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, header_value in self.server.fake.get_rate_limit_headers().items():
+            self.send_header(name, header_value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.fake.count_bytes(len(body))
+
+    def log_message(self, *args):
+        pass
+
+class FakeTrelloServer(object):
+    """
+        Local stand-in for the Trello REST API serving recorded boards, lists, cards and actions
+        Supports the routes Tymbox uses (including /batch and field projection), with configurable latency, random
+        errors and a request quota answered with 429s like Trello's. Writes are recorded, not applied
+    """
+    def __init__(self, fixture_file: str = TRELLO_FIXTURE_FILE, latency: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: int = None, rate_limit_interval: float = 10.0, seed: int = 0):
+        """
+        :param latency: Seconds every request takes
+        :param error_rate: Probability of a request (or batched route) failing with a 500
+        :param rate_limit: Requests allowed per rate_limit_interval, unlimited when None
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_limit_interval = rate_limit_interval
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.script = []
+        self.requests = deque()
+        self.stats = Counter()
+        self.writes = []
+
+        with open(fixture_file) as fp:
+            fixture = json.load(fp)
+        self.boards = fixture["boards"]
+        self.lists = fixture["lists"]
+        self.cards = fixture["cards"]
+        self.actions = fixture["actions"]
+        self.card_index = dict()
+        self.__index_cards()
+
+        self.http_server = None
+
+    def __index_cards(self):
+        self.card_index = {card["id"]: card for cards in self.cards.values() for card in cards}
+
+    def scale(self, boards: int, lists_per_board: int, cards_per_list: int):
+        """
+            Replaces the data with copies of the fixture's first board, list and cards
+        """
+        board_template = self.boards[0]
+        list_template = self.lists[board_template["id"]][0]
+        card_templates = [card for cards in self.cards.values() for card in cards]
+        ids = iter("%024x" % i for i in range(1, 1 + boards * (1 + lists_per_board * (1 + cards_per_list))))
+
+        self.boards, self.lists, self.cards, self.actions = [], dict(), dict(), dict()
+        for board_no in range(boards):
+            board = dict(board_template, id=next(ids), name="Board %i" % board_no)
+            self.boards.append(board)
+            self.lists[board["id"]] = []
+            self.actions[board["id"]] = []
+            for list_no in range(lists_per_board):
+                trello_list = dict(list_template, id=next(ids), name="List %i" % list_no, pos=(list_no + 1) * 16384)
+                self.lists[board["id"]].append(trello_list)
+                self.cards[trello_list["id"]] = []
+                for card_no in range(cards_per_list):
+                    card = copy.deepcopy(card_templates[card_no % len(card_templates)])
+                    card.update(id=next(ids), name="Card %i" % card_no, idBoard=board["id"], idList=trello_list["id"],
+                                idShort=card_no + 1, pos=(card_no + 1) * 65536)
+                    self.cards[trello_list["id"]].append(card)
+        self.__index_cards()
+
+    # Server
+    def start(self):
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTrelloHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.fake = self
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.http_server.shutdown()
+        self.http_server.server_close()
+
+    @property
+    def api_url(self) -> str:
+        return "http://127.0.0.1:%i/1/" % self.http_server.server_port
+
+    def count_bytes(self, count: int):
+        with self.lock:
+            self.stats["bytes"] += count
+
+    def get_rate_limit_headers(self) -> dict:
+        if self.rate_limit is None:
+            return dict()
+        with self.lock:
+            remaining = max(self.rate_limit - len(self.requests), 0)
+        return {"x-rate-limit-api-token-remaining": str(remaining),
+                "x-rate-limit-api-token-interval-ms": str(int(self.rate_limit_interval * 1000))}
+
+    def __over_rate_limit(self) -> bool:
+        """
+            Counts the request in the sliding window
+        """
+        if self.rate_limit is None:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            while len(self.requests) and self.requests[0] <= now - self.rate_limit_interval:
+                self.requests.popleft()
+            if len(self.requests) >= self.rate_limit:
+                return True
+            self.requests.append(now)
+            return False
+
+    def __fail_randomly(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def handle(self, method: str, path: str) -> tuple:
+        """
+        :return: (status code, JSON value) of a request
+        """
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats[method] += 1
+            scripted_status = self.script.pop(0) if len(self.script) else None
+        if self.latency:
+            time.sleep(self.latency)
+
+        if scripted_status is not None and scripted_status != 200:
+            return scripted_status, "Scripted failure"
+        if self.__over_rate_limit():
+            with self.lock:
+                self.stats["rate_limited"] += 1
+            return 429, "API_TOKEN_LIMIT_EXCEEDED"
+        if self.__fail_randomly():
+            return 500, "Internal error"
+
+        url = urlsplit(path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if len(part)][1:]
+
+        if method != "GET":
+            with self.lock:
+                self.writes.append((method, "/" + "/".join(parts), query))
+            return 200, dict()
+        if parts == ["batch"]:
+            return 200, [self.__batch_item(route) for route in query.get("urls", "").split(",")]
+        return self.__get(parts, query)
+
+    def __batch_item(self, route: str) -> dict:
+        if self.__fail_randomly():
+            return {"500": "Internal error"}
+        url = urlsplit(route)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        status_code, value = self.__get([part for part in url.path.split("/") if len(part)], query)
+        return {str(status_code): value}
+
+    def __get(self, parts: list, query: dict) -> tuple:
+        if parts == ["members", "me", "boards"]:
+            return 200, self.boards
+        if len(parts) == 3 and parts[0] == "boards" and parts[2] == "lists" and parts[1] in self.lists:
+            return 200, self.lists[parts[1]]
+        if len(parts) == 3 and parts[0] == "boards" and parts[2] == "actions" and parts[1] in self.actions:
+            actions = self.actions[parts[1]]
+            if "since" in query:
+                action_ids = [action["id"] for action in actions]
+                actions = actions[:action_ids.index(query["since"])] if query["since"] in action_ids else actions
+            return 200, actions[:int(query.get("limit", 50))]
+        if len(parts) in (3, 4) and parts[0] == "boards" and parts[2] == "cards" and parts[1] in self.lists:
+            cards = [card for trello_list in self.lists[parts[1]] for card in self.cards.get(trello_list["id"], [])]
+            if len(parts) == 4 and parts[3] == "open":
+                cards = [card for card in cards if not card["closed"]]
+            return 200, [self.__project(card, query) for card in cards]
+        if len(parts) in (3, 4) and parts[0] == "lists" and parts[2] == "cards" and parts[1] in self.cards:
+            cards = self.cards[parts[1]]
+            if len(parts) == 4 and parts[3] == "open":
+                cards = [card for card in cards if not card["closed"]]
+            return 200, [self.__project(card, query) for card in cards]
+        if len(parts) == 2 and parts[0] == "cards" and parts[1] in self.card_index:
+            return 200, self.__project(self.card_index[parts[1]], query)
+        return 404, "The requested resource was not found."
+
+    @staticmethod
+    def __project(item: dict, query: dict) -> dict:
+        if query.get("fields", "all") == "all":
+            return item
+        fields = set(query["fields"].split(",")) | {"id"}
+        return {name: value for name, value in item.items() if name in fields}
@@ -1,7 +1,9 @@
+import random
 import unittest
 from enum import IntEnum
 
 from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QAbstractItemModelTester
 
 from Models.ExtendableItemModel import ExtendableItemModel, ItemModelDataSetType
 from Utils.LogHelper import LogLevel
@@ -152,6 +154,27 @@ class TestExtendableItemModel(unittest.TestCase):
         self.assertRaises(Exception, model.data, model.index(3, 0))
         self.assertRaises(Exception, model.data, model.index(0, 1))
 
+    def test_managed_data_set_bulk_insert(self):
+        data_list = [[1], [2]]
+        model = ExtendableItemModel()
+        data_set_list = model.add_data_set("TestDS", data_list, ItemModelDataSetType.List, True)
+        model.add_column(0, "Testing", data_set_list, 0)
+
+        constructed = []
+        def construct_data_sources(data_set, pos, count):
+            constructed.append((pos, count))
+            return [[-i] for i in range(pos, pos+count)]
+        model.construct_data_sources = construct_data_sources
+
+        model.insertRows(1, 3)
+
+        self.assertEqual([(1, 3)], constructed)
+        self.assertEqual([[1], [-1], [-2], [-3], [2]], data_list)
+
+        model.removeRows(0, 3)
+        self.assertEqual([[-3], [2]], data_list)
+        self.assertEqual(2, model.rowCount())
+
     def test_managed_data_set_remove(self):
         data_list = [[5,1],[4,2],[3,3],[2,4],[1,5]]
         model = ExtendableItemModel()
@@ -195,5 +218,136 @@ class TestExtendableItemModel(unittest.TestCase):
         self.assertEqual("Test1", model.headerData(3, Qt.Horizontal))
         self.assertEqual("Test2", model.headerData(4, Qt.Horizontal))
 
+    def test_tree(self):
+        class Node:
+            def __init__(self, name, children=None):
+                self.name = name
+                self.children = children if children is not None else []
+
+        data = [Node("a", [Node("a1"), Node("a2", [Node("a2i")])]), Node("b")]
+        model = ExtendableItemModel()
+        data_set = model.add_data_set("TestDS", data, ItemModelDataSetType.ObjTree, False, "children")
+        model.add_column(0, "Name", data_set, "name")
+        flat_data_set = model.add_data_set("FlatDS", [[True], [False]], ItemModelDataSetType.List, False)
+        model.add_column(1, "Flag", flat_data_set, 0)
+        QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+
+        self.assertEqual(2, model.rowCount())
+        a = model.index(0, 0)
+        self.assertEqual(2, model.rowCount(a))
+        a2 = model.index(1, 0, a)
+        self.assertEqual("a2", model.data(a2))
+        a2i = model.index(0, 0, a2)
+        self.assertEqual("a2i", model.data(a2i))
+        self.assertEqual(0, model.rowCount(a2i))
+
+        self.assertEqual(a2, model.parent(a2i))
+        self.assertEqual(a, model.parent(a2))
+        self.assertFalse(model.parent(a).isValid())
+        self.assertEqual(0, model.rowCount(model.index(1, 0)))
+
+        # Only the first column has children, flat data sets have no child rows
+        self.assertEqual(0, model.rowCount(model.index(0, 1)))
+        self.assertFalse(model.index(0, 0, model.index(0, 1)).isValid())
+        self.assertEqual(True, model.data(model.index(0, 1)))
+        self.assertIsNone(model.data(model.index(1, 1, a)))
+
+    def test_tree_insert_remove_nodes(self):
+        class Node:
+            def __init__(self, name, children=None):
+                self.name = name
+                self.children = children if children is not None else []
+
+        data = [Node("a", [Node("a1"), Node("a2")]), Node("b")]
+        model = ExtendableItemModel()
+        data_set = model.add_data_set("TestDS", data, ItemModelDataSetType.ObjTree, False, "children")
+        model.add_column(0, "Name", data_set, "name")
+        QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+
+        a = model.index(0, 0)
+        model.insert_nodes(0, [Node("x", [Node("x1"), Node("x2")])], a)
+
+        self.assertEqual(3, model.rowCount(a))
+        self.assertEqual("x2", model.data(model.index(1, 0, model.index(0, 0, a))))
+        self.assertEqual("a2", model.data(model.index(2, 0, a)))
+        self.assertEqual(a, model.parent(model.index(2, 0, a)))
+        self.assertEqual(2, data_set.get_link(data[0].children[2]).row)
+
+        model.insert_nodes(0, [Node("c")])
+        self.assertEqual(3, model.rowCount())
+        a = model.index(1, 0)
+        self.assertEqual("a", model.data(a))
+        self.assertEqual(a, model.parent(model.index(0, 0, a)))
+
+        removed = model.remove_nodes(0, 2, a)
+        self.assertEqual(["x", "a1"], [node.name for node in removed])
+        self.assertEqual(1, model.rowCount(a))
+        self.assertEqual("a2", model.data(model.index(0, 0, a)))
+        self.assertEqual(a, model.parent(model.index(0, 0, a)))
+        self.assertEqual(4, len(data_set.tree_links))
+
+        # Empty and out of range removals
+        self.assertEqual([], model.remove_nodes(0, 0, a))
+        self.assertEqual([], model.remove_nodes(5, 1, a))
+        self.assertEqual(["a2"], [node.name for node in model.remove_nodes(0, 5, a)])
+        self.assertEqual(0, model.rowCount(a))
+
+    def test_keyed_update(self):
+        data = [dict(id=i, name="Item %i" % i) for i in range(10)]
+        model = ExtendableItemModel()
+        data_set = model.add_data_set("TestDS", data, ItemModelDataSetType.Dict, False)
+        model.add_column(0, "id", data_set, "id")
+        model.add_column(1, "name", data_set, "name")
+
+        # Mirror the model through its row signals only
+        shadow = [item["id"] for item in data]
+        changed = []
+        resets = []
+
+        def on_rows_removed(parent, first, last):
+            del shadow[first:last+1]
+
+        def on_rows_inserted(parent, first, last):
+            shadow[first:first] = [model.data(model.index(row, 0)) for row in range(first, last+1)]
+
+        def on_rows_moved(parent, start, end, destination, row):
+            moved = shadow[start:end+1]
+            del shadow[start:end+1]
+            insert_row = row if row < start else row - len(moved)
+            shadow[insert_row:insert_row] = moved
+
+        model.rowsRemoved.connect(on_rows_removed)
+        model.rowsInserted.connect(on_rows_inserted)
+        model.rowsMoved.connect(on_rows_moved)
+        model.dataChanged.connect(lambda top_left, bottom_right, roles: changed.append(top_left.row()))
+        model.modelReset.connect(lambda: resets.append(True))
+
+        moves = []
+        model.rowsMoved.connect(lambda *args: moves.append(args))
+
+        new_data = [dict(item) for item in data]
+        new_data[3]["name"] = "Renamed"
+        new_data.append(new_data.pop(0))
+        model.apply_keyed_update(new_data, lambda item: item["id"])
+
+        self.assertEqual([item["id"] for item in new_data], shadow)
+        self.assertEqual(new_data, data)
+        self.assertEqual(1, len(moves))
+        self.assertEqual([2], changed)
+        self.assertEqual([], resets)
+
+        rng = random.Random(1)
+        for i in range(20):
+            new_data = [dict(item) for item in data if rng.random() > 0.2]
+            rng.shuffle(new_data)
+            new_data.insert(rng.randint(0, len(new_data)), dict(id=100+i, name="New %i" % i))
+            model.apply_keyed_update(new_data, lambda item: item["id"])
+            self.assertEqual([item["id"] for item in new_data], shadow)
+            self.assertEqual(new_data, data)
+
+        model.apply_keyed_update([dict(id=-1, name="Replaced")], lambda item: item["id"])
+        self.assertEqual([True], resets)
+        self.assertEqual(1, model.rowCount())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from PyQt5.QtCore import Qt
+
+from Models.ExtendableItemModel import ExtendableItemModel, ItemModelDataSetType
+from Models.ExtendableSortFilterProxyModel import ExtendableSortFilterProxyModel
+
+
+class TestExtendableSortFilterProxyModel(unittest.TestCase):
+    def create_model(self, data):
+        model = ExtendableItemModel()
+        data_set = model.add_data_set("TestDS", data, ItemModelDataSetType.List, True)
+        model.add_column(0, "Name", data_set, 0)
+        model.add_column(1, "Value", data_set, 1)
+
+        proxy = ExtendableSortFilterProxyModel()
+        proxy.setSourceModel(model)
+        return model, proxy
+
+    def proxy_column(self, proxy, column=0):
+        return [proxy.data(proxy.index(row, column)) for row in range(proxy.rowCount())]
+
+    def test_unsorted(self):
+        model, proxy = self.create_model([["b", 2], ["a", 1], ["c", 3]])
+        self.assertEqual(["b", "a", "c"], self.proxy_column(proxy))
+        self.assertEqual(1, proxy.mapFromSource(model.index(1, 0)).row())
+
+    def test_sort(self):
+        model, proxy = self.create_model([["b", 2], ["a", None], ["c", 3]])
+        proxy.sort(1)
+        self.assertEqual(["b", "c", "a"], self.proxy_column(proxy))
+
+        proxy.sort(0, Qt.DescendingOrder)
+        self.assertEqual(["c", "b", "a"], self.proxy_column(proxy))
+        self.assertEqual(2, proxy.mapToSource(proxy.index(0, 0)).row())
+        self.assertEqual(0, proxy.mapFromSource(model.index(2, 0)).row())
+
+    def test_incremental_insert_remove(self):
+        data = [["b", 2], ["d", 4]]
+        model, proxy = self.create_model(data)
+        proxy.sort(0)
+
+        model.insertRows(0, 2)
+        model.setData(model.index(0, 0), "e")
+        model.setData(model.index(1, 0), "a")
+        self.assertEqual(["a", "b", "d", "e"], self.proxy_column(proxy))
+
+        model.removeRows(1, 2)
+        self.assertEqual(["d", "e"], self.proxy_column(proxy))
+        self.assertEqual(1, proxy.mapFromSource(model.index(0, 0)).row())
+
+    def test_data_change_moves_row(self):
+        model, proxy = self.create_model([["a", 1], ["b", 2], ["c", 3]])
+        proxy.sort(1)
+
+        moves = []
+        resets = []
+        proxy.rowsMoved.connect(lambda *args: moves.append(args[1:3]))
+        proxy.modelReset.connect(lambda: resets.append(True))
+
+        model.setData(model.index(0, 1), 5)
+        self.assertEqual(["b", "c", "a"], self.proxy_column(proxy))
+        self.assertEqual([(0, 0)], moves)
+        self.assertEqual([], resets)
+
+    def test_filter(self):
+        model, proxy = self.create_model([["a", 1], ["b", 2], ["c", 3]])
+        proxy.set_column_filter(1, lambda value: value is not None and value >= 2)
+        self.assertEqual(["b", "c"], self.proxy_column(proxy))
+
+        model.setData(model.index(0, 1), 4)
+        self.assertEqual(["a", "b", "c"], self.proxy_column(proxy))
+
+        model.setData(model.index(1, 1), 0)
+        self.assertEqual(["a", "c"], self.proxy_column(proxy))
+
+        proxy.set_column_filter(1, None)
+        self.assertEqual(3, proxy.rowCount())
+
+if __name__ == '__main__':
+    unittest.main()
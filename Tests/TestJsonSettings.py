@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from Utils.JsonSettings import load_json_settings, save_json_settings
+
+
+class TestJsonSettings(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.temp_dir, "settings", "settings.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        self.assertIsNone(load_json_settings(self.file_name))
+        self.assertTrue(save_json_settings(self.file_name, dict(enabled=False, ids=["a"])))
+        self.assertEqual(dict(enabled=False, ids=["a"]), load_json_settings(self.file_name))
+
+    def test_invalid(self):
+        self.assertIsNone(load_json_settings(None))
+        self.assertIsNone(load_json_settings(""))
+        self.assertFalse(save_json_settings("", dict()))
+        self.assertFalse(save_json_settings(self.file_name, dict(value=object())))
+
+        for content in ("", "{", "[]", "null"):
+            with open(self.temp_dir + "/invalid.json", "w") as fp:
+                fp.write(content)
+            self.assertIsNone(load_json_settings(self.temp_dir + "/invalid.json"))
+
+
+if __name__ == '__main__':
+    unittest.main()
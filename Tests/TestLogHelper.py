@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import unittest
+
+from PyQt5.QtCore import QCoreApplication, QObject
+
+from Utils.LogHelper import LogHelper, LogLevel, LogLazy
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class LoggingObject(QObject, LogHelper):
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "LoggingObject")
+
+
+class TestLogHelper(unittest.TestCase):
+    def tearDown(self):
+        LogHelper.set_global_log_level(None)
+
+    def test_levels(self):
+        helper = LogHelper("Helper")
+        helper.set_log_level(LogLevel.Info)
+        self.assertTrue(helper.is_log_enabled(LogLevel.Warnings))
+        self.assertFalse(helper.is_log_enabled(LogLevel.Debug))
+
+        LogHelper.set_global_log_level(LogLevel.ExtraDebug)
+        self.assertTrue(helper.is_log_enabled(LogLevel.Debug))
+        self.assertEqual(LogLevel.ExtraDebug, helper.get_log_level())
+        LogHelper.set_global_log_level(LogLevel.Off)
+        self.assertFalse(helper.is_log_enabled(LogLevel.Fatal))
+        LogHelper.set_global_log_level(None)
+        self.assertEqual(LogLevel.Info, helper.get_log_level())
+
+    def test_lazy(self):
+        helper = LogHelper("Helper")
+        helper.set_log_level(LogLevel.Info)
+        calls = []
+
+        def expensive():
+            calls.append(True)
+            return "value"
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            helper.log_debug("Skipped", value=LogLazy(expensive))
+            self.assertEqual([], calls)
+            helper.log_info("Logged", value=LogLazy(expensive))
+            # Evaluated when logged, output later
+            self.assertEqual([True], calls)
+            LogHelper.flush_log_output()
+        self.assertIn("Logged", output.getvalue())
+        self.assertIn("'value'", output.getvalue())
+
+    def test_path_prefix(self):
+        parent = QObject()
+        parent.setObjectName("Parent")
+        helper = LoggingObject(parent)
+        self.assertEqual("Parent:", helper.get_qobject_path_prefix())
+
+        parent.setObjectName("Renamed")
+        self.assertEqual("Renamed:", helper.get_qobject_path_prefix())
+
+        other_parent = LoggingObject()
+        other_parent.set_log_name("Other")
+        helper.setParent(other_parent)
+        self.assertEqual("Other:", helper.get_qobject_path_prefix())
+        other_parent.set_log_name("Other2")
+        self.assertEqual("Other2:", helper.get_qobject_path_prefix())
+        helper.setParent(None)
+        self.assertEqual("", helper.get_qobject_path_prefix())
+
+        # Reparented ancestor
+        helper.setParent(other_parent)
+        other_parent.setParent(parent)
+        self.assertEqual("Renamed:Other2:", helper.get_qobject_path_prefix())
+        other_parent.setParent(None)
+        self.assertEqual("Other2:", helper.get_qobject_path_prefix())
+
+        # Renamed grandparent
+        other_parent.setParent(parent)
+        self.assertEqual("Renamed:Other2:", helper.get_qobject_path_prefix())
+        parent.setObjectName("Grandparent")
+        self.assertEqual("Grandparent:Other2:", helper.get_qobject_path_prefix())
+
+    def test_output_started_lazily(self):
+        # The output thread isn't started by importing, only by logging
+        output = subprocess.run([sys.executable, "-c", "import threading\n"
+                                                       "import Utils.LogHelper as log\n"
+                                                       "print(log.log_listener is None, threading.active_count())"],
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        self.assertEqual("True 1", output.strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from PyQt5.QtCore import QCoreApplication
+
+from Models.ExtendableItemModel import ExtendableItemModel, ItemModelDataSetType
+from Models.ThrottledProxyModel import ThrottledProxyModel
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class TestThrottledProxyModel(unittest.TestCase):
+    def create_model(self, data):
+        model = ExtendableItemModel()
+        data_set = model.add_data_set("TestDS", data, ItemModelDataSetType.List, True)
+        model.add_column(0, "A", data_set, 0)
+        model.add_column(1, "B", data_set, 1)
+
+        proxy = ThrottledProxyModel(interval_ms=1000)
+        proxy.setSourceModel(model)
+        return model, proxy
+
+    def test_coalesce(self):
+        model, proxy = self.create_model([[1, 2], [3, 4], [5, 6]])
+        changes = []
+        proxy.dataChanged.connect(lambda top_left, bottom_right, roles:
+                                  changes.append((top_left.row(), top_left.column(),
+                                                  bottom_right.row(), bottom_right.column())))
+
+        model.setData(model.index(0, 1), 10)
+        model.setData(model.index(2, 0), 11)
+        model.setData(model.index(1, 1), 12)
+
+        self.assertEqual([], changes)
+        self.assertEqual(11, proxy.data(proxy.index(2, 0)))
+
+        proxy.flush()
+        self.assertEqual([(0, 0, 2, 1)], changes)
+
+    def test_structure_flushes(self):
+        data = [[1, 2], [3, 4]]
+        model, proxy = self.create_model(data)
+        events = []
+        proxy.dataChanged.connect(lambda *args: events.append("changed"))
+        proxy.rowsInserted.connect(lambda *args: events.append("inserted"))
+        proxy.rowsRemoved.connect(lambda *args: events.append("removed"))
+
+        model.setData(model.index(0, 0), 10)
+        model.insertRows(1, 2)
+        self.assertEqual(["changed", "inserted"], events)
+        self.assertEqual(4, proxy.rowCount())
+
+        model.removeRows(0, 3)
+        self.assertEqual(["changed", "inserted", "removed"], events)
+        self.assertEqual(1, proxy.rowCount())
+        self.assertEqual(3, proxy.data(proxy.index(0, 0)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import time
+import unittest
+from urllib.parse import parse_qs, urlsplit
+
+import trello
+from PyQt5.QtCore import QCoreApplication
+
+from Trello.AsyncTrelloClient import TrelloRequestPool
+from Trello.TrelloActionSync import TrelloActionSync
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCardRecord import TrelloCardRecord
+from Trello.TrelloCardStore import TrelloCardStore
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+def make_card_json(card_id: str, list_id: str = "l1", name: str = None, label_ids: list = ()):
+    return dict(id=card_id, name=name or "Card %s" % card_id, desc="", idLabels=list(label_ids), idMembers=[],
+                closed=False, url="https://trello.com/c/%s" % card_id, pos=1024,
+                shortUrl="https://trello.com/c/%s" % card_id, idBoard="b1", idList=list_id, idShort=1,
+                dateLastActivity="2017-03-01T10:00:00.000Z")
+
+
+def make_action(action_id: str, action_type: str, card: dict, **data):
+    return dict(id=action_id, type=action_type, date="2017-03-02T10:00:00.000Z", data=dict(data, card=card))
+
+
+class ActionsClient(PooledTrelloClient):
+    """
+        Serves a board's actions feed (newest first) and cards
+    """
+    def __init__(self, actions: list, cards: dict):
+        PooledTrelloClient.__init__(self, TrelloSessionPool(), "key")
+        self.actions = actions
+        self.cards = cards
+        self.queries = []
+
+    def respond(self, route: str):
+        url = urlsplit(route)
+        if url.path.endswith("/actions"):
+            query = {name: values[0] for name, values in parse_qs(url.query).items()}
+            self.queries.append(query)
+            action_ids = [action["id"] for action in self.actions]
+            actions = self.actions[:action_ids.index(query["since"])] if "since" in query else self.actions
+            return actions[:int(query["limit"])]
+        return self.cards[url.path.split("/")[2]]
+
+    def fetch_json(self, uri_path, http_method='GET', headers=None, query_params=None, post_args=None, files=None):
+        if uri_path == "/batch":
+            return [{"200": self.respond(route)} for route in query_params["urls"].split(",")]
+        return self.respond(uri_path)
+
+
+class TestTrelloActionSync(unittest.TestCase):
+    def setUp(self):
+        self.pool = TrelloRequestPool()
+        self.store = TrelloCardStore()
+        self.client = ActionsClient([make_action("a0", "createCard", dict(id="c1"))],
+                                    dict(c4=make_card_json("c4", "l2")))
+        self.board = trello.Board(self.client, "b1")
+        self.store.add_cards([TrelloCardRecord.from_json(make_card_json(card_id))
+                              for card_id in ("c1", "c2", "c3")])
+        self.sync = TrelloActionSync(self.store, TrelloBatcher(self.pool))
+        self.synced = []
+        self.sync.cards_synced.connect(lambda board_id, card_ids: self.synced.append((board_id, sorted(card_ids))))
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.pool.thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def test_sync(self):
+        # The first sync only records the feed's position
+        self.sync.sync(self.board)
+        self.wait(lambda: self.sync.get_last_action_id("b1") == "a0")
+        self.assertEqual([], self.synced)
+
+        self.client.actions[:0] = [
+            make_action("a4", "createCard", dict(id="c4"), list=dict(id="l2")),
+            make_action("a3", "deleteCard", dict(id="c3")),
+            make_action("a2", "updateCard", dict(id="c2", idList="l2"), old=dict(idList="l1"),
+                        listBefore=dict(id="l1"), listAfter=dict(id="l2")),
+            make_action("a1", "updateCard", dict(id="c1", name="Renamed", desc="New description"),
+                        old=dict(name="Card c1", desc="")),
+        ]
+        card_1 = self.store.get_card("c1")
+        self.sync.sync(self.board)
+        self.wait(lambda: len(self.synced) == 2)
+
+        self.assertEqual("a0", self.client.queries[-1]["since"])
+        self.assertEqual("a4", self.sync.get_last_action_id("b1"))
+        self.assertEqual([("b1", ["c1", "c2", "c3"]), ("b1", ["c4"])], self.synced)
+        self.assertIsNone(self.store.get_card("c3"))
+        self.assertEqual("l2", self.store.get_card("c2").idList)
+        self.assertEqual("l2", self.store.get_card("c4").idList)
+
+        # Changes make new records
+        self.assertEqual("Card c1", card_1.name)
+        self.assertEqual("Renamed", self.store.get_card("c1").name)
+        self.assertEqual("New description", self.store.get_card("c1").desc)
+        self.assertNotIn("desc", self.store.get_card("c1").lazy_fields)
+
+    def test_label_changes(self):
+        self.sync.data["last_action_ids"]["b1"] = "a0"
+        self.client.cards["c1"] = make_card_json("c1", label_ids=["lb1"])
+        self.client.actions[:0] = [make_action("a1", "addLabelToCard", dict(id="c1"), label=dict(id="lb1"))]
+        self.sync.sync(self.board)
+
+        # The card is fetched again for its label ids
+        self.wait(lambda: len(self.synced) == 1)
+        self.assertEqual([("b1", ["c1"])], self.synced)
+        self.assertEqual(("lb1",), self.store.get_card("c1").idLabels)
+
+    def test_board_changed(self):
+        changed = []
+        self.sync.board_changed.connect(changed.append)
+        self.sync.data["last_action_ids"]["b1"] = "a0"
+        self.client.actions[:0] = [dict(id="a1", type="createLabel", date="2017-03-02T10:00:00.000Z",
+                                        data=dict(label=dict(id="lb1", name="Label", color="green")))]
+        self.sync.sync(self.board)
+        self.wait(lambda: len(changed) == 1)
+        self.assertEqual(["b1"], changed)
+        self.assertEqual([], self.synced)
+
+    def test_stale(self):
+        stale = []
+        self.sync.board_stale.connect(stale.append)
+        self.sync.data["last_action_ids"]["b1"] = "a0"
+        self.client.actions[:0] = [make_action("a%i" % i, "updateCard", dict(id="c1", name="%i" % i),
+                                               old=dict(name="")) for i in range(1000, 0, -1)]
+        self.sync.sync(self.board)
+        self.wait(lambda: len(stale) == 1)
+        self.assertEqual([], self.synced)
+        self.assertEqual("Card c1", self.store.get_card("c1").name)
+
+
+if __name__ == '__main__':
+    unittest.main()
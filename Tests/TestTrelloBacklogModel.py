@@ -0,0 +1,105 @@
+import datetime
+import time
+import unittest
+
+from PyQt5.QtCore import QCoreApplication
+
+from Models.ExtendableSortFilterProxyModel import ExtendableSortFilterProxyModel
+from Models.Trello.TrelloBacklogModel import TrelloBacklogModel
+from Models.Trello.TrelloCardsModel import TrelloCardsModelColumns
+from Tests.FakeTrelloServer import FakeTrelloServer
+from Trello.AsyncTrelloClient import TrelloRequestPool
+from Trello.TrelloCardStore import TrelloCardStore
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class TestTrelloBacklogModel(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeTrelloServer()
+        self.server.scale(2, 2, 2)
+        self.server.start()
+        self.session_pool = TrelloSessionPool(backoff_base=0.01)
+        self.client = PooledTrelloClient(self.session_pool, "key", "secret", "token", "token_secret",
+                                         api_url=self.server.api_url)
+        self.board_ids = [board["id"] for board in self.server.boards]
+        self.list_ids = [[trello_list["id"] for trello_list in self.server.lists[board_id]]
+                         for board_id in self.board_ids]
+
+        self.backlog = TrelloBacklogModel()
+        self.backlog.add_board(self.board_ids[0])
+        self.backlog.add_list(self.list_ids[1][0])
+
+    def tearDown(self):
+        # Outlives the test, as long as the shared store holds on to it
+        TrelloCardStore.shared().cards_added.disconnect(self.backlog.on_cards_added)
+        self.session_pool.adapter.close()
+        self.server.stop()
+        TrelloCardStore.shared().clear()
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            TrelloRequestPool.shared().thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def get_names(self, model) -> list:
+        return [model.data(model.index(row, TrelloCardsModelColumns.name)) for row in range(model.rowCount())]
+
+    def test_sources(self):
+        self.backlog.set_client(self.client)
+        self.wait(lambda: self.backlog.rowCount() == 6)
+        # Both sources in one batch
+        self.assertEqual(1, self.server.stats["requests"])
+        self.assertEqual(["Card 1"] * 3 + ["Card 0"] * 3, self.get_names(self.backlog))
+        self.assertEqual({self.list_ids[1][0]}, {self.backlog.get_card(row).idList for row in range(6)
+                                                 if self.backlog.get_card(row).idBoard == self.board_ids[1]})
+
+        self.backlog.remove_board(self.board_ids[0])
+        self.assertEqual(2, self.backlog.rowCount())
+
+    def test_filters(self):
+        self.backlog.set_client(self.client)
+        self.wait(lambda: self.backlog.rowCount() == 6)
+        proxy = ExtendableSortFilterProxyModel()
+        proxy.setSourceModel(self.backlog)
+
+        proxy.set_column_filter(TrelloCardsModelColumns.due, TrelloBacklogModel.due_before(
+            datetime.datetime(2017, 12, 5, tzinfo=datetime.timezone.utc)))
+        self.assertEqual(["Card 1"] * 3, self.get_names(proxy))
+        proxy.set_column_filter(TrelloCardsModelColumns.due, TrelloBacklogModel.due_before(
+            datetime.datetime(2017, 12, 4, tzinfo=datetime.timezone.utc)))
+        self.assertEqual(0, proxy.rowCount())
+
+        proxy.set_column_filter(TrelloCardsModelColumns.due)
+        label_id = self.backlog.get_card(5).idLabels[0]
+        proxy.set_column_filter(TrelloCardsModelColumns.idLabels, TrelloBacklogModel.has_labels([label_id]))
+        self.assertEqual(["Card 0"] * 3, self.get_names(proxy))
+
+    def test_incremental(self):
+        self.backlog.set_client(self.client)
+        self.wait(lambda: self.backlog.rowCount() == 6)
+        store = TrelloCardStore.shared()
+        moved_card = self.backlog.get_card(0)
+        closed_card = self.backlog.get_card(1)
+        renamed_card = self.backlog.get_card(2)
+
+        # Fetched elsewhere with the list fields only, the backlog keeps the due date it knows
+        store.add_cards([moved_card.replace(idList="elsewhere", idBoard="elsewhere"),
+                         closed_card.replace(closed=True),
+                         renamed_card.replace(name="Renamed", lazy_fields=frozenset(("due",)))])
+        self.assertEqual(4, self.backlog.rowCount())
+        self.assertEqual("Renamed", self.backlog.get_card(0).name)
+        self.assertEqual(renamed_card.due, self.backlog.get_card(0).due)
+
+        # Deleted, as the action sync reports it
+        deleted_card_id = self.backlog.get_card(3).id
+        store.remove_cards([deleted_card_id])
+        self.backlog.on_cards_synced(self.board_ids[0], [deleted_card_id])
+        self.assertEqual(3, self.backlog.rowCount())
+
+
+if __name__ == '__main__':
+    unittest.main()
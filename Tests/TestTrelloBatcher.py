@@ -0,0 +1,157 @@
+import time
+import unittest
+
+from PyQt5.QtCore import QCoreApplication
+from trello.exceptions import ResourceUnavailable
+
+from Trello.AsyncTrelloClient import TrelloRequestPool, TrelloRequestPriority
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class BatchRecordingClient(PooledTrelloClient):
+    """
+        Answers batch requests from a dict of route -> JSON, missing routes fail with a 404
+        Routes in failures answer with their listed status codes first
+    """
+    def __init__(self, responses: dict, failures: dict = None):
+        PooledTrelloClient.__init__(self, TrelloSessionPool(backoff_base=0.01), "key")
+        self.responses = responses
+        self.failures = failures if failures is not None else dict()
+        self.requests = []
+
+    def respond(self, route: str) -> dict:
+        if len(self.failures.get(route, [])):
+            return {str(self.failures[route].pop(0)): "failed"}
+        if route in self.responses:
+            return {"200": self.responses[route]}
+        return {"404": "not found"}
+
+    def fetch_json(self, uri_path, http_method='GET', headers=None, query_params=None, post_args=None, files=None):
+        self.requests.append((uri_path, query_params))
+        if uri_path == "/batch":
+            return [self.respond(route) for route in query_params["urls"].split(",")]
+        return self.responses[uri_path]
+
+
+class TestTrelloBatcher(unittest.TestCase):
+    def setUp(self):
+        self.pool = TrelloRequestPool()
+        self.batcher = TrelloBatcher(self.pool)
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.pool.thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def test_batch(self):
+        routes = ["/lists/%i/cards/open" % i for i in range(12)]
+        client = BatchRecordingClient({route: [i] for i, route in enumerate(routes)})
+        results = dict()
+        for i in range(12):
+            self.batcher.get(client, "/lists/%i/cards/open" % i, converter=lambda json_obj: json_obj[0] * 2,
+                             slot_callback=lambda result, i=i: results.__setitem__(i, result))
+
+        self.wait(lambda: len(results) == 12)
+        self.assertEqual({i: i * 2 for i in range(12)}, results)
+        self.assertEqual(["/batch", "/batch"], [uri_path for uri_path, query_params in client.requests])
+        self.assertEqual([2, 10], sorted(len(query_params["urls"].split(","))
+                                         for uri_path, query_params in client.requests))
+
+    def test_single_and_errors(self):
+        client = BatchRecordingClient({"/boards/b1/lists?cards=none&filter=all": ["list"]})
+        results = []
+        errors = []
+        self.batcher.get(client, "/boards/b1/lists", dict(cards="none", filter="all"), slot_callback=results.append)
+        self.wait(lambda: len(results) == 1)
+        self.assertEqual([["list"]], results)
+        self.assertEqual("/boards/b1/lists?cards=none&filter=all", client.requests[0][0])
+
+        self.batcher.get(client, "/boards/b1/lists", dict(cards="none", filter="all"), slot_callback=results.append)
+        self.batcher.get(client, "/boards/b2/lists", error_callback=errors.append)
+        self.wait(lambda: len(errors) == 1)
+        self.assertEqual(2, len(results))
+        self.assertIsInstance(errors[0], ResourceUnavailable)
+
+    def test_retry_routes(self):
+        client = BatchRecordingClient({"/lists/l1/cards/open": ["a"], "/lists/l2/cards/open": ["b"]},
+                                      {"/lists/l2/cards/open": [429, 503]})
+        results = dict()
+        for list_id in ("l1", "l2"):
+            self.batcher.get(client, "/lists/%s/cards/open" % list_id,
+                             slot_callback=lambda result, list_id=list_id: results.__setitem__(list_id, result))
+
+        self.wait(lambda: len(results) == 2)
+        self.assertEqual(dict(l1=["a"], l2=["b"]), results)
+        self.assertEqual(["/lists/l1/cards/open,/lists/l2/cards/open", "/lists/l2/cards/open",
+                          "/lists/l2/cards/open"], [query_params["urls"] for uri_path, query_params in client.requests])
+        self.assertEqual(2, client.session_pool.get_stats()["retries"])
+
+    def test_merge(self):
+        client = BatchRecordingClient({"/lists/l1/cards/open": ["card"]})
+        results = []
+        for i in range(3):
+            self.batcher.get(client, "/lists/l1/cards/open", slot_callback=results.append)
+        self.batcher.get(client, "/lists/l1/cards/open", slot_callback=results.append).cancel()
+
+        self.wait(lambda: len(results) == 3)
+        self.assertEqual(1, len(client.requests))
+        self.assertEqual(dict(), self.batcher.routes)
+
+    def test_merge_converters(self):
+        client = BatchRecordingClient({"/lists/l1/cards/open": [1, 2]})
+        results = dict()
+        self.batcher.get(client, "/lists/l1/cards/open", converter=len,
+                         slot_callback=lambda result: results.__setitem__("len", result))
+        self.batcher.get(client, "/lists/l1/cards/open", converter=len,
+                         slot_callback=lambda result: results.__setitem__("len_2", result))
+        self.batcher.get(client, "/lists/l1/cards/open", converter=sum,
+                         slot_callback=lambda result: results.__setitem__("sum", result))
+        self.batcher.get(client, "/lists/l1/cards/open", slot_callback=lambda result: results.__setitem__("raw", result))
+
+        self.wait(lambda: len(results) == 4)
+        self.assertEqual(dict(len=2, len_2=2, sum=3, raw=[1, 2]), results)
+        self.assertEqual(1, len(client.requests))
+
+    def test_merge_priority(self):
+        client = BatchRecordingClient({"/lists/l1/cards/open": []})
+        request = self.batcher.get(client, "/lists/l1/cards/open", priority=TrelloRequestPriority.Low)
+        self.batcher.get(client, "/lists/l1/cards/open", priority=TrelloRequestPriority.High)
+        self.assertEqual(TrelloRequestPriority.High, request.priority)
+        self.batcher.get(client, "/lists/l1/cards/open", priority=TrelloRequestPriority.Normal)
+        self.assertEqual(TrelloRequestPriority.High, request.priority)
+        self.batcher.flush()
+        self.wait(lambda: len(self.batcher.routes) == 0)
+
+    def test_route_encoding(self):
+        self.assertEqual("/cards/c1?fields=name%2Cdesc", PooledTrelloClient.make_route("cards/c1",
+                                                                                       dict(fields="name,desc")))
+
+
+    def test_failing_callback_and_short_response(self):
+        routes = ["/lists/%i/cards/open" % i for i in range(3)]
+        client = BatchRecordingClient({route: [i] for i, route in enumerate(routes)})
+        respond = client.fetch_json
+        # The batch response misses the last route
+        client.fetch_json = lambda uri_path, **kwargs: respond(uri_path, **kwargs)[:-1]
+        results = []
+        errors = []
+
+        def fail(result):
+            raise RuntimeError("callback failed")
+
+        self.batcher.get(client, routes[0], slot_callback=fail)
+        self.batcher.get(client, routes[1], slot_callback=results.append)
+        self.batcher.get(client, routes[2], slot_callback=results.append, error_callback=errors.append)
+        self.wait(lambda: len(errors) == 1)
+        self.assertEqual([[1]], results)
+        self.assertIsInstance(errors[0], ResourceUnavailable)
+        self.assertEqual(502, errors[0]._status)
+
+
+if __name__ == '__main__':
+    unittest.main()
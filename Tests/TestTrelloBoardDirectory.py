@@ -0,0 +1,91 @@
+import time
+import unittest
+
+import trello
+from PyQt5.QtCore import QCoreApplication
+
+from Tests.TestTrelloCardRecord import make_card_json
+from Trello.AsyncTrelloClient import TrelloRequestPool
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloBoardDirectory import TrelloBoardDirectory
+from Trello.TrelloCardRecord import TrelloCardRecord
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class DirectoryClient(PooledTrelloClient):
+    """
+        Serves the labels and members of board b1
+    """
+    def __init__(self):
+        PooledTrelloClient.__init__(self, TrelloSessionPool(), "key")
+        self.labels = [dict(id="lb1", name="Feature", color="green"), dict(id="lb2", name="Bug", color="red")]
+        self.members = [dict(id="m1", fullName="Ada Lovelace", username="ada", initials="AL", avatarUrl=None)]
+        self.routes = []
+
+    def respond(self, route: str) -> dict:
+        path = route.split("?")[0]
+        if path == "/boards/b1/labels":
+            return {"200": self.labels}
+        if path == "/boards/b1/members":
+            return {"200": self.members}
+        return {"404": "not found"}
+
+    def fetch_json(self, uri_path, http_method='GET', headers=None, query_params=None, post_args=None, files=None):
+        routes = query_params["urls"].split(",") if uri_path == "/batch" else [uri_path]
+        self.routes.extend(routes)
+        return [self.respond(route) for route in routes]
+
+
+class TestTrelloBoardDirectory(unittest.TestCase):
+    def setUp(self):
+        self.pool = TrelloRequestPool()
+        self.directory = TrelloBoardDirectory(TrelloBatcher(self.pool))
+        self.client = DirectoryClient()
+        self.board = trello.Board(self.client, "b1")
+        self.updated = []
+        self.directory.board_updated.connect(self.updated.append)
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.pool.thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def test_resolve(self):
+        self.directory.request_board(self.board)
+        self.directory.request_board(self.board)
+        self.wait(lambda: len(self.updated) == 1)
+        self.assertEqual(2, len(self.client.routes))
+
+        card = TrelloCardRecord.from_json(make_card_json("c1", idLabels=["lb2", "lb3"], idMembers=["m1"]))
+        self.assertEqual(["red"], [label.color for label in self.directory.get_card_labels(card)])
+        self.assertEqual(["AL"], [member.initials for member in self.directory.get_card_members(card)])
+        self.assertEqual("Feature", self.directory.get_label("b1", "lb1").name)
+        self.assertIsNone(self.directory.get_member("b2", "m1"))
+
+        # Known boards aren't fetched again
+        self.directory.request_board(self.board)
+        self.assertEqual(dict(), self.directory.pending_requests)
+
+    def test_board_changed(self):
+        self.directory.request_board(self.board)
+        self.wait(lambda: len(self.updated) == 1)
+
+        self.client.labels.append(dict(id="lb3", name="Chore", color=None))
+        self.directory.on_board_changed("b1")
+        self.wait(lambda: len(self.updated) == 2)
+        self.assertEqual(4, len(self.client.routes))
+        self.assertEqual("Chore", self.directory.get_label("b1", "lb3").name)
+
+    def test_error(self):
+        self.directory.request_board(trello.Board(self.client, "b2"))
+        self.wait(lambda: len(self.directory.pending_requests) == 0)
+        self.assertEqual([], self.updated)
+        self.assertIsNone(self.directory.get_label("b2", "lb1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
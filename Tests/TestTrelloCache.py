@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import trello
+
+from Trello.TrelloCache import TrelloCache
+from Trello.TrelloCardRecord import TrelloCardRecord, TRELLO_CARD_LAZY_FIELDS
+
+
+def make_card_json(card_id: str, name: str, date: str = "2017-03-01T10:00:00.000Z"):
+    return dict(id=card_id, name=name, desc="Description of %s" % name, due=None, closed=False,
+                url="https://trello.com/c/%s" % card_id, pos=1024, shortUrl="https://trello.com/c/%s" % card_id,
+                idMembers=["m1"], idLabels=["l1"], idBoard="b1", idList="l1", idShort=1,
+                labels=[dict(id="l1", name="Label", color="green")], dateLastActivity=date)
+
+
+class TestTrelloCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = TrelloCache(os.path.join(self.cache_dir, "TrelloCache"))
+        self.client = trello.TrelloClient("key")
+        self.board = trello.Board.from_json(self.client, json_obj=dict(id="b1", name="Board", closed=False,
+                                                                       url="https://trello.com/b/b1",
+                                                                       dateLastActivity="2017-03-01T10:00:00.000Z"))
+        self.list = trello.List.from_json(self.board, dict(id="l1", name="List", closed=False, pos=1))
+
+    def tearDown(self):
+        self.cache.flush()
+        shutil.rmtree(self.cache_dir)
+
+    def test_empty(self):
+        self.assertEqual([], self.cache.load_boards(self.client))
+        self.assertEqual([], self.cache.load_lists(self.board))
+        self.assertEqual([], self.cache.load_cards(self.list))
+
+    def test_round_trip(self):
+        cards = [TrelloCardRecord.from_json(make_card_json("c%i" % i, "Card %i" % i)) for i in range(3)]
+        self.assertTrue(self.cache.store_boards([self.board]))
+        self.assertTrue(self.cache.store_lists(self.board.id, [self.list]))
+        self.assertTrue(self.cache.store_cards(self.list.id, cards))
+
+        boards = self.cache.load_boards(self.client)
+        self.assertEqual(["b1"], [board.id for board in boards])
+        self.assertEqual(self.board.date_last_activity, boards[0].date_last_activity)
+        self.assertIs(self.client, boards[0].client)
+
+        lists = self.cache.load_lists(boards[0])
+        self.assertEqual([("l1", "List", False, 1)], [(l.id, l.name, l.closed, l.pos) for l in lists])
+
+        cached_cards = self.cache.load_cards(lists[0])
+        self.assertEqual([TrelloCache.card_to_json(card) for card in cards],
+                         [TrelloCache.card_to_json(card) for card in cached_cards])
+        self.assertTrue(cached_cards[0].is_loaded())
+
+    def test_lazy_fields(self):
+        card_json = {field: value for field, value in make_card_json("c1", "Card").items()
+                     if field not in TRELLO_CARD_LAZY_FIELDS}
+        card = TrelloCardRecord.from_json(card_json)
+        self.cache.store_cards(self.list.id, [card])
+
+        cached_card = self.cache.load_cards(self.list)[0]
+        self.assertEqual(set(TRELLO_CARD_LAZY_FIELDS), cached_card.lazy_fields)
+        self.assertEqual(TrelloCache.card_to_json(card), TrelloCache.card_to_json(cached_card))
+        self.assertNotIn("labels", TrelloCache.card_to_json(cached_card))
+
+    def test_replace(self):
+        self.cache.store_cards(self.list.id, [TrelloCardRecord.from_json(make_card_json("c1", "Old"))])
+        self.cache.store_cards(self.list.id, [TrelloCardRecord.from_json(make_card_json("c1", "New",
+                                                                                       "2017-03-02T10:00:00.000Z")),
+                                              TrelloCardRecord.from_json(make_card_json("c2", "Added"))])
+
+        self.assertEqual(["New", "Added"], [card.name for card in self.cache.load_cards(self.list)])
+
+    def test_background_write(self):
+        cards = [TrelloCardRecord.from_json(make_card_json("c1", "Card"))]
+        self.cache.store_cards(self.list.id, cards)
+        # Read back before it's written
+        self.assertEqual(["Card"], [card.name for card in self.cache.load_cards(self.list)])
+        self.cache.flush()
+        self.assertTrue(os.path.exists(os.path.join(self.cache.cache_dir, "cards_l1.json")))
+
+        # Unchanged, not written again
+        os.remove(os.path.join(self.cache.cache_dir, "cards_l1.json"))
+        self.cache.store_cards(self.list.id, cards)
+        self.cache.flush()
+        self.assertFalse(os.path.exists(os.path.join(self.cache.cache_dir, "cards_l1.json")))
+
+    def test_malformed(self):
+        os.makedirs(self.cache.cache_dir)
+        with open(os.path.join(self.cache.cache_dir, "boards.json"), "w") as fp:
+            fp.write("{not json")
+        self.assertEqual([], self.cache.load_boards(self.client))
+        for content in ("[]", "null", '{"version": 1}', '{"version": 1, "entries": [{}]}'):
+            with open(os.path.join(self.cache.cache_dir, "boards.json"), "w") as fp:
+                fp.write(content)
+            self.assertEqual([], self.cache.load_boards(self.client))
+
+        self.cache.clear()
+        self.assertEqual([], os.listdir(self.cache.cache_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+import time
+import unittest
+
+from PyQt5.QtCore import QCoreApplication
+
+from Models.Trello.TrelloCardsModel import TrelloCardsModelColumns
+from Models.Trello.TrelloSearchModel import TrelloSearchModel
+from Tests.TestTrelloCardRecord import make_card_json
+from Trello.TrelloCache import TrelloCache
+from Trello.TrelloCardIndex import TrelloCardIndex
+from Trello.TrelloCardRecord import TrelloCardRecord
+from Trello.TrelloCardStore import TrelloCardStore
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+def make_card(card_id: str, name: str, board_id: str = "b1", **fields):
+    card_json = make_card_json(card_id, **fields)
+    card_json.update(name=name, idBoard=board_id, **fields)
+    return TrelloCardRecord.from_json(card_json)
+
+
+class TestTrelloCardIndex(unittest.TestCase):
+    def setUp(self):
+        self.store = TrelloCardStore(max_boards=2)
+        self.store.add_cards([make_card("c1", "Write the report"),
+                              make_card("c2", "Review report draft", desc="Check the Figures", pos=2048)])
+        self.index = TrelloCardIndex(self.store)
+
+    def test_search(self):
+        self.assertEqual({"c1", "c2"}, self.index.search("report"))
+        self.assertEqual({"c1", "c2"}, self.index.search("REP"))
+        self.assertEqual({"c2"}, self.index.search("rep fig"))
+        self.assertEqual(set(), self.index.search("rep missing"))
+        self.assertEqual(set(), self.index.search("  "))
+
+    def test_incremental(self):
+        updates = []
+        self.index.index_updated.connect(lambda: updates.append(True))
+
+        self.store.add_cards([make_card("c1", "Write the summary"), make_card("c3", "Summary", board_id="b2")])
+        self.assertEqual({"c2"}, self.index.search("report"))
+        self.assertEqual({"c1", "c3"}, self.index.search("summ"))
+
+        # Unchanged text isn't indexed again, a new position reorders the results though
+        self.store.add_cards([make_card("c3", "Summary", board_id="b2", date="2017-03-02T10:00:00.000Z")])
+        self.assertEqual(1, len(updates))
+        self.store.add_cards([make_card("c3", "Summary", board_id="b2", pos=2048)])
+        self.assertEqual(2, len(updates))
+
+        self.store.remove_cards(["c1"])
+        self.assertEqual({"c3"}, self.index.search("summary"))
+        self.assertNotIn("write", self.index.tokens)
+
+        # Still found once evicted with its board
+        self.store.add_cards([make_card("c4", "Summary", board_id="b3")])
+        self.store.add_cards([make_card("c5", "Other", board_id="b1")])
+        self.assertIsNone(self.store.peek_card("c3"))
+        self.assertEqual({"c3", "c4"}, self.index.search("summary"))
+        self.assertEqual(["c3", "c4"], [card.id for card in self.index.search_cards("summary")])
+        self.assertEqual(sorted(self.index.tokens), self.index.tokens)
+
+    def test_cached_cards(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache = TrelloCache(cache_dir)
+        cache.store_cards("l1", [make_card("c1", "Write the old report"), make_card("c3", "Cached summary")])
+        cache.store_cards("l2", [make_card("c4", "Archived summary", date="2017-03-02T10:00:00.000Z")])
+        cache.flush()
+
+        updates = []
+        self.index.index_updated.connect(lambda: updates.append(True))
+        self.index.add_cached_cards(TrelloCache(cache_dir).load_all_cards())
+        self.assertEqual(1, len(updates))
+        self.assertEqual({"c3", "c4"}, self.index.search("summary"))
+        # The store's version of c1 isn't replaced by the cached one
+        self.assertEqual(set(), self.index.search("old"))
+
+    def test_search_model(self):
+        model = TrelloSearchModel(card_index=self.index)
+        model.set_query("report")
+        self.assertEqual(["c1", "c2"], [model.data(model.index(row, TrelloCardsModelColumns.id))
+                                        for row in range(model.rowCount())])
+
+        self.store.add_cards([make_card("c2", "Review draft", closed=True)])
+        self.assertEqual(1, model.rowCount())
+        model.set_query("")
+        self.assertEqual(0, model.rowCount())
+
+    def test_speed(self):
+        words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "theta", "kappa"]
+        self.store.set_max_boards(10)
+        for board_no in range(10):
+            self.store.add_cards([make_card("c%i.%i" % (board_no, card_no),
+                                            "%s %s task %i" % (words[card_no % 8], words[card_no // 8 % 8], card_no),
+                                            board_id="b%i" % board_no) for card_no in range(500)])
+        self.assertEqual(5002, len(self.index))
+
+        start_time = time.perf_counter()
+        for query in ("al", "alpha be", "task 49", "kap zeta 1"):
+            self.assertTrue(len(self.index.search(query)))
+        # Four queries well within a frame
+        self.assertLess(time.perf_counter() - start_time, 0.016)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+from PyQt5.QtCore import QCoreApplication
+from trello.exceptions import ResourceUnavailable
+
+from Tests.TestTrelloCardRecord import make_card_json, make_fields_json
+from Trello.AsyncTrelloClient import TrelloRequestPool
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCardLoader import TrelloCardLoader
+from Trello.TrelloCardRecord import TrelloCardRecord
+from Trello.TrelloCardStore import TrelloCardStore
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class FieldsClient(PooledTrelloClient):
+    """
+        Answers card requests with the requested lazy fields, and board requests with the board
+        Requests of the ids in failing fail with a 404
+    """
+    def __init__(self):
+        PooledTrelloClient.__init__(self, TrelloSessionPool(), "key")
+        self.routes = []
+        self.failing = set()
+
+    def fails(self, route: str) -> bool:
+        return route.split("?")[0].split("/")[2] in self.failing
+
+    def respond(self, route: str) -> dict:
+        collection, item_id = route.split("?")[0].split("/")[1:3]
+        if collection == "boards":
+            return dict(id=item_id, name="Board")
+        return make_fields_json(item_id)
+
+    def fetch_json(self, uri_path, http_method='GET', headers=None, query_params=None, post_args=None, files=None):
+        if uri_path == "/batch":
+            routes = query_params["urls"].split(",")
+            self.routes.extend(routes)
+            return [{"404": "not found"} if self.fails(route) else {"200": self.respond(route)} for route in routes]
+        self.routes.append(uri_path)
+        if self.fails(uri_path):
+            raise ResourceUnavailable("not found", SimpleNamespace(status_code=404))
+        return self.respond(uri_path)
+
+
+class TestTrelloCardLoader(unittest.TestCase):
+    def setUp(self):
+        self.pool = TrelloRequestPool()
+        self.store = TrelloCardStore()
+        self.loader = TrelloCardLoader(TrelloBatcher(self.pool), self.store)
+        self.client = FieldsClient()
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.pool.thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def test_load(self):
+        cards = [TrelloCardRecord.from_json(make_card_json("c%i" % i)) for i in range(3)]
+        self.store.add_cards(cards)
+        loaded = []
+        self.loader.fields_loaded.connect(loaded.extend)
+        for card in cards + cards:
+            self.loader.load(self.client, card)
+
+        self.wait(lambda: len(loaded) == 3)
+        self.assertEqual(["c0", "c1", "c2"], sorted(card.id for card in loaded))
+        self.assertEqual(3, len(self.client.routes))
+        self.assertTrue(all(card.is_loaded() for card in loaded))
+        self.assertFalse(any(card.is_loaded() for card in cards))
+
+        loaded_card = self.store.get_card("c1")
+        self.assertIn(loaded_card, loaded)
+        self.assertEqual("Description of c1", loaded_card.desc)
+        self.assertEqual("green", loaded_card.labels[0].color)
+
+        self.loader.load(self.client, loaded_card)
+        self.assertEqual(dict(), self.loader.loading)
+
+    def test_newer_card_kept(self):
+        card = TrelloCardRecord.from_json(make_card_json("c1"))
+        newer_card = TrelloCardRecord.from_json(make_card_json("c1", "2017-03-02T10:00:00.000Z"))
+        self.store.add_cards([newer_card])
+        loaded = []
+        self.loader.fields_loaded.connect(loaded.extend)
+        self.loader.load(self.client, card)
+
+        self.wait(lambda: len(loaded) == 1)
+        self.assertIs(newer_card, self.store.get_card("c1"))
+
+    def test_load_error(self):
+        card = TrelloCardRecord.from_json(make_card_json("c1"))
+        self.client.failing.add("c1")
+        self.loader.load(self.client, card)
+        self.wait(lambda: "c1" in self.loader.failures)
+        self.assertEqual(dict(), self.loader.loading)
+
+        # Not requested again before the retry delay passed
+        self.loader.load(self.client, card)
+        self.assertEqual(dict(), self.loader.loading)
+
+        loaded = []
+        self.loader.fields_loaded.connect(loaded.extend)
+        self.client.failing.clear()
+        self.loader.failures["c1"] = (1, 0)
+        self.loader.load(self.client, card)
+        self.wait(lambda: len(loaded) == 1)
+        self.assertEqual(dict(), self.loader.failures)
+        self.assertEqual(["/cards/c1?fields=due%2Clabels"] * 2, self.client.routes)
+
+    def test_load_related(self):
+        card = TrelloCardRecord.from_json(make_card_json("c1"))
+        boards = []
+        self.loader.load_related(self.client, card, "board", slot_callback=boards.append)
+
+        self.wait(lambda: len(boards) == 1)
+        self.assertEqual(dict(id="b1", name="Board"), boards[0])
+        self.assertEqual(["/boards/b1"], self.client.routes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from Trello.TrelloCardRecord import TrelloCardRecord, TrelloLabelRecord, TRELLO_CARD_LAZY_FIELDS
+
+
+def make_card_json(card_id: str, date: str = "2017-03-01T10:00:00.000Z", **fields):
+    fields.setdefault("desc", "Description of %s" % card_id)
+    fields.setdefault("idLabels", ["lb1"])
+    fields.setdefault("idMembers", ["m1"])
+    return dict(fields, id=card_id, name="Card %s" % card_id, closed=False, url="https://trello.com/c/%s" % card_id,
+                pos=1024, shortUrl="https://trello.com/c/%s" % card_id, idBoard="b1", idList="l1", idShort=1,
+                dateLastActivity=date)
+
+
+def make_fields_json(card_id: str):
+    return dict(id=card_id, desc="Description of %s" % card_id, due=None, idLabels=["lb1"], idMembers=["m1"],
+                labels=[dict(id="lb1", name="Label", color="green")])
+
+
+class TestTrelloCardRecord(unittest.TestCase):
+    def test_list_fields(self):
+        card = TrelloCardRecord.from_json(make_card_json("c1"))
+        self.assertFalse(card.is_loaded())
+        self.assertEqual(set(TRELLO_CARD_LAZY_FIELDS), card.lazy_fields)
+        self.assertIsNone(card.due)
+        self.assertEqual("Description of c1", card.desc)
+        self.assertEqual("Card c1", card.name)
+        self.assertEqual(2017, card.dateLastActivity.year)
+
+        # Full cards, as cached before, are loaded
+        card = TrelloCardRecord.from_json(make_card_json("c1", desc="", due=None, idLabels=[], idMembers=[],
+                                                         labels=[]))
+        self.assertTrue(card.is_loaded())
+
+    def test_immutable(self):
+        card = TrelloCardRecord.from_json(make_card_json("c1"))
+        with self.assertRaises(AttributeError):
+            card.name = "Renamed"
+        with self.assertRaises(AttributeError):
+            card.board = None
+        self.assertFalse(hasattr(card, "__dict__"))
+
+        renamed_card = card.replace(name="Renamed")
+        self.assertEqual("Card c1", card.name)
+        self.assertEqual("Renamed", renamed_card.name)
+        self.assertEqual(card.lazy_fields, renamed_card.lazy_fields)
+
+    def test_with_json(self):
+        card = TrelloCardRecord.from_json(make_card_json("c1")).with_json(dict(id="c1", due=None))
+        self.assertIsNone(card.due)
+        self.assertEqual({"labels"}, card.lazy_fields)
+
+        card = card.with_json(make_fields_json("c1"))
+        self.assertTrue(card.is_loaded())
+        self.assertEqual(("lb1",), card.idLabels)
+        self.assertEqual((TrelloLabelRecord("lb1", "Label", "green"),), card.labels)
+
+    def test_carry_over(self):
+        previous_card = TrelloCardRecord.from_json(make_card_json("c1")).with_json(make_fields_json("c1"))
+
+        card = TrelloCardRecord.from_json(make_card_json("c1")).carry_over(previous_card)
+        self.assertTrue(card.is_loaded())
+        self.assertEqual("Description of c1", card.desc)
+
+        # Changed since, the lazy fields have to be fetched again
+        card = TrelloCardRecord.from_json(make_card_json("c1", "2017-03-02T10:00:00.000Z"))
+        self.assertIs(card, card.carry_over(previous_card))
+
+
+if __name__ == '__main__':
+    unittest.main()
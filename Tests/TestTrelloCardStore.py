@@ -0,0 +1,62 @@
+import unittest
+from types import SimpleNamespace
+
+from PyQt5.QtCore import QCoreApplication
+
+from Trello.TrelloCardStore import TrelloCardStore
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+def make_card(card_id: str, board_id: str):
+    return SimpleNamespace(id=card_id, idBoard=board_id, name="Card %s" % card_id)
+
+
+class TestTrelloCardStore(unittest.TestCase):
+    def test_lookup(self):
+        store = TrelloCardStore()
+        added = []
+        store.cards_added.connect(added.append)
+        store.add_cards([make_card("c1", "b1"), make_card("c2", "b1"), make_card("c3", "b2")])
+
+        self.assertEqual(3, len(store))
+        self.assertEqual("b2", store.get_card("c3").idBoard)
+        self.assertIsNone(store.get_card("c4"))
+        self.assertEqual([["c1", "c2", "c3"]], added)
+
+        # Card moved to another board
+        store.add_cards([make_card("c1", "b2")])
+        self.assertEqual(["c2"], [card.id for card in store.get_board_cards("b1")])
+        self.assertEqual(3, len(store))
+
+        store.remove_cards(["c2", "c4"])
+        self.assertEqual([], store.get_board_cards("b1"))
+        self.assertEqual(2, len(store))
+
+    def test_eviction(self):
+        store = TrelloCardStore(max_boards=2)
+        removed = []
+        evicted = []
+        store.cards_removed.connect(removed.append)
+        store.cards_evicted.connect(evicted.append)
+        store.add_cards([make_card("c1", "b1")])
+        store.add_cards([make_card("c2", "b2")])
+
+        # Touching b1 makes b2 the least recently used board
+        self.assertIsNotNone(store.get_card("c1"))
+        store.add_cards([make_card("c3", "b3")])
+        self.assertIsNone(store.get_card("c2"))
+        self.assertIsNotNone(store.get_card("c1"))
+        self.assertEqual(2, len(store))
+
+        store.set_max_boards(1)
+        self.assertEqual(["c1"], [card_id for card_id in store.card_boards])
+
+        store.remove_board("b1")
+        self.assertEqual(0, len(store))
+        self.assertEqual([["c2"], ["c3"]], evicted)
+        self.assertEqual([["c1"]], removed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import shutil
+import tempfile
+import time
+import unittest
+
+from PyQt5.QtCore import QCoreApplication, Qt
+
+from Models.Trello.TrelloBoardsModel import TrelloBoardsModel
+from Models.Trello.TrelloCardsModel import TrelloCardsModel, TrelloCardsModelColumns
+from Models.Trello.TrelloListsModel import TrelloListsModel
+from Tests.FakeTrelloServer import FakeTrelloServer
+from Trello.AsyncTrelloClient import AsyncTrelloClient, AsyncTrelloWrapper, TrelloRequestPool
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCache import TrelloCache
+from Trello.TrelloPrefetcher import TrelloPrefetcher
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class TestTrelloModels(unittest.TestCase):
+    """
+        Drives the Trello models against the fake Trello server
+    """
+    def setUp(self):
+        self.server = FakeTrelloServer()
+        self.server.start()
+        self.session_pool = TrelloSessionPool(backoff_base=0.01)
+        self.trello_client = AsyncTrelloClient()
+        self.trello_client.client = PooledTrelloClient(self.session_pool, "key", "secret", "token", "token_secret",
+                                                       api_url=self.server.api_url)
+
+    def tearDown(self):
+        self.session_pool.adapter.close()
+        self.server.stop()
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            TrelloRequestPool.shared().thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def test_models(self):
+        boards_model = TrelloBoardsModel(self.trello_client)
+        boards_model.request_boards()
+        self.wait(lambda: boards_model.rowCount() == 1)
+        board = boards_model.get_board(0)
+        self.assertEqual("Tymbox", board.name)
+
+        lists_model = TrelloListsModel(self.trello_client)
+        lists_model.set_board(board)
+        self.wait(lambda: lists_model.rowCount() == 3)
+        self.assertEqual(["Backlog", "Doing", "Done"], [lists_model.get_list(row).name for row in range(3)])
+
+        cards_model = TrelloCardsModel()
+        cards_model.set_list(AsyncTrelloWrapper(lists_model.get_list(0)))
+        self.wait(lambda: cards_model.rowCount() == 2)
+        index = cards_model.index(0, TrelloCardsModelColumns.name)
+        self.assertEqual("Drag cards onto the timeline", cards_model.data(index, Qt.DisplayRole))
+        # The description is shown with the name, so it's fetched with the list
+        desc_index = cards_model.index(0, TrelloCardsModelColumns.desc)
+        self.assertTrue(cards_model.data(desc_index, Qt.DisplayRole).startswith("Dropped cards"))
+        self.assertIn("labels", cards_model.get_card(0).lazy_fields)
+
+        # The labels are fetched on first use
+        labels_index = cards_model.index(0, TrelloCardsModelColumns.labels)
+        self.assertIsNone(cards_model.data(labels_index, Qt.DisplayRole))
+        self.wait(lambda: cards_model.data(labels_index, Qt.DisplayRole) is not None)
+        self.assertEqual("Feature", cards_model.data(labels_index, Qt.DisplayRole)[0].name)
+
+    def test_board_switch(self):
+        self.server.scale(3, 2, 1)
+        self.server.latency = 0.05
+        boards_model = TrelloBoardsModel(self.trello_client)
+        boards_model.request_boards()
+        self.wait(lambda: boards_model.rowCount() == 3)
+
+        lists_model = TrelloListsModel(self.trello_client)
+        applied = []
+        lists_model.update_applied.connect(lambda: applied.append(lists_model.get_list(0).board.id))
+        for row in range(3):
+            lists_model.set_board(boards_model.get_board(row))
+            if row == 0:
+                # Sent before the selection moves on
+                TrelloBatcher.shared().flush()
+        self.wait(lambda: len(applied) == 1)
+
+        # The lists of the first board were superseded while in flight, those of the second board never sent
+        last_board_id = boards_model.get_board(2).id
+        self.wait(lambda: self.server.stats["requests"] == 3 and
+                  TrelloRequestPool.shared().thread_pool.activeThreadCount() == 0)
+        app.processEvents()
+        self.assertEqual([last_board_id], applied)
+
+    def test_rate_limited(self):
+        # The quota reported in the headers holds the next request back instead of running into a 429
+        self.server.rate_limit = 1
+        self.server.rate_limit_interval = 0.3
+
+        boards_model = TrelloBoardsModel(self.trello_client)
+        boards_model.request_boards()
+        self.wait(lambda: boards_model.rowCount() == 1)
+        lists_model = TrelloListsModel(self.trello_client)
+        lists_model.set_board(boards_model.get_board(0))
+        self.wait(lambda: lists_model.rowCount() == 3)
+
+        self.assertEqual(0, self.server.stats["rate_limited"])
+        self.assertGreater(self.session_pool.get_stats()["throttled_time"], 0.1)
+    def test_prefetched_selection(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache = TrelloCache(cache_dir)
+        prefetcher = TrelloPrefetcher(cache)
+        boards_model = TrelloBoardsModel(self.trello_client)
+        boards_model.request_boards()
+        self.wait(lambda: boards_model.rowCount() == 1)
+        board = boards_model.get_board(0)
+        list_id = self.server.lists[board.id][0]["id"]
+
+        prefetcher.remember_selection(board.id, list_id)
+        prefetcher.prefetch([board])
+        self.wait(lambda: not len(prefetcher.pending_requests))
+        requests = self.server.stats["requests"]
+
+        # Restoring the last selection reuses the prefetched lists and cards
+        lists_model = TrelloListsModel(self.trello_client)
+        lists_model.set_cache(cache)
+        lists_model.set_prefetcher(prefetcher)
+        lists_model.set_board(board)
+        self.assertEqual(3, lists_model.rowCount())
+        cards_model = TrelloCardsModel()
+        cards_model.set_cache(cache)
+        cards_model.set_prefetcher(prefetcher)
+        cards_model.set_list(AsyncTrelloWrapper(lists_model.get_list(0)))
+        self.assertEqual(2, cards_model.rowCount())
+        TrelloBatcher.shared().flush()
+        self.assertEqual(requests, self.server.stats["requests"])
+
+        # Selected again later, the lists are refreshed
+        lists_model.set_board(board)
+        TrelloBatcher.shared().flush()
+        self.wait(lambda: self.server.stats["requests"] == requests + 1)
+        cache.flush()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import threading
+import time
+import unittest
+
+from PyQt5.QtCore import QCoreApplication
+
+from Trello.AsyncTrelloClient import TrelloRequestPool
+from Trello.TrelloOAuth import TrelloOAuth
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class FakeOAuthServer(object):
+    """
+        Hands out a request token and accepts the verifier "1234"
+    """
+    def __init__(self):
+        self.verifiers = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def fetch_request_token(self, key, secret):
+        self.release.wait(5)
+        return "owner_key_%s" % key, "owner_secret"
+
+    def fetch_access_token(self, key, secret, resource_owner_key, resource_owner_secret, oauth_verifier):
+        self.verifiers.append(oauth_verifier)
+        if oauth_verifier != "1234":
+            raise ValueError("Invalid verifier")
+        return "token", "token_secret"
+
+
+class TestTrelloOAuth(unittest.TestCase):
+    def setUp(self):
+        self.pool = TrelloRequestPool()
+        self.server = FakeOAuthServer()
+        self.oauth = TrelloOAuth(self.pool, verifier_delay=0.05)
+        self.oauth.fetch_request_token = self.server.fetch_request_token
+        self.oauth.fetch_access_token = self.server.fetch_access_token
+        self.urls = []
+        self.configs = []
+        self.failures = []
+        self.oauth.authorize_url_ready.connect(self.urls.append)
+        self.oauth.authorized.connect(self.configs.append)
+        self.oauth.failed.connect(self.failures.append)
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.pool.thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def type_verifier(self, text: str):
+        for i in range(1, len(text) + 1):
+            self.oauth.set_verifier(text[:i])
+            app.processEvents()
+
+    def test_authorize(self):
+        self.oauth.request("key", "secret")
+        self.assertEqual([], self.urls)
+        self.wait(lambda: len(self.urls) == 1)
+        self.assertIn("oauth_token=owner_key_key", self.urls[0])
+
+        # Typing only tries the settled verifier, once
+        self.type_verifier("12")
+        self.wait(lambda: len(self.failures) == 1)
+        self.oauth.set_verifier("12 ")
+        self.type_verifier("1234")
+        self.wait(lambda: len(self.configs) == 1)
+        self.assertEqual(["12", "1234"], self.server.verifiers)
+
+        config = self.configs[0]
+        self.assertEqual(dict(api_key="key", api_secret="secret", token="token", token_secret="token_secret"),
+                         config.client_config)
+
+    def test_verifier_before_token(self):
+        self.server.release.clear()
+        self.oauth.request("key", "secret")
+        self.type_verifier("1234")
+        time.sleep(0.1)
+        app.processEvents()
+        self.assertEqual([], self.server.verifiers)
+
+        self.server.release.set()
+        self.wait(lambda: len(self.configs) == 1)
+
+    def test_superseded_request(self):
+        self.server.release.clear()
+        self.oauth.request("old", "secret")
+        self.oauth.request("new", "secret")
+        self.server.release.set()
+        self.wait(lambda: len(self.urls) == 1 and len(self.pool.active_requests) == 0)
+        app.processEvents()
+        self.assertEqual(1, len(self.urls))
+        self.assertIn("oauth_token=owner_key_new", self.urls[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from Trello.TrelloRateLimiter import TrelloRateLimiter
+from Trello.TrelloSessionPool import TrelloSessionPool
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """
+        Answers with the next status code of the server's script, 200 once it's exhausted
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def respond(self):
+        status_code = self.server.script.pop(0) if len(self.server.script) else 200
+        body = b'{}'
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status_code == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTrelloRateLimiter(unittest.TestCase):
+    def test_window(self):
+        limiter = TrelloRateLimiter(max_requests=3, interval=0.2)
+        waits = [limiter.acquire() for i in range(4)]
+        self.assertTrue(all(wait < 0.05 for wait in waits[:3]))
+        self.assertGreater(waits[3], 0.1)
+
+    def test_headers_block(self):
+        limiter = TrelloRateLimiter()
+        limiter.update_from_headers({"x-rate-limit-api-token-remaining": "0",
+                                     "x-rate-limit-api-token-interval-ms": "100"})
+        self.assertGreater(limiter.acquire(), 0.05)
+
+    def test_priority(self):
+        limiter = TrelloRateLimiter(max_requests=1, interval=0.2)
+        limiter.acquire()
+        order = []
+
+        def acquire(priority):
+            limiter.acquire(priority)
+            order.append(priority)
+
+        threads = [threading.Thread(target=acquire, args=(priority,)) for priority in (0, 2, 1)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual([2, 1, 0], order)
+
+    def test_retry(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+        server.daemon_threads = True
+        server.script = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://127.0.0.1:%i/1/boards" % server.server_port
+        pool = TrelloSessionPool(max_retries=2, backoff_base=0.01)
+
+        try:
+            server.script = [429, 503]
+            self.assertEqual(200, pool.request("GET", url).status_code)
+            self.assertEqual(dict(requests=3, retries=2, rate_limited=1, failures=0),
+                             {name: value for name, value in pool.get_stats().items() if name != "throttled_time"})
+
+            # Retries give up after max_retries
+            server.script = [500, 500, 500, 500]
+            self.assertEqual(500, pool.request("GET", url).status_code)
+            self.assertEqual(1, pool.get_stats()["failures"])
+
+            # Only idempotent requests are retried
+            server.script = [503]
+            self.assertEqual(503, pool.request("POST", url).status_code)
+            self.assertEqual(2, pool.get_stats()["failures"])
+            self.assertEqual(7, pool.get_stats()["requests"])
+        finally:
+            pool.adapter.close()
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+
+import trello
+from PyQt5.QtCore import QCoreApplication
+
+from Trello.AsyncTrelloClient import GenericMethodCall, TrelloRequestPool
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class BlockingService(object):
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def fetch(self, value, scale=1):
+        self.calls.append(value)
+        self.release.wait(5)
+        if value is None:
+            raise ValueError("No value")
+        return value * scale
+
+
+class TestTrelloRequestPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = TrelloRequestPool()
+        self.service = BlockingService()
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.pool.thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def test_merge_in_flight(self):
+        results = []
+        first = self.pool.submit(self.service.fetch, (2,), dict(scale=3), slot_callback=results.append, merge=True)
+        second = self.pool.submit(self.service.fetch, (2,), dict(scale=3), slot_callback=results.append, merge=True)
+        other = self.pool.submit(self.service.fetch, (2,), dict(), slot_callback=results.append, merge=True)
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+        self.service.release.set()
+        self.wait(lambda: len(results) == 3 and len(self.pool.active_requests) == 0)
+        self.assertEqual([2, 6, 6], sorted(results))
+        self.assertEqual(2, len(self.service.calls))
+        self.assertEqual(dict(), self.pool.in_flight)
+
+        # Finished calls aren't merged
+        self.pool.submit(self.service.fetch, (2,), dict(scale=3), slot_callback=results.append, merge=True)
+        self.wait(lambda: len(results) == 4)
+        self.assertEqual(3, len(self.service.calls))
+
+    def test_merge_errors(self):
+        errors = []
+        self.pool.submit(self.service.fetch, (None,), dict(), error_callback=errors.append, merge=True)
+        self.pool.submit(self.service.fetch, (None,), dict(), error_callback=errors.append, merge=True)
+
+        self.service.release.set()
+        self.wait(lambda: len(errors) == 2)
+        self.assertEqual(1, len(self.service.calls))
+
+    def test_unhashable_arguments(self):
+        results = []
+        self.service.release.set()
+        self.pool.submit(self.service.fetch, ([1],), dict(), slot_callback=results.append, merge=True)
+        self.pool.submit(self.service.fetch, ([1],), dict(), slot_callback=results.append, merge=True)
+        self.wait(lambda: len(results) == 2)
+        self.assertEqual(2, len(self.service.calls))
+
+    def test_merge_opt_in(self):
+        results = []
+        first = self.pool.submit(self.service.fetch, (2,), dict(), slot_callback=results.append)
+        second = self.pool.submit(self.service.fetch, (2,), dict(), slot_callback=results.append)
+        self.assertIsNot(first, second)
+
+        self.service.release.set()
+        self.wait(lambda: len(results) == 2)
+        self.assertEqual(2, len(self.service.calls))
+
+    def test_cancel(self):
+        results = []
+        self.pool.set_max_concurrency(1)
+        self.pool.submit(self.service.fetch, (1,), dict(), slot_callback=results.append)
+        cancelled = self.pool.submit(self.service.fetch, (2,), dict(), slot_callback=results.append, merge=True)
+        shared = self.pool.submit(self.service.fetch, (3,), dict(), slot_callback=results.append, merge=True)
+        self.pool.submit(self.service.fetch, (3,), dict(), slot_callback=results.append, merge=True)
+        cancelled.cancel()
+        # Still wanted by the other call merged into it
+        shared.cancel()
+
+        # A cancelled call isn't joined
+        self.assertIsNot(cancelled, self.pool.submit(self.service.fetch, (2,), dict(), merge=True))
+
+        self.service.release.set()
+        self.wait(lambda: len(self.pool.active_requests) == 0)
+        self.assertEqual([1, 3, 2], self.service.calls)
+        self.assertEqual(dict(), self.pool.in_flight)
+
+    def test_read_only_methods(self):
+        self.assertTrue(GenericMethodCall.is_read_only(self.service.fetch, dict()))
+        self.assertTrue(GenericMethodCall.is_read_only(trello.Board.all_lists, dict()))
+        self.assertFalse(GenericMethodCall.is_read_only(trello.List.add_card, dict()))
+        self.assertFalse(GenericMethodCall.is_read_only(trello.Card.comment, dict()))
+        self.assertTrue(GenericMethodCall.is_read_only(trello.TrelloClient.fetch_json, dict()))
+        self.assertFalse(GenericMethodCall.is_read_only(trello.TrelloClient.fetch_json, dict(http_method="POST")))
+
+
+if __name__ == '__main__':
+    unittest.main()
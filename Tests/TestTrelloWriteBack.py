@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from PyQt5.QtCore import QCoreApplication
+from trello.exceptions import ResourceUnavailable
+
+from Trello.AsyncTrelloClient import TrelloRequestPool
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+from Trello.TrelloWriteBack import TrelloWriteBack
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class WriteRecordingClient(PooledTrelloClient):
+    """
+        Records writes, writes to paths in failures fail with their listed status codes first
+    """
+    def __init__(self, failures: dict = None):
+        PooledTrelloClient.__init__(self, TrelloSessionPool(), "key")
+        self.failures = failures if failures is not None else dict()
+        self.writes = []
+
+    def fetch_json(self, uri_path, http_method='GET', headers=None, query_params=None, post_args=None, files=None):
+        if len(self.failures.get(uri_path, [])):
+            raise ResourceUnavailable("Failed", SimpleNamespace(status_code=self.failures[uri_path].pop(0)))
+        self.writes.append((http_method, uri_path, query_params))
+        return dict()
+
+
+class TestTrelloWriteBack(unittest.TestCase):
+    def setUp(self):
+        self.pool = TrelloRequestPool()
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.temp_dir, "write_back.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_write_back(self) -> TrelloWriteBack:
+        return TrelloWriteBack(self.file_name, self.pool, flush_delay=0, backoff_base=0.01)
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.pool.thread_pool.waitForDone(10)
+            app.processEvents()
+        self.assertTrue(condition())
+
+    def test_coalesce(self):
+        write_back = self.make_write_back()
+        write_back.add_comment("c1", "Spent 30 minutes")
+        write_back.set_due("c1", "2017-03-01T10:00:00.000Z")
+        write_back.move_card("c1", "l1")
+        write_back.move_card("c1", "l2")
+        write_back.add_comment("c1", "Done")
+        write_back.add_comment("c2", "Spent 5 minutes")
+
+        client = WriteRecordingClient()
+        write_back.set_client(client)
+        self.wait(lambda: len(client.writes) == 3 and len(write_back) == 0)
+        self.assertEqual([("PUT", "/cards/c1", dict(due="2017-03-01T10:00:00.000Z", idList="l2", pos="bottom")),
+                          ("POST", "/cards/c1/actions/comments", dict(text="Spent 30 minutes\n\nDone")),
+                          ("POST", "/cards/c2/actions/comments", dict(text="Spent 5 minutes"))], client.writes)
+
+    def test_persistence(self):
+        write_back = self.make_write_back()
+        write_back.add_comment("c1", "Spent 30 minutes")
+
+        # Restarted before it was sent
+        write_back = self.make_write_back()
+        self.assertEqual(1, len(write_back))
+        client = WriteRecordingClient()
+        write_back.set_client(client)
+        self.wait(lambda: len(client.writes) == 1 and len(write_back) == 0)
+        self.assertEqual(0, len(self.make_write_back()))
+
+    def test_retry(self):
+        client = WriteRecordingClient({"/cards/c1/actions/comments": [503, 429],
+                                       "/cards/c2": [404]})
+        write_back = self.make_write_back()
+        written = []
+        write_back.card_written.connect(written.append)
+        write_back.set_client(client)
+        write_back.move_card("c1", "l2")
+        write_back.add_comment("c1", "Spent 30 minutes")
+        write_back.add_comment("c2", "Deleted card")
+        write_back.set_fields("c2", closed=True)
+
+        self.wait(lambda: written == ["c1"] and len(write_back) == 0)
+        # The move went through the first time and isn't sent again, the update of the deleted card is dropped
+        self.assertEqual([("PUT", "/cards/c1", dict(idList="l2", pos="bottom")),
+                          ("POST", "/cards/c1/actions/comments", dict(text="Spent 30 minutes"))], client.writes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,11 @@
 import datetime
 import unittest
+from types import SimpleNamespace
+
 from PyQt5.QtCore import Qt
 
 from Models.Tymbox.TymboxModel import TymboxModel, TymboxTask, TymboxTaskTimePreference, TymboxModelColumns
+from Trello.TrelloCardStore import TrelloCardStore
 from Utils.LogHelper import LogLevel
 
 
@@ -40,5 +43,39 @@ class TestTymboxModel(unittest.TestCase):
         self.assertEqual(midnight + 60 * 60 * 2, model.data(model.index(0, TymboxModelColumns.start_time), Qt.EditRole))
         self.assertEqual(midnight + 60 * 60 * 2 + 60 * 45, model.data(model.index(0, TymboxModelColumns.end_time), Qt.EditRole))
 
+    def test_card_renamed(self):
+        model = TymboxModel()
+        model.import_tasks([dict(type="TrelloTask", name="Old name", start_time=60*60, end_time=2*60*60,
+                                 time_preference="preferred", preference_value=60*60, trello_card_id="c1")])
+        changed = []
+        model.dataChanged.connect(lambda top_left, bottom_right: changed.append(top_left.column()))
+
+        TrelloCardStore.shared().add_cards([SimpleNamespace(id="c1", idBoard="b1", name="New name")])
+        self.assertEqual("New name", model.data(model.index(0, TymboxModelColumns.name), Qt.DisplayRole))
+        self.assertEqual([TymboxModelColumns.name], changed)
+
+        # Unchanged name, no update
+        TrelloCardStore.shared().add_cards([SimpleNamespace(id="c1", idBoard="b1", name="New name")])
+        self.assertEqual(1, len(changed))
+        TrelloCardStore.shared().remove_board("b1")
+
+    def test_remove_task_signal(self):
+        model = TymboxModel()
+        task_json = dict(type="Task", name="Task", start_time=60*60, end_time=2*60*60, time_preference="preferred",
+                         preference_value=60*60)
+        model.import_tasks([task_json, dict(task_json, name="Other task", start_time=3*60*60, end_time=4*60*60,
+                                            preference_value=3*60*60)])
+        removed = []
+        model.task_about_to_be_removed.connect(lambda task: removed.append(task.name))
+
+        model.remove_task(1)
+        self.assertEqual(["Other task"], removed)
+        self.assertEqual(1, model.rowCount())
+
+        # Replacing the tasks isn't a removal by the user
+        model.import_tasks([task_json], replace=True)
+        self.assertEqual(["Other task"], removed)
+        self.assertEqual(1, model.rowCount())
+
 if __name__ == '__main__':
     unittest.main()
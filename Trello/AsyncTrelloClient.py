@@ -1,33 +1,213 @@
 from __future__ import unicode_literals
 
+from enum import IntEnum
+
 import trello
-from PyQt5.QtCore import QThread, pyqtSignal, Qt, QObject
+from PyQt5.QtCore import pyqtSignal, Qt, QObject, QRunnable, QThreadPool, pyqtSlot
 from Trello.TrelloConfig import TrelloConfig
+from Trello.TrelloRateLimiter import TrelloRateLimiter
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloSessionPool
+from Utils.LogHelper import LogHelper
 
 
 trello.Organization.TIMEZONE = "UTC"
 
-class GenericMethodThread(QThread):
+# Name prefixes of the py-trello methods that only read, identical calls to these may share one request
+READ_ONLY_METHOD_PREFIXES = ("get_", "list_", "all_", "open_", "closed_", "fetch", "search")
+
+class TrelloRequestPriority(IntEnum):
+    Low     = 0
+    Normal  = 1
+    High    = 2
 
+class TrelloRequest(QObject):
+    """
+        A call to a blocking Trello method executed on the request pool
+        The result (or raised exception) is delivered through queued signals
+    """
     sig_data = pyqtSignal(object, name="sig_data")
+    sig_error = pyqtSignal(object, name="sig_error")
+    sig_finished = pyqtSignal(name="sig_finished")
 
-    def __init__(self, method, parent=None):
-        QThread.__init__(self, parent)
+    def __init__(self, method, args, kwargs, priority: TrelloRequestPriority):
+        QObject.__init__(self)
         self.method = method
-
-    def __call__(self, *args, **kwargs):
         self.args = args
         self.kwargs = kwargs
-        if "slot_callback" in kwargs:
-            self.sig_data.connect(kwargs["slot_callback"], Qt.QueuedConnection)
-            del kwargs["slot_callback"]
-        self.start()
+        self.priority = priority
+        self.key = None
+        self.logs_errors = False
+        self.waiters = 1
+        self.cancelled = False
+        self.finished = False
+
+    def cancel(self):
+        """
+            Withdraws one of the calls sharing the request, once all are withdrawn the method isn't called if it
+            hasn't been started yet
+        """
+        self.waiters -= 1
+        if self.waiters <= 0:
+            self.cancelled = True
 
     def run(self):
+        if self.cancelled:
+            self.sig_finished.emit()
+            return
+
+        TrelloRateLimiter.set_thread_priority(self.priority)
+        try:
+            result = self.method(*self.args, **self.kwargs)
+        except Exception as e:
+            self.sig_error.emit(e)
+        else:
+            self.sig_data.emit(result)
+        finally:
+            self.sig_finished.emit()
+
+class TrelloRequestRunnable(QRunnable):
+    def __init__(self, request: TrelloRequest):
+        QRunnable.__init__(self)
+        self.request = request
+        self.setAutoDelete(True)
+
+    def run(self):
+        self.request.run()
+
+class TrelloRequestPool(QObject, LogHelper):
+    """
+        Shared, bounded pool executing Trello requests off the GUI thread
+        Queued requests are started highest priority first, a mergeable call identical to one still in flight is merged
+        into it
+    """
+    shared_pool = None
+
+    def __init__(self, max_concurrency: int = 4, parent=None, session_pool: TrelloSessionPool = None):
+        """
+        :param session_pool: Sessions the requests are sent with, kept sized to the number of workers
+        """
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloRequestPool")
+        self.session_pool = session_pool
+        self.thread_pool = QThreadPool(self)
+        self.set_max_concurrency(max_concurrency)
+        self.active_requests = set()
+        self.in_flight = dict()
+        self.merged_requests = 0
+
+    @staticmethod
+    def shared() -> 'TrelloRequestPool':
+        if TrelloRequestPool.shared_pool is None:
+            TrelloRequestPool.shared_pool = TrelloRequestPool(session_pool=TrelloSessionPool.shared())
+        return TrelloRequestPool.shared_pool
+
+    def set_max_concurrency(self, max_concurrency: int):
+        self.thread_pool.setMaxThreadCount(max_concurrency)
+        if self.session_pool is not None:
+            self.session_pool.set_max_connections(max_concurrency)
+
+    def get_max_concurrency(self) -> int:
+        return self.thread_pool.maxThreadCount()
+
+    def submit(self, method, args: tuple, kwargs: dict, slot_callback=None, error_callback=None,
+               priority: TrelloRequestPriority = TrelloRequestPriority.Normal, merge: bool = False) -> TrelloRequest:
+        """
+            Queues a call to method
+        :param slot_callback: Receives the return value of method (on the GUI thread)
+        :param error_callback: Receives the exception raised by method, errors are logged when not given
+        :param priority: Queue priority of the request
+        :param merge: Joins the identical call (same method and arguments) that is still in flight, only safe for
+                      calls without side effects
+        """
+        key = self.__get_request_key(method, args, kwargs) if merge else None
+        request = self.in_flight.get(key) if key is not None else None
+        if request is not None and not request.cancelled:
+            request.waiters += 1
+            self.__connect_callbacks(request, slot_callback, error_callback)
+            self.merged_requests += 1
+            self.log_extra_debug("Merged request", method=getattr(method, "__name__", method),
+                                 merged_requests=self.merged_requests)
+            return request
+
+        request = TrelloRequest(method, args, kwargs, priority)
+        if key is not None:
+            # Connected ahead of the callbacks, so a call made from a callback starts a new request
+            request.key = key
+            self.in_flight[key] = request
+            request.sig_data.connect(self.on_request_replied, Qt.QueuedConnection)
+            request.sig_error.connect(self.on_request_replied, Qt.QueuedConnection)
+        self.__connect_callbacks(request, slot_callback, error_callback)
+        request.sig_finished.connect(self.on_request_finished, Qt.QueuedConnection)
+
+        self.active_requests.add(request)
+        self.thread_pool.start(TrelloRequestRunnable(request), priority)
+        self.log_extra_debug("Queued request", method=getattr(method, "__name__", method), priority=priority.name,
+                             active=len(self.active_requests))
+        return request
+
+    @staticmethod
+    def __get_request_key(method, args: tuple, kwargs: dict):
+        """
+            Identifies a call by the (unbound) method, the object it's bound to and its arguments
+        :return: None when the arguments aren't hashable, such calls are never merged
+        """
+        key = (getattr(method, "__func__", method), id(getattr(method, "__self__", None)), args,
+               frozenset(kwargs.items()))
         try:
-            self.sig_data.emit(self.method(*self.args, **self.kwargs))
-        except:
-            self.sig_data.emit(None)
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def __connect_callbacks(self, request: TrelloRequest, slot_callback, error_callback):
+        if slot_callback is not None:
+            request.sig_data.connect(slot_callback, Qt.QueuedConnection)
+        if error_callback is not None:
+            request.sig_error.connect(error_callback, Qt.QueuedConnection)
+        elif not request.logs_errors:
+            request.logs_errors = True
+            request.sig_error.connect(self.on_request_error, Qt.QueuedConnection)
+
+    @pyqtSlot(object)
+    def on_request_replied(self, result):
+        request = self.sender()
+        if self.in_flight.get(request.key) is request:
+            del self.in_flight[request.key]
+
+    @pyqtSlot(object)
+    def on_request_error(self, error):
+        self.log_error("Unhandled Trello request error", error=error)
+
+    @pyqtSlot()
+    def on_request_finished(self):
+        request = self.sender()
+        request.finished = True
+        if request.key is not None and self.in_flight.get(request.key) is request:
+            del self.in_flight[request.key]
+        self.active_requests.discard(request)
+
+class GenericMethodCall(object):
+    """
+        Callable stand-in for a blocking Trello method, calls are queued on the request pool
+    """
+    def __init__(self, method, pool: TrelloRequestPool):
+        self.method = method
+        self.pool = pool
+
+    @staticmethod
+    def is_read_only(method, kwargs: dict) -> bool:
+        """
+            Whether a call only reads from Trello, going by the method's name
+        """
+        name = getattr(method, "__name__", "")
+        if name == "fetch_json":
+            return kwargs.get("http_method", "GET") == "GET"
+        return name.startswith(READ_ONLY_METHOD_PREFIXES)
+
+    def __call__(self, *args, slot_callback=None, error_callback=None,
+                 priority: TrelloRequestPriority = TrelloRequestPriority.Normal, **kwargs) -> TrelloRequest:
+        return self.pool.submit(self.method, args, kwargs, slot_callback, error_callback, priority,
+                                merge=self.is_read_only(self.method, kwargs))
 
 
 # noinspection PyAbstractClass
@@ -45,17 +225,22 @@ class AsyncTrelloClient(trello.TrelloClient, QObject):
             self.setup_from_config(config)
 
     def setup_from_config(self, config: TrelloConfig):
-        self.client = trello.TrelloClient(**config.client_config)
+        self.client = PooledTrelloClient(TrelloSessionPool.shared(), **config.client_config)
         self.config_updated.emit()
 
+    def set_max_concurrency(self, max_concurrency: int):
+        TrelloRequestPool.shared().set_max_concurrency(max_concurrency)
+
     def __getattribute__(self, item):
         client_obj = super(AsyncTrelloClient, self).__getattribute__("client")
-        attr = client_obj.__getattribute__(item) if client_obj is not None else None
-        if attr is not None:
+        if client_obj is not None:
+            try:
+                attr = getattr(client_obj, item)
+            except AttributeError:
+                return super(AsyncTrelloClient, self).__getattribute__(item)
             if callable(attr):
-                return GenericMethodThread(attr, self)
-            else:
-                return attr
+                return GenericMethodCall(attr, TrelloRequestPool.shared())
+            return attr
         return super(AsyncTrelloClient, self).__getattribute__(item)
 
 
@@ -66,10 +251,11 @@ class AsyncTrelloWrapper(QObject):
         self.trello_obj = trello_obj
 
     def __getattribute__(self, item):
-        attr = super(AsyncTrelloWrapper, self).__getattribute__("trello_obj").__getattribute__(item)
-        if attr is not None:
-            if callable(attr):
-                return GenericMethodThread(attr, self)
-            else:
-                return attr
-        return super(AsyncTrelloWrapper, self).__getattribute__(item)
\ No newline at end of file
+        trello_obj = super(AsyncTrelloWrapper, self).__getattribute__("trello_obj")
+        try:
+            attr = getattr(trello_obj, item)
+        except AttributeError:
+            return super(AsyncTrelloWrapper, self).__getattribute__(item)
+        if callable(attr):
+            return GenericMethodCall(attr, TrelloRequestPool.shared())
+        return attr
@@ -0,0 +1,196 @@
+import trello
+from dateutil import parser as dateparser
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from Trello.AsyncTrelloClient import TrelloRequestPriority
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCardRecord import TrelloCardRecord, TRELLO_CARD_LIST_FIELDS, TRELLO_CARD_LAZY_FIELDS
+from Trello.TrelloCardStore import TrelloCardStore
+from Utils.JsonSettings import load_json_settings, save_json_settings
+from Utils.LogHelper import LogHelper
+
+
+# Board actions that create, change, move or remove cards
+TRELLO_SYNC_ACTION_TYPES = ("createCard", "copyCard", "convertToCardFromCheckItem", "updateCard", "deleteCard",
+                            "moveCardToBoard", "moveCardFromBoard", "addLabelToCard", "removeLabelFromCard",
+                            "addMemberToCard", "removeMemberFromCard")
+
+# Board actions that change the board's labels or members
+TRELLO_SYNC_BOARD_ACTION_TYPES = ("createLabel", "updateLabel", "deleteLabel", "addMemberToBoard",
+                                  "removeMemberFromBoard")
+
+# Most actions Trello returns per request, a board with more new actions than this is refetched as a whole
+TRELLO_SYNC_ACTIONS_LIMIT = 1000
+
+class TrelloActionSync(QObject, LogHelper):
+    """
+        Keeps the card store up to date with a board's actions feed
+        The id of the last action seen is recorded per board, each poll only asks for the actions since. Changes make
+        new records of the stored cards, cards the store doesn't know are fetched. cardsSynced tells the models which
+        cards changed, boardChanged that the board's labels or members did
+    """
+    cards_synced = pyqtSignal(str, list, name="cardsSynced")
+    board_changed = pyqtSignal(str, name="boardChanged")
+    board_stale = pyqtSignal(str, name="boardStale")
+
+    def __init__(self, card_store: TrelloCardStore = None, batcher: TrelloBatcher = None, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloActionSync")
+        self.card_store = card_store if card_store is not None else TrelloCardStore.shared()
+        self.batcher = batcher if batcher is not None else TrelloBatcher.shared()
+        self.board = None
+        self.pending_requests = dict()
+
+        self.data = dict(enabled=True,
+                         interval=30,
+                         last_action_ids=dict())
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+
+    def load_from_file(self, file_name) -> bool:
+        data = load_json_settings(file_name)
+        if data is None:
+            return False
+        self.data.update(data)
+        return True
+
+    def save_to_file(self, file_name) -> bool:
+        return save_json_settings(file_name, self.data)
+
+    def set_enabled(self, enabled: bool):
+        self.data["enabled"] = enabled
+        self.__update_timer()
+
+    def set_interval(self, interval: int):
+        """
+        :param interval: Seconds between polls of the board
+        """
+        self.data["interval"] = interval
+        self.__update_timer()
+
+    def set_board(self, board: trello.Board):
+        """
+            Polls the board from now on, instead of the previous one
+        """
+        self.board = board
+        self.__update_timer()
+
+    def get_last_action_id(self, board_id: str) -> str:
+        return self.data["last_action_ids"].get(board_id)
+
+    def __update_timer(self):
+        if self.data["enabled"] and self.board is not None:
+            self.poll_timer.start(self.data["interval"] * 1000)
+        else:
+            self.poll_timer.stop()
+
+    @pyqtSlot()
+    def poll(self):
+        if self.board is not None:
+            self.sync(self.board)
+
+    def sync(self, board: trello.Board):
+        """
+            Requests the board's new actions, the first sync of a board only records where its feed stands
+        """
+        if board.id in self.pending_requests:
+            return
+
+        last_action_id = self.get_last_action_id(board.id)
+        query_params = dict(filter=",".join(TRELLO_SYNC_ACTION_TYPES + TRELLO_SYNC_BOARD_ACTION_TYPES),
+                            fields="type,date,data")
+        if last_action_id is None:
+            query_params["limit"] = 1
+        else:
+            query_params["limit"] = TRELLO_SYNC_ACTIONS_LIMIT
+            query_params["since"] = last_action_id
+
+        self.pending_requests[board.id] = self.batcher.get(
+            board.client, "/boards/%s/actions" % board.id, query_params,
+            slot_callback=lambda actions: self.on_got_actions(board, last_action_id, actions),
+            error_callback=lambda error: self.on_sync_error(board, error),
+            priority=TrelloRequestPriority.Low)
+
+    def on_got_actions(self, board: trello.Board, since_action_id: str, actions: list):
+        self.pending_requests.pop(board.id, None)
+        if len(actions):
+            # Newest first
+            self.data["last_action_ids"][board.id] = actions[0]["id"]
+
+        if since_action_id is None:
+            self.log_debug("Board feed position recorded", board_id=board.id)
+            return
+        if len(actions) >= TRELLO_SYNC_ACTIONS_LIMIT:
+            self.log_info("Too many actions to sync, board is stale", board_id=board.id)
+            self.board_stale.emit(board.id)
+            return
+
+        if any(action["type"] in TRELLO_SYNC_BOARD_ACTION_TYPES for action in actions):
+            self.board_changed.emit(board.id)
+
+        changed_cards = dict()
+        removed_card_ids = set()
+        fetched_card_ids = set()
+        for action in reversed(actions):
+            card_id = action["data"].get("card", dict()).get("id")
+            if card_id is None:
+                continue
+            card = changed_cards.get(card_id) or self.card_store.get_card(card_id)
+            action_type = action["type"]
+
+            if action_type in ("deleteCard", "moveCardFromBoard"):
+                changed_cards.pop(card_id, None)
+                fetched_card_ids.discard(card_id)
+                removed_card_ids.add(card_id)
+            elif action_type in ("createCard", "copyCard", "convertToCardFromCheckItem", "moveCardToBoard") or \
+                    (card is None and "listAfter" in action["data"]):
+                # Created, or moved into a list the store may hold
+                fetched_card_ids.add(card_id)
+            elif card is not None and action_type != "updateCard":
+                # Label and member changes, the card's label and member ids are fetched again
+                fetched_card_ids.add(card_id)
+            elif card is not None:
+                changed_cards[card_id] = self.__apply_action(card, action)
+
+        self.card_store.remove_cards(removed_card_ids)
+        self.card_store.add_cards(list(changed_cards.values()))
+        for card_id in fetched_card_ids:
+            self.__fetch_card(board, card_id)
+
+        self.log_debug("Board synced", board_id=board.id, actions=len(actions), changed=len(changed_cards),
+                       removed=len(removed_card_ids), fetched=len(fetched_card_ids))
+        if len(changed_cards) or len(removed_card_ids):
+            self.cards_synced.emit(board.id, list(changed_cards.keys()) + list(removed_card_ids))
+
+    @staticmethod
+    def __apply_action(card: TrelloCardRecord, action: dict) -> TrelloCardRecord:
+        """
+            Returns a record of the card with the action's changes
+        """
+        date = dateparser.parse(action["date"])
+        action_data = action["data"]
+        fields = {field: action_data["card"][field] for field in action_data.get("old", dict())
+                  if field in action_data["card"] and field in TRELLO_CARD_LIST_FIELDS + TRELLO_CARD_LAZY_FIELDS and
+                  field not in ("dateLastActivity", "labels")}
+        return card.with_json(fields).replace(dateLastActivity=date,
+                                              **{field: value for field, value in fields.items()
+                                                 if field in TRELLO_CARD_LIST_FIELDS})
+
+    def __fetch_card(self, board: trello.Board, card_id: str):
+        self.batcher.get(board.client, "/cards/%s" % card_id, dict(fields=",".join(TRELLO_CARD_LIST_FIELDS)),
+                         converter=TrelloCardRecord.from_json,
+                         slot_callback=lambda card: self.on_got_card(board, card),
+                         error_callback=lambda error: self.on_card_error(card_id, error),
+                         priority=TrelloRequestPriority.Low)
+
+    def on_got_card(self, board: trello.Board, card: TrelloCardRecord):
+        self.card_store.add_cards([card])
+        self.cards_synced.emit(board.id, [card.id])
+
+    def on_card_error(self, card_id: str, error):
+        self.log_warning("Unable to fetch synced card", card_id=card_id, error=error)
+
+    def on_sync_error(self, board: trello.Board, error):
+        self.pending_requests.pop(board.id, None)
+        self.log_warning("Unable to sync board", board_id=board.id, error=error)
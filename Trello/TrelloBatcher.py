@@ -0,0 +1,181 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSlot
+from trello.exceptions import ResourceUnavailable
+
+from Trello.AsyncTrelloClient import TrelloRequestPool, TrelloRequestPriority
+from Trello.TrelloSessionPool import PooledTrelloClient, TrelloBatchItemResponse, TRELLO_BATCH_MAX_URLS
+from Utils.LogHelper import LogHelper
+
+
+class TrelloBatchedGet(object):
+    """
+        A GET request waiting to be sent as part of a batch
+    """
+    def __init__(self, route: str, converter, slot_callback, error_callback, priority: TrelloRequestPriority):
+        self.route = route
+        self.converter = converter
+        self.slot_callback = slot_callback
+        self.error_callback = error_callback
+        self.priority = priority
+        self.cancelled = False
+        self.finished = False
+        self.followers = []
+
+    def cancel(self):
+        """
+            Drops the request if it hasn't been sent yet, its callbacks won't be called either way
+        """
+        self.cancelled = True
+
+    @property
+    def wanted(self) -> bool:
+        """
+            Whether the request or any request merged into it still awaits the response
+        """
+        return not self.cancelled or any(not follower.cancelled for follower in self.followers)
+
+class TrelloBatcher(QObject, LogHelper):
+    """
+        Groups the GET requests queued within one event loop pass into Trello batch requests
+        Requests are sent TRELLO_BATCH_MAX_URLS routes at a time through the request pool, a lone request is sent as
+        a plain GET. A route that is already pending or in flight isn't requested again, the response is shared and
+        converted once per distinct converter
+    """
+    shared_batcher = None
+
+    def __init__(self, pool: TrelloRequestPool, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloBatcher")
+        self.pool = pool
+        self.pending = dict()
+        self.routes = dict()
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(0)
+        self.flush_timer.timeout.connect(self.flush)
+
+    @staticmethod
+    def shared() -> 'TrelloBatcher':
+        if TrelloBatcher.shared_batcher is None:
+            TrelloBatcher.shared_batcher = TrelloBatcher(TrelloRequestPool.shared())
+        return TrelloBatcher.shared_batcher
+
+    def get(self, client: PooledTrelloClient, uri_path: str, query_params: dict = None, converter=None,
+            slot_callback=None, error_callback=None,
+            priority: TrelloRequestPriority = TrelloRequestPriority.Normal) -> TrelloBatchedGet:
+        """
+            Queues a GET request
+        :param client: The client to send the request with
+        :param converter: Turns the decoded JSON into the value passed to slot_callback, called on a pool thread
+        :param slot_callback: Receives the (converted) response on the GUI thread
+        :param error_callback: Receives the exception the request failed with, errors are logged when not given
+        """
+        request = TrelloBatchedGet(PooledTrelloClient.make_route(uri_path, query_params), converter, slot_callback,
+                                   error_callback, priority)
+        primary = self.routes.get((client, request.route))
+        if primary is not None:
+            # Only has an effect while the primary is still pending
+            primary.priority = max(primary.priority, priority)
+            primary.followers.append(request)
+            self.log_extra_debug("Merged request", route=request.route)
+            return request
+
+        self.routes[(client, request.route)] = request
+        self.pending.setdefault(client, []).append(request)
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+        return request
+
+    @pyqtSlot()
+    def flush(self):
+        self.flush_timer.stop()
+        pending = self.pending
+        self.pending = dict()
+
+        for client, requests in pending.items():
+            for request in requests:
+                if not request.wanted:
+                    del self.routes[(client, request.route)]
+            requests = [request for request in requests if request.wanted]
+            for start in range(0, len(requests), TRELLO_BATCH_MAX_URLS):
+                batch = requests[start:start + TRELLO_BATCH_MAX_URLS]
+                self.log_extra_debug("Sending batch", routes=[request.route for request in batch])
+                self.pool.submit(self.__run_batch, (client, batch), dict(),
+                                 slot_callback=lambda outcomes, client=client: self.on_batch_done(client, outcomes),
+                                 priority=max(request.priority for request in batch))
+
+    @staticmethod
+    def __run_batch(client: PooledTrelloClient, batch: list) -> list:
+        """
+            Sends a batch, runs on a pool thread
+        :return: (request, response, conversions, error) for every request of the batch, conversions maps the
+                 converters of the request and its followers to (result, error)
+        """
+        if len(batch) == 1:
+            try:
+                results = [client.fetch_json(batch[0].route)]
+            except Exception as e:
+                results = [e]
+        else:
+            try:
+                results = client.fetch_batch([request.route for request in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+        results = list(results)
+        for request in batch[len(results):]:
+            results.append(ResourceUnavailable("No response at %s" % request.route,
+                                               TrelloBatchItemResponse(502, "No response")))
+
+        outcomes = []
+        for request, result in zip(batch, results):
+            if isinstance(result, Exception):
+                outcomes.append((request, None, dict(), result))
+                continue
+            conversions = dict()
+            # Followers may still be added on the GUI thread, those are converted on delivery
+            for waiter in [request] + list(request.followers):
+                if waiter.converter is not None and waiter.converter not in conversions:
+                    conversions[waiter.converter] = TrelloBatcher.__convert(waiter.converter, result)
+            outcomes.append((request, result, conversions, None))
+        return outcomes
+
+    @staticmethod
+    def __convert(converter, response) -> tuple:
+        try:
+            return converter(response), None
+        except Exception as e:
+            return None, e
+
+    def on_batch_done(self, client: PooledTrelloClient, outcomes: list):
+        for request, response, conversions, error in outcomes:
+            del self.routes[(client, request.route)]
+            request.finished = True
+            for follower in request.followers:
+                follower.finished = True
+
+        for request, response, conversions, error in outcomes:
+            for waiter in [request] + request.followers:
+                if waiter.cancelled:
+                    continue
+                if error is not None or waiter.converter is None:
+                    self.__deliver(waiter, response, error)
+                    continue
+                if waiter.converter not in conversions:
+                    conversions[waiter.converter] = self.__convert(waiter.converter, response)
+                self.__deliver(waiter, *conversions[waiter.converter])
+
+    def __deliver(self, request: TrelloBatchedGet, result, error):
+        # A failing callback mustn't keep the rest of the batch from being delivered
+        try:
+            self.__call_back(request, result, error)
+        except Exception as e:
+            self.log_error("Trello request callback failed", route=request.route, error=e)
+
+    def __call_back(self, request: TrelloBatchedGet, result, error):
+        if error is not None:
+            if request.error_callback is not None:
+                request.error_callback(error)
+            else:
+                self.log_error("Unhandled Trello request error", route=request.route, error=error)
+        elif request.slot_callback is not None:
+            request.slot_callback(result)
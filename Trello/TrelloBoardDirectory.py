@@ -0,0 +1,117 @@
+from collections import namedtuple
+
+import trello
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from Trello.AsyncTrelloClient import TrelloRequestPriority
+from Trello.TrelloActionSync import TrelloActionSync
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCardRecord import TrelloCardRecord, TrelloLabelRecord
+from Utils.LogHelper import LogHelper
+
+
+TrelloMemberRecord = namedtuple("TrelloMemberRecord", ("id", "fullName", "username", "initials", "avatarUrl"))
+
+# Member fields fetched per board
+TRELLO_DIRECTORY_MEMBER_FIELDS = ("fullName", "username", "initials", "avatarUrl")
+
+class TrelloBoardDirectory(QObject, LogHelper):
+    """
+        Labels and members of boards, fetched once per board, so the labels and members of any card resolve from
+        its idLabels and idMembers without requests
+        A board is fetched again when its actions feed reports label or member changes, or when it's stale
+    """
+    shared_directory = None
+
+    board_updated = pyqtSignal(str, name="boardUpdated")
+
+    def __init__(self, batcher: TrelloBatcher = None, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloBoardDirectory")
+        self.batcher = batcher if batcher is not None else TrelloBatcher.shared()
+        self.boards = dict()
+        self.labels = dict()
+        self.members = dict()
+        self.pending_requests = dict()
+
+    @staticmethod
+    def shared() -> 'TrelloBoardDirectory':
+        if TrelloBoardDirectory.shared_directory is None:
+            TrelloBoardDirectory.shared_directory = TrelloBoardDirectory()
+        return TrelloBoardDirectory.shared_directory
+
+    def set_action_sync(self, action_sync: TrelloActionSync):
+        action_sync.board_changed.connect(self.on_board_changed)
+        action_sync.board_stale.connect(self.on_board_changed)
+
+    def request_board(self, board: trello.Board, force: bool = False):
+        """
+            Fetches the board's labels and members, unless they're known (or being fetched) and force isn't set
+        """
+        if board.id in self.pending_requests or (board.id in self.labels and not force):
+            return
+        self.boards[board.id] = board
+        responses = self.pending_requests[board.id] = dict()
+
+        def on_got(name, items):
+            if self.pending_requests.get(board.id) is responses:
+                responses[name] = items
+                if len(responses) == 2:
+                    self.on_got_board(board.id, responses["labels"], responses["members"])
+
+        self.batcher.get(board.client, "/boards/%s/labels" % board.id, dict(fields="name,color", limit=1000),
+                         converter=self.labels_from_json,
+                         slot_callback=lambda labels: on_got("labels", labels),
+                         error_callback=lambda error: self.on_board_error(board.id, responses, error),
+                         priority=TrelloRequestPriority.Low)
+        self.batcher.get(board.client, "/boards/%s/members" % board.id,
+                         dict(fields=",".join(TRELLO_DIRECTORY_MEMBER_FIELDS)),
+                         converter=self.members_from_json,
+                         slot_callback=lambda members: on_got("members", members),
+                         error_callback=lambda error: self.on_board_error(board.id, responses, error),
+                         priority=TrelloRequestPriority.Low)
+
+    @staticmethod
+    def labels_from_json(json_obj: list) -> dict:
+        return {label["id"]: TrelloLabelRecord(label["id"], label["name"], label["color"]) for label in json_obj}
+
+    @staticmethod
+    def members_from_json(json_obj: list) -> dict:
+        return {member["id"]: TrelloMemberRecord(member["id"], *(member.get(field) for field
+                                                                 in TRELLO_DIRECTORY_MEMBER_FIELDS))
+                for member in json_obj}
+
+    def on_got_board(self, board_id: str, labels: dict, members: dict):
+        del self.pending_requests[board_id]
+        self.labels[board_id] = labels
+        self.members[board_id] = members
+        self.log_debug("Board directory updated", board_id=board_id, labels=len(labels), members=len(members))
+        self.board_updated.emit(board_id)
+
+    def on_board_error(self, board_id: str, responses: dict, error):
+        if self.pending_requests.get(board_id) is responses:
+            del self.pending_requests[board_id]
+            self.log_warning("Unable to fetch board labels and members", board_id=board_id, error=error)
+
+    @pyqtSlot(str, name="on_boardChanged")
+    def on_board_changed(self, board_id: str):
+        if board_id in self.boards:
+            self.request_board(self.boards[board_id], True)
+
+    # Resolution
+    def get_label(self, board_id: str, label_id: str) -> TrelloLabelRecord:
+        return self.labels.get(board_id, dict()).get(label_id)
+
+    def get_member(self, board_id: str, member_id: str) -> TrelloMemberRecord:
+        return self.members.get(board_id, dict()).get(member_id)
+
+    def get_card_labels(self, card: TrelloCardRecord) -> list:
+        """
+            The card's labels known to the directory
+        """
+        board_labels = self.labels.get(card.idBoard, dict())
+        return [board_labels[label_id] for label_id in card.idLabels if label_id in board_labels]
+
+    def get_card_members(self, card: TrelloCardRecord) -> list:
+        board_members = self.members.get(card.idBoard, dict())
+        return [board_members[member_id] for member_id in card.idMembers if member_id in board_members]
@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+
+import trello
+from PyQt5.QtCore import QRunnable, QThreadPool
+
+from Trello.TrelloCardRecord import TrelloCardRecord
+from Utils.LogHelper import LogHelper
+
+
+TRELLO_CACHE_VERSION = 3
+
+class TrelloCacheWriteRunnable(QRunnable):
+    def __init__(self, cache: 'TrelloCache', file_name: str):
+        QRunnable.__init__(self)
+        self.cache = cache
+        self.file_name = file_name
+        self.setAutoDelete(True)
+
+    def run(self):
+        self.cache.write_pending(self.file_name)
+
+class TrelloCache(LogHelper):
+    """
+        On-disk cache of Trello boards, lists and cards
+        Each collection is stored as one JSON file of (id keyed) entries stamped with the item's dateLastActivity,
+        entries are stored in the shape the py-trello from_json constructors (and TrelloCardRecord.from_json) expect
+        so cached objects are indistinguishable from fetched ones
+        Files are written on a background thread, one at a time. Until a file is written, reads of it return the
+        entries waiting to be written
+    """
+    def __init__(self, cache_dir: str):
+        LogHelper.__init__(self, "TrelloCache")
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        # Entries of the files waiting to be written and stamps of the files as known to be on disk
+        self.pending_writes = dict()
+        self.stamps = dict()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+
+    # Serialisation
+    @staticmethod
+    def __format_date(date) -> str:
+        return date.isoformat() if date is not None else None
+
+    @staticmethod
+    def board_to_json(board: trello.Board) -> dict:
+        return dict(id=board.id,
+                    name=board.name,
+                    desc=getattr(board, "description", ""),
+                    closed=board.closed,
+                    url=board.url,
+                    dateLastActivity=TrelloCache.__format_date(board.date_last_activity))
+
+    @staticmethod
+    def list_to_json(trello_list: trello.List) -> dict:
+        return dict(id=trello_list.id,
+                    name=trello_list.name,
+                    closed=trello_list.closed,
+                    pos=trello_list.pos)
+
+    @staticmethod
+    def card_to_json(card: TrelloCardRecord) -> dict:
+        """
+            Lazy fields the card hasn't fetched yet are left out
+        """
+        card_json = dict(id=card.id,
+                         name=card.name,
+                         desc=card.desc,
+                         closed=card.closed,
+                         url=card.url,
+                         pos=card.pos,
+                         shortUrl=card.shortUrl,
+                         idBoard=card.idBoard,
+                         idList=card.idList,
+                         idShort=card.idShort,
+                         idLabels=list(card.idLabels),
+                         idMembers=list(card.idMembers),
+                         dateLastActivity=TrelloCache.__format_date(card.dateLastActivity))
+        if "due" not in card.lazy_fields:
+            card_json["due"] = card.due
+        if "labels" not in card.lazy_fields:
+            card_json["labels"] = [label._asdict() for label in card.labels]
+        return card_json
+
+    # Storage
+    def __get_file_name(self, collection: str, parent_id: str = None) -> str:
+        if parent_id is not None:
+            collection = "%s_%s" % (collection, parent_id)
+        return os.path.join(self.cache_dir, collection + ".json")
+
+    @staticmethod
+    def __get_stamps(entries: list) -> list:
+        return [(entry["id"], entry["dateLastActivity"]) for entry in entries]
+
+    def __read(self, file_name: str) -> list:
+        with self.lock:
+            if file_name in self.pending_writes:
+                return self.pending_writes[file_name]
+        try:
+            with open(file_name) as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return []
+
+        if not isinstance(data, dict) or data.get("version") != TRELLO_CACHE_VERSION:
+            self.log_info("Discarding cache of an old version", file_name=file_name,
+                          version=data.get("version") if isinstance(data, dict) else None)
+            return []
+        try:
+            entries = data["entries"]
+            stamps = self.__get_stamps(entries)
+        except (KeyError, TypeError) as e:
+            self.log_warning("Discarding malformed cache file", file_name=file_name, error=e)
+            return []
+        with self.lock:
+            self.stamps[file_name] = stamps
+        return entries
+
+    def __write(self, file_name: str, entries: list) -> bool:
+        """
+            Queues the cache file to be replaced, entries whose id and stamp are unchanged aren't rewritten to disk
+        :return: True, failed writes are logged
+        """
+        stamps = self.__get_stamps(entries)
+        with self.lock:
+            if file_name not in self.pending_writes and self.stamps.get(file_name) == stamps and \
+                    all(entry["dateLastActivity"] is not None for entry in entries):
+                self.log_extra_debug("Cache up to date", file_name=file_name, entries=len(entries))
+                return True
+            queued = file_name in self.pending_writes
+            self.pending_writes[file_name] = entries
+        if not queued:
+            self.thread_pool.start(TrelloCacheWriteRunnable(self, file_name))
+        return True
+
+    def write_pending(self, file_name: str) -> bool:
+        """
+            Writes the latest entries queued for the file, on the writing thread
+        """
+        with self.lock:
+            entries = self.pending_writes.get(file_name)
+        if entries is None:
+            return True
+
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            temp_file_name = file_name + ".tmp"
+            with open(temp_file_name, "w") as fp:
+                json.dump(dict(version=TRELLO_CACHE_VERSION, entries=entries), fp)
+            os.replace(temp_file_name, file_name)
+        except OSError as e:
+            self.log_warning("Unable to write cache", file_name=file_name, error=e)
+            written = False
+        else:
+            self.log_debug("Cache written", file_name=file_name, entries=len(entries))
+            written = True
+
+        with self.lock:
+            # Unless newer entries were queued meanwhile, they're written next
+            if self.pending_writes.get(file_name) is entries:
+                del self.pending_writes[file_name]
+                if written:
+                    self.stamps[file_name] = self.__get_stamps(entries)
+                else:
+                    self.stamps.pop(file_name, None)
+            else:
+                self.thread_pool.start(TrelloCacheWriteRunnable(self, file_name))
+        return written
+
+    def flush(self):
+        """
+            Waits for the queued files to be written
+        """
+        self.thread_pool.waitForDone()
+
+    @staticmethod
+    def __make_entry(item_json: dict) -> dict:
+        return dict(id=item_json["id"], dateLastActivity=item_json.get("dateLastActivity"), json=item_json)
+
+    def store_boards(self, boards: list) -> bool:
+        return self.__write(self.__get_file_name("boards"),
+                            [self.__make_entry(self.board_to_json(board)) for board in boards])
+
+    def store_lists(self, board_id: str, lists: list) -> bool:
+        return self.__write(self.__get_file_name("lists", board_id),
+                            [self.__make_entry(self.list_to_json(trello_list)) for trello_list in lists])
+
+    def store_cards(self, list_id: str, cards: list) -> bool:
+        return self.__write(self.__get_file_name("cards", list_id),
+                            [self.__make_entry(self.card_to_json(card)) for card in cards])
+
+    def load_boards(self, client: trello.TrelloClient) -> list:
+        """
+        :param client: The (blocking) client the boards make their requests with
+        """
+        return self.__load(self.__get_file_name("boards"),
+                           lambda item_json: trello.Board.from_json(trello_client=client, json_obj=item_json))
+
+    def load_lists(self, board: trello.Board) -> list:
+        return self.__load(self.__get_file_name("lists", board.id),
+                           lambda item_json: trello.List.from_json(board=board, json_obj=item_json))
+
+    def load_cards(self, trello_list: trello.List) -> list:
+        return self.__load(self.__get_file_name("cards", trello_list.id), TrelloCardRecord.from_json)
+
+    def load_all_cards(self) -> list:
+        """
+            The cards of every cached list, a card that moved lists may be listed more than once
+        """
+        file_names = set()
+        if os.path.exists(self.cache_dir):
+            file_names.update(os.path.join(self.cache_dir, file_name) for file_name in os.listdir(self.cache_dir)
+                              if file_name.startswith("cards_") and file_name.endswith(".json"))
+        with self.lock:
+            file_names.update(file_name for file_name in self.pending_writes
+                              if os.path.basename(file_name).startswith("cards_"))
+        cards = []
+        for file_name in sorted(file_names):
+            cards.extend(self.__load(file_name, TrelloCardRecord.from_json))
+        return cards
+
+    def __load(self, file_name: str, from_json) -> list:
+        items = []
+        for entry in self.__read(file_name):
+            try:
+                items.append(from_json(entry["json"]))
+            except (KeyError, TypeError, ValueError) as e:
+                self.log_warning("Discarding malformed cache file", file_name=file_name, error=e)
+                return []
+        self.log_debug("Cache loaded", file_name=file_name, entries=len(items))
+        return items
+
+    def clear(self):
+        self.flush()
+        with self.lock:
+            self.stamps.clear()
+        if not os.path.exists(self.cache_dir):
+            return
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(".json"):
+                os.remove(os.path.join(self.cache_dir, file_name))
@@ -0,0 +1,159 @@
+import bisect
+import re
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from Trello.TrelloCardStore import TrelloCardStore
+from Utils.LogHelper import LogHelper
+
+
+# Runs of word characters, case folded, are the indexed and searched tokens
+TRELLO_INDEX_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Card fields the search results are filtered and ordered by
+TRELLO_INDEX_RESULT_FIELDS = ("closed", "idBoard", "idList", "pos")
+
+class TrelloCardIndex(QObject, LogHelper):
+    """
+        Inverted index of the names and descriptions of cards, token to card ids
+        Kept up to date from the card store's cardsAdded and cardsRemoved, only cards whose name or description changed
+        are tokenized again. Cards evicted from the store stay indexed, as do the cached cards of earlier sessions added
+        with add_cached_cards, so every board and list fetched once is searched
+    """
+    shared_index = None
+
+    index_updated = pyqtSignal(name="indexUpdated")
+
+    def __init__(self, card_store: TrelloCardStore = None, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloCardIndex")
+        self.card_store = card_store if card_store is not None else TrelloCardStore.shared()
+        self.postings = dict()
+        # Sorted, so the tokens sharing a prefix are a slice
+        self.tokens = []
+        self.card_texts = dict()
+        self.cards = dict()
+
+        self.card_store.cards_added.connect(self.on_cards_added)
+        self.card_store.cards_removed.connect(self.on_cards_removed)
+        self.add_cards(self.card_store.peek_card(card_id) for card_id in self.card_store.card_boards)
+
+    @staticmethod
+    def shared() -> 'TrelloCardIndex':
+        if TrelloCardIndex.shared_index is None:
+            TrelloCardIndex.shared_index = TrelloCardIndex()
+        return TrelloCardIndex.shared_index
+
+    @staticmethod
+    def tokenize(text: str) -> list:
+        return TRELLO_INDEX_TOKEN_PATTERN.findall(text.casefold()) if text is not None else []
+
+    # Maintenance
+    def add_cards(self, cards) -> bool:
+        """
+        :return: Whether the search results may have changed
+        """
+        changed = False
+        for card in cards:
+            held_card = self.cards.get(card.id)
+            self.cards[card.id] = card
+            if held_card is not None and any(getattr(card, field) != getattr(held_card, field)
+                                             for field in TRELLO_INDEX_RESULT_FIELDS):
+                changed = True
+
+            text = (card.name, card.desc)
+            held_text = self.card_texts.get(card.id)
+            if held_text is not None and held_text[0] == text:
+                continue
+            tokens = frozenset(self.tokenize(card.name) + self.tokenize(card.desc))
+            held_tokens = held_text[1] if held_text is not None else frozenset()
+            self.card_texts[card.id] = (text, tokens)
+            self.__unlink(card.id, held_tokens.difference(tokens))
+            self.__link(card.id, tokens.difference(held_tokens))
+            changed = True
+        return changed
+
+    def add_cached_cards(self, cards):
+        """
+            Adds cards read from the cache, those indexed already are only replaced by a more recent version
+        """
+        cards = [card for card in cards if card.id not in self.cards or
+                 card.dateLastActivity > self.cards[card.id].dateLastActivity]
+        if self.add_cards(cards):
+            self.log_debug("Cached cards indexed", cards=len(cards))
+            self.index_updated.emit()
+
+    def remove_cards(self, card_ids) -> bool:
+        changed = False
+        for card_id in card_ids:
+            self.cards.pop(card_id, None)
+            held_text = self.card_texts.pop(card_id, None)
+            if held_text is not None:
+                self.__unlink(card_id, held_text[1])
+                changed = True
+        return changed
+
+    def __link(self, card_id: str, tokens):
+        for token in tokens:
+            card_ids = self.postings.get(token)
+            if card_ids is None:
+                card_ids = self.postings[token] = set()
+                bisect.insort(self.tokens, token)
+            card_ids.add(card_id)
+
+    def __unlink(self, card_id: str, tokens):
+        for token in tokens:
+            card_ids = self.postings[token]
+            card_ids.discard(card_id)
+            if not len(card_ids):
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    @pyqtSlot(list, name="on_cardsAdded")
+    def on_cards_added(self, card_ids: list):
+        cards = [self.card_store.peek_card(card_id) for card_id in card_ids]
+        if self.add_cards(card for card in cards if card is not None):
+            self.index_updated.emit()
+
+    @pyqtSlot(list, name="on_cardsRemoved")
+    def on_cards_removed(self, card_ids: list):
+        if self.remove_cards(card_ids):
+            self.index_updated.emit()
+
+    # Queries
+    def match_prefix(self, prefix: str) -> set:
+        """
+            Ids of the cards with a token starting with prefix
+        """
+        card_ids = set()
+        for i in range(bisect.bisect_left(self.tokens, prefix), len(self.tokens)):
+            token = self.tokens[i]
+            if not token.startswith(prefix):
+                break
+            card_ids.update(self.postings[token])
+        return card_ids
+
+    def search(self, query: str) -> set:
+        """
+            Ids of the cards matching every token of query, each as a prefix of a token of the card's name or
+            description. An empty query matches nothing
+        """
+        card_ids = None
+        # Longer tokens match fewer cards, narrowing the result soonest
+        for token in sorted(set(self.tokenize(query)), key=len, reverse=True):
+            card_ids = self.match_prefix(token) if card_ids is None else card_ids.intersection(self.match_prefix(token))
+            if not len(card_ids):
+                break
+        return card_ids if card_ids is not None else set()
+
+    def search_cards(self, query: str) -> list:
+        """
+            The open cards matching query, by board, list and position
+        """
+        cards = [self.cards[card_id] for card_id in self.search(query)]
+        cards = [card for card in cards if not card.closed]
+        cards.sort(key=lambda card: (card.idBoard, card.idList, card.pos))
+        return cards
+
+    def __len__(self):
+        return len(self.card_texts)
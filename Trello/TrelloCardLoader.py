@@ -0,0 +1,104 @@
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from Trello.AsyncTrelloClient import TrelloRequestPriority
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCardRecord import TrelloCardRecord, TRELLO_CARD_LIST_FIELDS
+from Trello.TrelloCardStore import TrelloCardStore
+from Utils.LogHelper import LogHelper
+
+
+# Objects related to a card: route and the card field holding the id it's fetched by
+TRELLO_CARD_RELATIONS = dict(board=("/boards/%s", "idBoard"),
+                             list=("/lists/%s", "idList"),
+                             members=("/cards/%s/members", "id"))
+
+# Seconds before the fields of a card that failed to load are requested again, doubling per failure up to the cap
+TRELLO_CARD_LOAD_RETRY_BASE = 5.0
+TRELLO_CARD_LOAD_RETRY_CAP = 300.0
+
+class TrelloCardLoader(QObject, LogHelper):
+    """
+        Fetches the lazy fields and related objects of card records, which never fetch anything themselves
+        Cards asked for within one event loop pass are fetched together through the batcher. A card with its lazy
+        fields loaded is a new record, it replaces the card in the card store and is passed on with fieldsLoaded
+    """
+    shared_loader = None
+
+    fields_loaded = pyqtSignal(list, name="fieldsLoaded")
+
+    def __init__(self, batcher: TrelloBatcher = None, card_store: TrelloCardStore = None, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloCardLoader")
+        self.batcher = batcher if batcher is not None else TrelloBatcher.shared()
+        self.card_store = card_store if card_store is not None else TrelloCardStore.shared()
+        self.loading = dict()
+        # Card id to (failed attempts, time of the next attempt)
+        self.failures = dict()
+
+    @staticmethod
+    def shared() -> 'TrelloCardLoader':
+        if TrelloCardLoader.shared_loader is None:
+            TrelloCardLoader.shared_loader = TrelloCardLoader()
+        return TrelloCardLoader.shared_loader
+
+    @staticmethod
+    def get_list_cards_params() -> dict:
+        """
+            Query parameters of a list's card fetch, identical for every caller so equal fetches are merged
+        """
+        return dict(fields=",".join(TRELLO_CARD_LIST_FIELDS))
+
+    @staticmethod
+    def cards_from_json(json_obj: list) -> list:
+        return [TrelloCardRecord.from_json(card_json) for card_json in json_obj]
+
+    def load(self, client, card: TrelloCardRecord, priority: TrelloRequestPriority = TrelloRequestPriority.Normal):
+        """
+            Fetches the card's lazy fields unless it has them or they're being fetched, fieldsLoaded is emitted with
+            the loaded card
+        :param client: The (pooled) client to fetch with
+        """
+        if card.is_loaded() or self.loading.get(card.id) is card:
+            return
+        failure = self.failures.get(card.id)
+        if failure is not None and time.monotonic() < failure[1]:
+            return
+        self.loading[card.id] = card
+        self.batcher.get(client, "/cards/%s" % card.id, dict(fields=",".join(sorted(card.lazy_fields))),
+                         slot_callback=lambda json_obj: self.on_got_fields(card, json_obj),
+                         error_callback=lambda error: self.on_fields_error(card, error),
+                         priority=priority)
+
+    def on_got_fields(self, card: TrelloCardRecord, json_obj: dict):
+        if self.loading.get(card.id) is card:
+            del self.loading[card.id]
+        self.failures.pop(card.id, None)
+        loaded_card = card.with_json(json_obj)
+
+        # Unless the store holds a newer version of the card meanwhile
+        stored_card = self.card_store.get_card(card.id)
+        if stored_card is None or stored_card.dateLastActivity == card.dateLastActivity:
+            self.card_store.add_cards([loaded_card])
+        self.fields_loaded.emit([loaded_card])
+
+    def on_fields_error(self, card: TrelloCardRecord, error):
+        # Requested again on the next load() once the delay passed, not on every repaint until then
+        if self.loading.get(card.id) is card:
+            del self.loading[card.id]
+        attempts = self.failures[card.id][0] + 1 if card.id in self.failures else 1
+        delay = min(TRELLO_CARD_LOAD_RETRY_CAP, TRELLO_CARD_LOAD_RETRY_BASE * 2 ** (attempts - 1))
+        self.failures[card.id] = (attempts, time.monotonic() + delay)
+        self.log_warning("Unable to fetch card fields", card_id=card.id, error=error, attempts=attempts, delay=delay)
+
+    def load_related(self, client, card: TrelloCardRecord, relation: str, query_params: dict = None,
+                     slot_callback=None, error_callback=None,
+                     priority: TrelloRequestPriority = TrelloRequestPriority.Normal):
+        """
+            Fetches an object related to the card as JSON, e.g. its board
+        :param relation: A key of TRELLO_CARD_RELATIONS
+        """
+        route, id_field = TRELLO_CARD_RELATIONS[relation]
+        return self.batcher.get(client, route % getattr(card, id_field), query_params,
+                                slot_callback=slot_callback, error_callback=error_callback, priority=priority)
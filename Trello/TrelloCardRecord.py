@@ -0,0 +1,95 @@
+from collections import namedtuple
+
+from dateutil import parser as dateparser
+
+
+# Card fields fetched with a list, enough to show (description, label and member ids included), order and stamp the
+# cards
+TRELLO_CARD_LIST_FIELDS = ("name", "desc", "closed", "pos", "idBoard", "idList", "idShort", "shortUrl", "url",
+                           "idLabels", "idMembers", "dateLastActivity")
+
+# Card fields fetched on first use, per card
+TRELLO_CARD_LAZY_FIELDS = ("due", "labels")
+
+TrelloLabelRecord = namedtuple("TrelloLabelRecord", ("id", "name", "color"))
+
+
+class TrelloCardRecord(object):
+    """
+        Immutable, plain value snapshot of a Trello card
+        Unlike trello.Card it holds no client, board or list, so reading it never makes a request. Lazy fields that
+        haven't been fetched are None and named in lazy_fields, related objects are fetched through
+        TrelloCardLoader. Changes make a new record with replace()
+    """
+    __slots__ = ("id",) + TRELLO_CARD_LIST_FIELDS + TRELLO_CARD_LAZY_FIELDS + ("lazy_fields",)
+
+    def __init__(self, **fields):
+        for field in TRELLO_CARD_LAZY_FIELDS:
+            fields.setdefault(field, None)
+        fields.setdefault("lazy_fields", frozenset())
+        for field in self.__slots__:
+            object.__setattr__(self, field, fields.pop(field))
+        if len(fields):
+            raise TypeError("Unknown card fields: %s" % ", ".join(fields))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TrelloCardRecord is immutable, use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("TrelloCardRecord is immutable, use replace()")
+
+    def __repr__(self):
+        return "TrelloCardRecord(%s %r)" % (self.id, self.name)
+
+    @staticmethod
+    def from_json(json_obj: dict) -> 'TrelloCardRecord':
+        """
+            Accepts the list fields and any subset of the lazy fields, those missing are left to be loaded
+        """
+        fields = {field: TrelloCardRecord.__parse_field(field, json_obj[field])
+                  for field in ("id",) + TRELLO_CARD_LIST_FIELDS}
+        fields["dateLastActivity"] = dateparser.parse(json_obj["dateLastActivity"])
+        lazy_fields = TrelloCardRecord.__parse_lazy_fields(json_obj)
+        fields.update(lazy_fields)
+        return TrelloCardRecord(lazy_fields=frozenset(TRELLO_CARD_LAZY_FIELDS).difference(lazy_fields), **fields)
+
+    @staticmethod
+    def __parse_lazy_fields(json_obj: dict) -> dict:
+        return {field: TrelloCardRecord.__parse_field(field, json_obj[field])
+                for field in TRELLO_CARD_LAZY_FIELDS if field in json_obj}
+
+    @staticmethod
+    def __parse_field(field: str, value):
+        if field == "labels":
+            return tuple(TrelloLabelRecord(label["id"], label["name"], label["color"]) for label in value)
+        if field in ("idLabels", "idMembers"):
+            return tuple(value)
+        return value
+
+    def replace(self, **fields) -> 'TrelloCardRecord':
+        """
+            Returns a copy with fields changed, lazy fields given are no longer lazy unless lazy_fields is given too
+        """
+        values = {field: getattr(self, field) for field in self.__slots__}
+        values["lazy_fields"] = fields.pop("lazy_fields", self.lazy_fields.difference(fields))
+        values.update(fields)
+        return TrelloCardRecord(**values)
+
+    def with_json(self, json_obj: dict) -> 'TrelloCardRecord':
+        """
+            Returns a copy with the lazy fields contained in json_obj
+        """
+        return self.replace(**self.__parse_lazy_fields(json_obj))
+
+    def is_loaded(self) -> bool:
+        return not len(self.lazy_fields)
+
+    def carry_over(self, previous_card: 'TrelloCardRecord') -> 'TrelloCardRecord':
+        """
+            Returns a copy with the lazy fields of a previously fetched version of the card when it hasn't changed
+            since, otherwise the card itself
+        """
+        if self.is_loaded() or not previous_card.is_loaded() or \
+                previous_card.dateLastActivity != self.dateLastActivity:
+            return self
+        return self.replace(**{field: getattr(previous_card, field) for field in TRELLO_CARD_LAZY_FIELDS})
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from Trello.TrelloCardRecord import TrelloCardRecord
+from Utils.LogHelper import LogHelper
+
+
+class TrelloCardStore(QObject, LogHelper):
+    """
+        Process-wide store of every fetched Trello card, keyed by card id
+        Cards are grouped per board, once more than max_boards boards are held the least recently used board's cards
+        are evicted. cardsRemoved is emitted for cards removed, cardsEvicted for those evicted, which still exist
+    """
+    shared_store = None
+
+    cards_added = pyqtSignal(list, name="cardsAdded")
+    cards_removed = pyqtSignal(list, name="cardsRemoved")
+    cards_evicted = pyqtSignal(list, name="cardsEvicted")
+
+    def __init__(self, max_boards: int = 8, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloCardStore")
+        self.max_boards = max_boards
+        self.boards = OrderedDict()
+        self.card_boards = dict()
+
+    @staticmethod
+    def shared() -> 'TrelloCardStore':
+        if TrelloCardStore.shared_store is None:
+            TrelloCardStore.shared_store = TrelloCardStore()
+        return TrelloCardStore.shared_store
+
+    def set_max_boards(self, max_boards: int):
+        self.max_boards = max_boards
+        self.__evict()
+
+    def add_cards(self, cards: list):
+        """
+            Adds or replaces cards, the boards they're on become the most recently used
+        """
+        for card in cards:
+            previous_board_id = self.card_boards.get(card.id)
+            if previous_board_id is not None and previous_board_id != card.idBoard:
+                del self.boards[previous_board_id][card.id]
+
+            board_cards = self.boards.get(card.idBoard)
+            if board_cards is None:
+                board_cards = self.boards[card.idBoard] = dict()
+            board_cards[card.id] = card
+            self.card_boards[card.id] = card.idBoard
+            self.boards.move_to_end(card.idBoard)
+
+        self.__evict()
+        if len(cards):
+            self.cards_added.emit([card.id for card in cards if card.id in self.card_boards])
+
+    def get_card(self, card_id: str) -> TrelloCardRecord:
+        board_id = self.card_boards.get(card_id)
+        if board_id is None:
+            return None
+        self.boards.move_to_end(board_id)
+        return self.boards[board_id][card_id]
+
+    def peek_card(self, card_id: str) -> TrelloCardRecord:
+        """
+            Looks the card up without making its board the most recently used
+        """
+        board_id = self.card_boards.get(card_id)
+        return self.boards[board_id][card_id] if board_id is not None else None
+
+    def get_board_cards(self, board_id: str) -> list:
+        return list(self.boards.get(board_id, dict()).values())
+
+    def remove_cards(self, card_ids):
+        removed_card_ids = []
+        for card_id in card_ids:
+            board_id = self.card_boards.pop(card_id, None)
+            if board_id is not None:
+                del self.boards[board_id][card_id]
+                removed_card_ids.append(card_id)
+        if len(removed_card_ids):
+            self.cards_removed.emit(removed_card_ids)
+
+    def remove_board(self, board_id: str):
+        removed_card_ids = list(self.boards.pop(board_id, dict()))
+        for card_id in removed_card_ids:
+            del self.card_boards[card_id]
+        if len(removed_card_ids):
+            self.cards_removed.emit(removed_card_ids)
+
+    def clear(self):
+        removed_card_ids = list(self.card_boards)
+        self.boards.clear()
+        self.card_boards.clear()
+        if len(removed_card_ids):
+            self.cards_removed.emit(removed_card_ids)
+
+    def __len__(self):
+        return len(self.card_boards)
+
+    def __evict(self):
+        while len(self.boards) > self.max_boards:
+            board_id, board_cards = self.boards.popitem(last=False)
+            for card_id in board_cards:
+                del self.card_boards[card_id]
+            self.log_debug("Evicted board", board_id=board_id, cards=len(board_cards))
+            self.cards_evicted.emit(list(board_cards))
@@ -3,9 +3,14 @@ import os
 
 from requests_oauthlib import OAuth1Session
 
+from Trello.TrelloSessionPool import TrelloSessionPool
 from Utils.LogHelper import LogHelper
 
 
+TRELLO_OAUTH_REQUEST_TOKEN_URL = 'https://trello.com/1/OAuthGetRequestToken'
+TRELLO_OAUTH_AUTHORIZE_URL = 'https://trello.com/1/OAuthAuthorizeToken'
+TRELLO_OAUTH_ACCESS_TOKEN_URL = 'https://trello.com/1/OAuthGetAccessToken'
+
 class TrelloConfig(LogHelper):
     def __init__(self):
         LogHelper.__init__(self, "TrelloConfig")
@@ -19,60 +24,70 @@ class TrelloConfig(LogHelper):
         self.resource_owner_secret = None
 
     def request_oauth(self, key, secret):
-        request_token_url = 'https://trello.com/1/OAuthGetRequestToken'
-        authorize_url = 'https://trello.com/1/OAuthAuthorizeToken'
-
-        expiration = "30days"
-        scope = 'read,write'
+        """
+            Blocks while the request token is fetched, TrelloOAuth runs the steps in the background
+        """
         self.data["api_key"] = key
         self.data["api_secret"] = secret
-        name = 'Tymbox'
-
-        self.log_debug("Request",
-                       expiration=expiration,
-                       scope=scope,
-                       trello_key=self.data["api_key"],
-                       trello_secret=self.data["api_secret"],
-                       name=name,
-                       request_token_url=request_token_url,
-                       authorize_url=authorize_url)
+        self.log_debug("Request", trello_key=self.data["api_key"], request_token_url=TRELLO_OAUTH_REQUEST_TOKEN_URL)
 
-        session = OAuth1Session(client_key=self.data["api_key"], client_secret=self.data["api_secret"])
-        response = session.fetch_request_token(request_token_url)
-        self.resource_owner_key, self.resource_owner_secret = response.get('oauth_token'), response.get('oauth_token_secret')
+        self.resource_owner_key, self.resource_owner_secret = self.fetch_request_token(key, secret)
 
         self.log_debug("Request token",
                        oauth_token=self.resource_owner_key,
                        oauth_token_secret=self.resource_owner_secret)
 
-        auth_url = "{authorize_url}?oauth_token={oauth_token}&scope={scope}&expiration={expiration}&name={name}".format(
-                        authorize_url=authorize_url,
-                        oauth_token=self.resource_owner_key,
-                        expiration=expiration,
-                        scope=scope,
-                        name=name
-                    )
-
-        return auth_url
+        return self.get_authorize_url(self.resource_owner_key)
+
+    @staticmethod
+    def fetch_request_token(key: str, secret: str) -> tuple:
+        """
+        :return: Resource owner key and secret
+        """
+        session = OAuth1Session(client_key=key, client_secret=secret)
+        TrelloSessionPool.shared().mount(session)
+        response = session.fetch_request_token(TRELLO_OAUTH_REQUEST_TOKEN_URL)
+        return response.get('oauth_token'), response.get('oauth_token_secret')
+
+    @staticmethod
+    def get_authorize_url(resource_owner_key: str) -> str:
+        return "{authorize_url}?oauth_token={oauth_token}&scope={scope}&expiration={expiration}&name={name}".format(
+                    authorize_url=TRELLO_OAUTH_AUTHORIZE_URL,
+                    oauth_token=resource_owner_key,
+                    expiration="30days",
+                    scope='read,write',
+                    name='Tymbox'
+                )
 
     def complete_oauth(self, oauth_verifier):
-        access_token_url = 'https://trello.com/1/OAuthGetAccessToken'
-
+        """
+            Blocks while the access token is fetched, TrelloOAuth runs the steps in the background
+        """
         self.log_debug("complete oauth",
                        trello_key=self.data["api_key"],
-                       trello_secret=self.data["api_secret"],
                        resource_owner_key=self.resource_owner_key,
-                       resource_owner_secret=self.resource_owner_secret,
                        oauth_verifier=oauth_verifier)
 
-        session = OAuth1Session(client_key=self.data["api_key"], client_secret=self.data["api_secret"],
-                                resource_owner_key=self.resource_owner_key, resource_owner_secret=self.resource_owner_secret,
+        return self.set_access_token(*self.fetch_access_token(self.data["api_key"], self.data["api_secret"],
+                                                              self.resource_owner_key, self.resource_owner_secret,
+                                                              oauth_verifier))
+
+    @staticmethod
+    def fetch_access_token(key: str, secret: str, resource_owner_key: str, resource_owner_secret: str,
+                           oauth_verifier: str) -> tuple:
+        """
+        :return: Token and token secret
+        """
+        session = OAuth1Session(client_key=key, client_secret=secret,
+                                resource_owner_key=resource_owner_key, resource_owner_secret=resource_owner_secret,
                                 verifier=oauth_verifier)
-        access_token = session.fetch_access_token(access_token_url)
-
-        self.data["token"] = access_token["oauth_token"]
-        self.data["token_secret"] = access_token["oauth_token_secret"]
+        TrelloSessionPool.shared().mount(session)
+        access_token = session.fetch_access_token(TRELLO_OAUTH_ACCESS_TOKEN_URL)
+        return access_token["oauth_token"], access_token["oauth_token_secret"]
 
+    def set_access_token(self, token: str, token_secret: str) -> bool:
+        self.data["token"] = token
+        self.data["token_secret"] = token_secret
         return len(self.data["token"]) > 0 and len(self.data["token_secret"]) > 0
 
     def load_from_file(self, file_name) -> bool:
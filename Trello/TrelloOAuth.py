@@ -0,0 +1,103 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from Trello.AsyncTrelloClient import TrelloRequestPool, TrelloRequestPriority
+from Trello.TrelloConfig import TrelloConfig
+from Trello.TrelloRequestGeneration import TrelloRequestGeneration
+from Utils.LogHelper import LogHelper
+
+
+class TrelloOAuth(QObject, LogHelper):
+    """
+        Runs TrelloConfig's OAuth steps on the request pool so the GUI never waits on them
+        The verifier is exchanged for an access token once it hasn't been edited for verifier_delay seconds, each
+        verifier only once. A newer request or verifier supersedes the step in flight, its result is dropped
+    """
+    authorize_url_ready = pyqtSignal(str, name="authorizeUrlReady")
+    authorized = pyqtSignal(TrelloConfig, name="authorized")
+    failed = pyqtSignal(str, name="failed")
+
+    def __init__(self, pool: TrelloRequestPool = None, verifier_delay: float = 0.8, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloOAuth")
+        self.pool = pool if pool is not None else TrelloRequestPool.shared()
+        self.config = None
+        self.verifier = ""
+        self.tried_verifier = None
+        self.generation = TrelloRequestGeneration()
+        # The network steps, run on a pool thread
+        self.fetch_request_token = TrelloConfig.fetch_request_token
+        self.fetch_access_token = TrelloConfig.fetch_access_token
+
+        self.verifier_timer = QTimer(self)
+        self.verifier_timer.setSingleShot(True)
+        self.verifier_timer.setInterval(int(verifier_delay * 1000))
+        self.verifier_timer.timeout.connect(self.complete)
+
+    def request(self, key: str, secret: str):
+        """
+            Starts over with a new request token, authorizeUrlReady gives the page the user gets the verifier from
+        """
+        self.verifier_timer.stop()
+        self.config = TrelloConfig()
+        self.config.data["api_key"] = key
+        self.config.data["api_secret"] = secret
+        self.tried_verifier = None
+
+        config = self.config
+        generation = self.generation.advance()
+        self.generation.track(self.pool.submit(
+            self.fetch_request_token, (key, secret), dict(),
+            slot_callback=lambda owner: self.on_got_request_token(config, generation, owner),
+            error_callback=lambda error: self.on_error(generation, "Unable to request a Trello token", error),
+            priority=TrelloRequestPriority.High))
+
+    def on_got_request_token(self, config: TrelloConfig, generation: int, owner: tuple):
+        if not self.generation.is_current(generation):
+            return
+        config.resource_owner_key, config.resource_owner_secret = owner
+        self.log_debug("Request token", oauth_token=config.resource_owner_key)
+        self.authorize_url_ready.emit(config.get_authorize_url(config.resource_owner_key))
+        # A verifier entered meanwhile
+        self.complete()
+
+    @pyqtSlot(str)
+    def set_verifier(self, verifier: str):
+        """
+            Restarts the wait for the verifier to settle
+        """
+        self.verifier = verifier.strip()
+        self.verifier_timer.start()
+
+    @pyqtSlot()
+    def complete(self):
+        """
+            Exchanges the verifier for an access token, authorized is emitted with the config once it's set
+        """
+        config = self.config
+        if config is None or config.resource_owner_key is None or not len(self.verifier) or \
+                self.verifier == self.tried_verifier:
+            return
+        self.tried_verifier = self.verifier
+
+        generation = self.generation.advance()
+        self.generation.track(self.pool.submit(
+            self.fetch_access_token, (config.data["api_key"], config.data["api_secret"], config.resource_owner_key,
+                                      config.resource_owner_secret, self.verifier), dict(),
+            slot_callback=lambda token: self.on_got_access_token(config, generation, token),
+            error_callback=lambda error: self.on_error(generation, "Trello PIN didn't seem to work...", error),
+            priority=TrelloRequestPriority.High))
+
+    def on_got_access_token(self, config: TrelloConfig, generation: int, token: tuple):
+        if not self.generation.is_current(generation):
+            return
+        if not config.set_access_token(*token):
+            self.failed.emit("Trello PIN didn't seem to work...")
+            return
+        self.config = None
+        self.authorized.emit(config)
+
+    def on_error(self, generation: int, message: str, error):
+        if not self.generation.is_current(generation):
+            return
+        self.log_warning(message, error=error)
+        self.failed.emit(message)
@@ -0,0 +1,155 @@
+import trello
+from PyQt5.QtCore import QObject
+
+from Trello.AsyncTrelloClient import TrelloRequestPriority
+from Trello.TrelloBatcher import TrelloBatcher
+from Trello.TrelloCache import TrelloCache
+from Trello.TrelloCardLoader import TrelloCardLoader
+from Trello.TrelloCardStore import TrelloCardStore
+from Utils.JsonSettings import load_json_settings, save_json_settings
+from Utils.LogHelper import LogHelper
+
+
+class TrelloPrefetcher(QObject, LogHelper):
+    """
+        Warms the Trello cache with the lists and cards the user is likely to open next
+        The board and list used last are remembered across sessions, their data is fetched at low priority as soon as
+        the boards are known. A prefetch is cancelled when the user navigates to a different board
+    """
+    def __init__(self, cache: TrelloCache, batcher: TrelloBatcher = None, parent=None):
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloPrefetcher")
+        self.cache = cache
+        self.batcher = batcher if batcher is not None else TrelloBatcher.shared()
+        self.pending_requests = []
+        self.target_board_id = None
+        # Routes fetched by the prefetcher and not yet claimed by a model, and the routes the models requested
+        self.prefetched_routes = set()
+        self.claimed_routes = set()
+
+        self.data = dict(enabled=True,
+                         prefetch_all_lists=False,
+                         last_board_id=None,
+                         last_list_id=None)
+
+    def load_from_file(self, file_name) -> bool:
+        data = load_json_settings(file_name)
+        if data is None:
+            return False
+        self.data.update(data)
+        return True
+
+    def save_to_file(self, file_name) -> bool:
+        return save_json_settings(file_name, self.data)
+
+    def set_enabled(self, enabled: bool):
+        self.data["enabled"] = enabled
+        if not enabled:
+            self.cancel()
+
+    def set_prefetch_all_lists(self, prefetch_all_lists: bool):
+        """
+            Prefetches the cards of every list of the last board rather than only the last list
+            Off by default, a board with many lists costs as many requests on every start
+        """
+        self.data["prefetch_all_lists"] = prefetch_all_lists
+
+    @property
+    def last_board_id(self) -> str:
+        return self.data["last_board_id"]
+
+    @property
+    def last_list_id(self) -> str:
+        return self.data["last_list_id"]
+
+    def remember_selection(self, board_id: str, list_id: str = None):
+        """
+            Records the board/list the user navigated to, cancelling any prefetch of another board
+        """
+        if board_id != self.target_board_id:
+            self.cancel()
+        self.data["last_board_id"] = board_id
+        self.data["last_list_id"] = list_id
+
+    def claim(self, uri_path: str) -> bool:
+        """
+            Called by a model about to request uri_path, which the prefetcher won't request from then on
+        :return: Whether the prefetcher fetched uri_path moments ago, its results are in the cache already
+        """
+        self.claimed_routes.add(uri_path)
+        if uri_path in self.prefetched_routes:
+            self.prefetched_routes.remove(uri_path)
+            return True
+        return False
+
+    def cancel(self):
+        if len(self.pending_requests):
+            self.log_debug("Cancelling prefetch", board_id=self.target_board_id, requests=len(self.pending_requests))
+        for request in self.pending_requests:
+            request.cancel()
+        self.pending_requests = []
+        self.target_board_id = None
+
+    def prefetch(self, boards: list):
+        """
+            Starts prefetching the last used board's lists and cards, called once the boards are known
+        """
+        self.cancel()
+        if not self.data["enabled"] or self.last_board_id is None:
+            return
+
+        board = next((board for board in boards if board.id == self.last_board_id), None)
+        if board is None:
+            self.log_debug("Last used board no longer exists", board_id=self.last_board_id)
+            return
+
+        self.target_board_id = board.id
+        self.log_debug("Prefetching", board_id=board.id, list_id=self.last_list_id)
+        self.__get(board.client, "/boards/%s/lists" % board.id, dict(cards="none", filter="all"),
+                   lambda json_obj: [trello.List.from_json(board=board, json_obj=obj) for obj in json_obj],
+                   lambda lists: self.on_got_lists(board, lists))
+
+        # Known from the last session, so the cards are fetched in the same batch as the lists
+        if self.last_list_id is not None:
+            self.__prefetch_cards(trello.List(board, self.last_list_id))
+
+    def __get(self, client, uri_path: str, query_params: dict, converter, slot_callback):
+        # Requested by a model already, a request still in flight is merged with the model's by the batcher
+        if uri_path in self.claimed_routes:
+            return
+
+        def on_result(result):
+            if uri_path not in self.claimed_routes:
+                self.prefetched_routes.add(uri_path)
+            slot_callback(result)
+
+        request = self.batcher.get(client, uri_path, query_params, converter=converter,
+                                   slot_callback=on_result, error_callback=self.on_prefetch_error,
+                                   priority=TrelloRequestPriority.Low)
+        self.pending_requests.append(request)
+
+    def __prefetch_cards(self, trello_list: trello.List):
+        self.__get(trello_list.client, "/lists/%s/cards/open" % trello_list.id,
+                   TrelloCardLoader.get_list_cards_params(),
+                   TrelloCardLoader.cards_from_json,
+                   lambda cards: self.on_got_cards(trello_list, cards))
+
+    def on_got_lists(self, board: trello.Board, lists: list):
+        self.cache.store_lists(board.id, lists)
+        if self.data["prefetch_all_lists"]:
+            for trello_list in lists:
+                if trello_list.id != self.last_list_id and not trello_list.closed:
+                    self.__prefetch_cards(trello_list)
+        self.__discard_finished()
+
+    def on_got_cards(self, trello_list: trello.List, cards: list):
+        self.cache.store_cards(trello_list.id, cards)
+        TrelloCardStore.shared().add_cards(cards)
+        self.__discard_finished()
+
+    def on_prefetch_error(self, error):
+        self.log_warning("Prefetch failed", error=error)
+        self.__discard_finished()
+
+    def __discard_finished(self):
+        self.pending_requests = [request for request in self.pending_requests if not request.finished]
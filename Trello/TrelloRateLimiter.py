@@ -0,0 +1,125 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+from Utils.LogHelper import LogHelper
+
+
+# Trello allows 100 requests per 10 seconds per token
+TRELLO_RATE_LIMIT_REQUESTS = 100
+TRELLO_RATE_LIMIT_INTERVAL = 10.0
+
+thread_state = threading.local()
+
+class TrelloRequestStats(object):
+    """
+        Counters of a TrelloSessionPool, for monitoring
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.throttled_time = 0.0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return dict(requests=self.requests,
+                        retries=self.retries,
+                        rate_limited=self.rate_limited,
+                        failures=self.failures,
+                        throttled_time=self.throttled_time)
+
+    def __repr__(self):
+        return "TrelloRequestStats(%s)" % ", ".join("%s=%s" % item for item in self.as_dict().items())
+
+class TrelloRateLimiter(LogHelper):
+    """
+        Sliding window rate limiter shared by the threads sending Trello requests
+        Threads waiting for quota are let through highest priority first (then first come, first served). The window
+        is tightened by the quota Trello reports in its rate limit headers and by 429 responses
+    """
+    def __init__(self, max_requests: int = TRELLO_RATE_LIMIT_REQUESTS, interval: float = TRELLO_RATE_LIMIT_INTERVAL):
+        LogHelper.__init__(self, "TrelloRateLimiter")
+        self.max_requests = max_requests
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.sent = deque()
+        self.blocked_until = 0.0
+        self.waiting = []
+        self.tickets = itertools.count()
+
+    @staticmethod
+    def set_thread_priority(priority: int):
+        """
+            Sets the priority requests made by the calling thread wait for quota with
+        """
+        thread_state.priority = int(priority)
+
+    @staticmethod
+    def get_thread_priority() -> int:
+        return getattr(thread_state, "priority", 0)
+
+    def acquire(self, priority: int = None) -> float:
+        """
+            Blocks until a request may be sent
+        :return: Seconds spent waiting
+        """
+        if priority is None:
+            priority = self.get_thread_priority()
+
+        with self.condition:
+            ticket = (-priority, next(self.tickets))
+            heapq.heappush(self.waiting, ticket)
+            start_time = time.monotonic()
+            while True:
+                now = time.monotonic()
+                while len(self.sent) and self.sent[0] <= now - self.interval:
+                    self.sent.popleft()
+
+                delay = max(self.blocked_until - now, 0.0)
+                if len(self.sent) >= self.max_requests:
+                    delay = max(delay, self.sent[0] + self.interval - now)
+
+                if self.waiting[0] != ticket:
+                    self.condition.wait()
+                elif delay > 0:
+                    self.condition.wait(delay)
+                else:
+                    break
+
+            heapq.heappop(self.waiting)
+            self.sent.append(now)
+            self.condition.notify_all()
+
+        waited = now - start_time
+        if waited > 0.001:
+            self.log_debug("Throttled request", waited=waited, priority=priority)
+        return waited
+
+    def block(self, delay: float):
+        """
+            Holds back every request for delay seconds
+        """
+        with self.condition:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self.condition.notify_all()
+
+    def update_from_headers(self, headers):
+        """
+            Blocks until the interval ends when Trello reports the token's or key's quota as used up
+        """
+        for limit in ("token", "key"):
+            remaining = headers.get("x-rate-limit-api-%s-remaining" % limit)
+            interval_ms = headers.get("x-rate-limit-api-%s-interval-ms" % limit)
+            if remaining is not None and interval_ms is not None and int(remaining) <= 0:
+                self.log_warning("Trello rate limit quota used up", limit=limit, interval_ms=interval_ms)
+                self.block(int(interval_ms) / 1000)
@@ -0,0 +1,31 @@
+class TrelloRequestGeneration(object):
+    """
+        Generation token of the requests made for one selection (e.g. the lists of the selected board)
+        Advancing the generation cancels the requests of the previous one, responses are checked against the
+        generation they were requested in so superseded ones are dropped even when they can't be cancelled anymore
+    """
+    def __init__(self):
+        self.value = 0
+        self.requests = []
+
+    def advance(self) -> int:
+        """
+            Cancels the requests of the current generation
+        :return: The new generation
+        """
+        for request in self.requests:
+            request.cancel()
+        self.requests = []
+        self.value += 1
+        return self.value
+
+    def track(self, request):
+        """
+            Cancels request when the generation advances, request needs cancel() and finished
+        """
+        self.requests = [tracked for tracked in self.requests if not tracked.finished]
+        self.requests.append(request)
+        return request
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self.value
@@ -0,0 +1,307 @@
+import json
+import random
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+import trello
+from requests.adapters import HTTPAdapter
+from trello.exceptions import Unauthorized, ResourceUnavailable
+
+from Trello.TrelloRateLimiter import TrelloRateLimiter, TrelloRequestStats
+from Utils.LogHelper import LogHelper
+
+
+TRELLO_API_URL = "https://api.trello.com/1/"
+TRELLO_BATCH_MAX_URLS = 10
+
+# Only requests without side effects are repeated after a failure
+RETRYABLE_METHODS = ("GET", "HEAD")
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+class TrelloRequestTiming(object):
+    """
+        Timing of a single HTTP request, passed to timing hooks
+    """
+    def __init__(self, method: str, url: str, status_code: int, elapsed: float, connection_reused: bool):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.elapsed = elapsed
+        self.connection_reused = connection_reused
+
+    def __repr__(self):
+        return "TrelloRequestTiming(%s %s %s %.1fms %s)" % (self.method, self.url, self.status_code,
+                                                             self.elapsed * 1000,
+                                                             "reused" if self.connection_reused else "new connection")
+
+class TrelloSessionPool(LogHelper):
+    """
+        Thread-safe keep-alive HTTP sessions for Trello requests
+        Every thread gets its own requests.Session (sessions aren't thread-safe), all of them share one connection
+        pooling adapter so TCP/TLS connections are kept alive and reused across threads and calls
+        Requests wait for quota on a shared rate limiter, idempotent requests failing with 429/5xx (or a connection
+        error) are retried with exponential backoff and full jitter
+    """
+    shared_pool = None
+
+    def __init__(self, max_connections: int = 4, rate_limiter: TrelloRateLimiter = None, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0):
+        LogHelper.__init__(self, "TrelloSessionPool")
+        self.max_connections = max_connections
+        self.adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_connections)
+        self.thread_sessions = threading.local()
+        self.timing_hooks = []
+
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TrelloRateLimiter()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.stats = TrelloRequestStats()
+
+    @staticmethod
+    def shared() -> 'TrelloSessionPool':
+        if TrelloSessionPool.shared_pool is None:
+            TrelloSessionPool.shared_pool = TrelloSessionPool()
+        return TrelloSessionPool.shared_pool
+
+    def set_max_connections(self, max_connections: int):
+        """
+            Number of connections kept alive per host, should match the number of threads sending requests
+        """
+        if max_connections == self.max_connections:
+            return
+        self.max_connections = max_connections
+        previous_pool_manager = self.adapter.poolmanager
+        self.adapter.init_poolmanager(2, max_connections)
+        # Closed once swapped out, so requests starting meanwhile already use the new pools. Connections of requests
+        # in flight are closed as they're released
+        previous_pool_manager.clear()
+        self.log_debug("Resized connection pools", max_connections=max_connections)
+
+    def add_timing_hook(self, hook):
+        """
+            Registers a callable receiving a TrelloRequestTiming after every request (called on the requesting thread)
+        """
+        self.timing_hooks.append(hook)
+
+    def remove_timing_hook(self, hook):
+        self.timing_hooks.remove(hook)
+
+    def mount(self, session: requests.Session):
+        """
+            Routes a session's requests through the shared connection pools
+        """
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+
+    def get_session(self) -> requests.Session:
+        session = getattr(self.thread_sessions, "session", None)
+        if session is None:
+            session = requests.Session()
+            self.mount(session)
+            self.thread_sessions.session = session
+        return session
+
+    def __get_connection_count(self) -> int:
+        """
+            Number of connections opened so far across all host pools
+        """
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def get_stats(self) -> dict:
+        return self.stats.as_dict()
+
+    def get_retry_delay(self, attempt: int, response: requests.Response = None) -> float:
+        """
+            Delay before retry number attempt (from 0), a Retry-After header takes precedence
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def wait_before_retry(self, delay: float, rate_limited: bool, retries: int = 1):
+        """
+            Backs off before retrying, after a 429 every thread backs off
+        """
+        if rate_limited:
+            # The wait is counted as throttled time once the retry acquires its quota
+            self.rate_limiter.block(delay)
+            delay = 0
+        self.stats.add(retries=retries, throttled_time=delay)
+        time.sleep(delay)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+            requests.request equivalent using the calling thread's pooled session, throttled and retried
+        """
+        retryable = method.upper() in RETRYABLE_METHODS
+        attempt = 0
+        while True:
+            self.stats.add(throttled_time=self.rate_limiter.acquire())
+            try:
+                response = self.__send(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not retryable or attempt >= self.max_retries:
+                    self.stats.add(failures=1)
+                    raise
+                delay = self.get_retry_delay(attempt)
+                self.log_warning("Request failed, retrying", url=url, error=e, attempt=attempt, delay=delay)
+                self.wait_before_retry(delay, False)
+            else:
+                self.rate_limiter.update_from_headers(response.headers)
+                if response.status_code == 429:
+                    self.stats.add(rate_limited=1)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                if not retryable or attempt >= self.max_retries:
+                    self.stats.add(failures=1)
+                    return response
+
+                delay = self.get_retry_delay(attempt, response)
+                self.log_warning("Request failed, retrying", url=url, status_code=response.status_code,
+                                 attempt=attempt, delay=delay)
+                self.wait_before_retry(delay, response.status_code == 429)
+            attempt += 1
+
+    def __send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+            Connection reuse is judged by the number of opened connections, concurrent requests can blur it
+        """
+        session = self.get_session()
+        connection_count = self.__get_connection_count()
+        start_time = time.perf_counter()
+
+        self.stats.add(requests=1)
+        response = session.request(method, url, **kwargs)
+
+        timing = TrelloRequestTiming(method, url, response.status_code, time.perf_counter() - start_time,
+                                     self.__get_connection_count() == connection_count)
+        self.log_extra_debug("Request", timing=timing)
+        for hook in self.timing_hooks:
+            hook(timing)
+
+        return response
+
+class TrelloBatchItemResponse(object):
+    """
+        Status of a single route within a batch response, stands in for the HTTP response of py-trello's exceptions
+    """
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+class PooledTrelloClient(trello.TrelloClient):
+    """
+        Trello client sending its requests through a TrelloSessionPool
+    """
+    def __init__(self, session_pool: TrelloSessionPool, api_key, api_secret=None, token=None, token_secret=None,
+                 api_url: str = TRELLO_API_URL):
+        """
+        :param api_url: Base URL of the API, for a stand-in server
+        """
+        trello.TrelloClient.__init__(self, api_key, api_secret, token, token_secret)
+        self.session_pool = session_pool
+        self.api_url = api_url
+
+    def fetch_json(self, uri_path, http_method='GET', headers=None, query_params=None, post_args=None, files=None):
+        if headers is None:
+            headers = {}
+        if query_params is None:
+            query_params = {}
+
+        # Like py-trello writes send a JSON object, "{}" at least, GET requests carry no payload and files are sent
+        # without any data
+        data = None
+        if files is None and (post_args is not None or http_method in ("POST", "PUT", "DELETE")):
+            data = json.dumps(post_args if post_args is not None else {})
+
+        if http_method in ("POST", "PUT", "DELETE") and not files:
+            headers['Content-Type'] = 'application/json; charset=utf-8'
+        headers['Accept'] = 'application/json'
+
+        if uri_path[0] == '/':
+            uri_path = uri_path[1:]
+        url = self.api_url + uri_path
+
+        # The OAuth1 signer is created once by the client and reused for every request
+        response = self.session_pool.request(http_method, url, params=query_params, headers=headers, data=data,
+                                             auth=self.oauth, files=files)
+
+        if response.status_code == 401:
+            raise Unauthorized("%s at %s" % (response.text, url), response)
+        if response.status_code != 200:
+            raise ResourceUnavailable("%s at %s" % (response.text, url), response)
+
+        return response.json()
+
+    @staticmethod
+    def make_route(uri_path: str, query_params: dict = None) -> str:
+        """
+            Builds a batchable GET route, query values are encoded so they can't be confused with the route separator
+        """
+        if uri_path[0] != '/':
+            uri_path = '/' + uri_path
+        if query_params:
+            return uri_path + '?' + urlencode(query_params)
+        return uri_path
+
+    @staticmethod
+    def __parse_batch_item(item) -> tuple:
+        """
+        :return: (status code, value) of a route's entry in a batch response
+        """
+        keys = list(item.keys()) if isinstance(item, dict) else []
+        if len(keys) == 1 and keys[0].isdigit():
+            return int(keys[0]), item[keys[0]]
+        return item.get("statusCode", 500) if isinstance(item, dict) else 500, item
+
+    def fetch_batch(self, routes: list) -> list:
+        """
+            Fetches up to TRELLO_BATCH_MAX_URLS GET routes (see make_route) in a single request
+            Routes failing with 429/5xx are retried (in a batch of their own) like any other GET
+        :return: The decoded JSON of each route, or the ResourceUnavailable the route failed with
+        """
+        if len(routes) > TRELLO_BATCH_MAX_URLS:
+            raise ValueError("At most %i routes can be batched, got %i" % (TRELLO_BATCH_MAX_URLS, len(routes)))
+
+        results = [None] * len(routes)
+        pending = list(range(len(routes)))
+        attempt = 0
+        while True:
+            items = self.fetch_json("/batch", query_params={"urls": ",".join(routes[i] for i in pending)})
+            retry = []
+            rate_limited = False
+            for i, item in zip(pending, items):
+                status_code, value = self.__parse_batch_item(item)
+                if status_code == 200:
+                    results[i] = value
+                elif status_code in RETRYABLE_STATUS_CODES and attempt < self.session_pool.max_retries:
+                    retry.append(i)
+                    rate_limited = rate_limited or status_code == 429
+                elif status_code == 401:
+                    results[i] = Unauthorized("%s at %s" % (value, routes[i]),
+                                              TrelloBatchItemResponse(status_code, value))
+                else:
+                    results[i] = ResourceUnavailable("%s at %s" % (value, routes[i]),
+                                                     TrelloBatchItemResponse(status_code, value))
+            # Routes the batch response has no entry for
+            for i in pending[len(items):]:
+                results[i] = ResourceUnavailable("No response at %s" % routes[i],
+                                                 TrelloBatchItemResponse(502, "No response"))
+
+            if len(retry) == 0:
+                return results
+
+            delay = self.session_pool.get_retry_delay(attempt)
+            self.session_pool.log_warning("Batched routes failed, retrying", routes=[routes[i] for i in retry],
+                                          attempt=attempt, delay=delay)
+            if rate_limited:
+                self.session_pool.stats.add(rate_limited=1)
+            self.session_pool.wait_before_retry(delay, rate_limited, len(retry))
+            pending = retry
+            attempt += 1
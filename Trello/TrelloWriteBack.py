@@ -0,0 +1,217 @@
+import json
+import os
+import random
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+from trello.exceptions import ResourceUnavailable
+
+from Trello.AsyncTrelloClient import TrelloRequestPool, TrelloRequestPriority
+from Trello.TrelloSessionPool import PooledTrelloClient
+from Utils.LogHelper import LogHelper
+
+
+TRELLO_WRITE_BACK_VERSION = 1
+
+# Most cards updated per background job
+TRELLO_WRITE_BACK_BATCH_SIZE = 10
+
+class TrelloWriteBack(QObject, LogHelper):
+    """
+        Durable queue of updates to Trello cards, sent in the background
+        Updates are coalesced per card: field changes into one PUT (the latest value of a field wins), comments into one
+        comment. The queue is written to disk on every change so nothing is lost on restart. Cards whose update failed
+        are retried with exponential backoff, updates Trello rejects (e.g. of a deleted card) are dropped
+    """
+    card_written = pyqtSignal(str, name="cardWritten")
+
+    def __init__(self, file_name: str = None, pool: TrelloRequestPool = None, flush_delay: float = 5.0,
+                 backoff_base: float = 30.0, backoff_cap: float = 3600.0, parent=None):
+        """
+        :param file_name: File the queue is kept in, the queue isn't persisted when None
+        :param flush_delay: Seconds to wait for more updates before sending
+        """
+        QObject.__init__(self, parent)
+        LogHelper.__init__(self, "TrelloWriteBack")
+        self.file_name = file_name
+        self.pool = pool if pool is not None else TrelloRequestPool.shared()
+        self.flush_delay = flush_delay
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.client = None
+        self.pending = dict()
+        self.in_flight = dict()
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush)
+
+        if file_name is not None:
+            self.load_from_file(file_name)
+
+    def load_from_file(self, file_name) -> bool:
+        try:
+            with open(file_name) as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != TRELLO_WRITE_BACK_VERSION:
+            self.log_warning("Discarding write back queue of an old version", file_name=file_name)
+            return False
+        self.pending.update(data["cards"])
+        self.log_debug("Write back queue loaded", cards=len(self.pending))
+        return True
+
+    def save_to_file(self, file_name) -> bool:
+        """
+            Writes the queue, including the updates being sent, atomically
+        """
+        cards = dict()
+        for card_id, update in self.in_flight.items():
+            cards[card_id] = update
+        for card_id, update in self.pending.items():
+            cards[card_id] = self.__merge(cards[card_id], update) if card_id in cards else update
+
+        try:
+            dir_name = os.path.dirname(file_name)
+            if len(dir_name) and not os.path.exists(dir_name):
+                os.makedirs(dir_name)
+            temp_file_name = file_name + ".tmp"
+            with open(temp_file_name, "w") as fp:
+                json.dump(dict(version=TRELLO_WRITE_BACK_VERSION, cards=cards), fp)
+            os.replace(temp_file_name, file_name)
+        except OSError as e:
+            self.log_warning("Unable to write the write back queue", file_name=file_name, error=e)
+            return False
+        return True
+
+    def set_client(self, client: PooledTrelloClient):
+        self.client = client
+        self.__schedule(0)
+
+    def __len__(self):
+        return len(self.pending) + len(self.in_flight)
+
+    # Updates
+    def set_fields(self, card_id: str, **fields):
+        """
+            Queues card field changes, e.g. idList to move the card or due to change its due date
+        """
+        self.__add(card_id, dict(fields=fields, comments=[]))
+
+    def move_card(self, card_id: str, list_id: str):
+        self.set_fields(card_id, idList=list_id, pos="bottom")
+
+    def set_due(self, card_id: str, due: str):
+        """
+        :param due: ISO 8601 date, None removes the due date
+        """
+        self.set_fields(card_id, due=due if due is not None else "null")
+
+    def add_comment(self, card_id: str, text: str):
+        self.__add(card_id, dict(fields=dict(), comments=[text]))
+
+    @staticmethod
+    def __merge(update: dict, newer_update: dict) -> dict:
+        fields = dict(update["fields"])
+        fields.update(newer_update["fields"])
+        return dict(fields=fields,
+                    comments=update["comments"] + newer_update["comments"],
+                    attempts=max(update.get("attempts", 0), newer_update.get("attempts", 0)),
+                    retry_at=max(update.get("retry_at", 0), newer_update.get("retry_at", 0)))
+
+    def __add(self, card_id: str, update: dict):
+        self.pending[card_id] = self.__merge(self.pending[card_id], update) if card_id in self.pending else update
+        self.__save()
+        self.__schedule(self.flush_delay)
+
+    def __save(self):
+        if self.file_name is not None:
+            self.save_to_file(self.file_name)
+
+    def __schedule(self, delay: float):
+        if len(self.pending) and (not self.flush_timer.isActive() or
+                                  self.flush_timer.remainingTime() > delay * 1000):
+            self.flush_timer.start(int(delay * 1000))
+
+    # Sending
+    @pyqtSlot()
+    def flush(self):
+        """
+            Sends the updates of up to TRELLO_WRITE_BACK_BATCH_SIZE cards that aren't waiting for a retry
+        """
+        if self.client is None:
+            return
+
+        now = time.time()
+        due_card_ids = [card_id for card_id, update in self.pending.items()
+                        if card_id not in self.in_flight and update.get("retry_at", 0) <= now]
+        batch = {card_id: self.pending.pop(card_id) for card_id in due_card_ids[:TRELLO_WRITE_BACK_BATCH_SIZE]}
+        if len(batch):
+            self.in_flight.update(batch)
+            self.log_debug("Writing back", cards=len(batch))
+            self.pool.submit(self.__send, (self.client, batch), dict(), slot_callback=self.on_sent,
+                             error_callback=lambda error, batch=batch: self.on_sent({card_id: ([], error)
+                                                                                     for card_id in batch}),
+                             priority=TrelloRequestPriority.Low)
+
+        retry_times = [update.get("retry_at", 0) for card_id, update in self.pending.items()
+                       if card_id not in self.in_flight]
+        if len(retry_times):
+            self.__schedule(max(min(retry_times) - now, 0))
+
+    @staticmethod
+    def __send(client: PooledTrelloClient, batch: dict) -> dict:
+        """
+            Sends a batch of updates, runs on a pool thread
+        :return: Per card, the parts of the update that were sent and the error that stopped the rest
+        """
+        outcomes = dict()
+        for card_id, update in batch.items():
+            sent = []
+            try:
+                if len(update["fields"]):
+                    client.fetch_json("/cards/%s" % card_id, http_method="PUT", query_params=update["fields"])
+                    sent.append("fields")
+                if len(update["comments"]):
+                    client.fetch_json("/cards/%s/actions/comments" % card_id, http_method="POST",
+                                      query_params=dict(text="\n\n".join(update["comments"])))
+                    sent.append("comments")
+            except Exception as e:
+                outcomes[card_id] = (sent, e)
+            else:
+                outcomes[card_id] = (sent, None)
+        return outcomes
+
+    @staticmethod
+    def is_rejected(error) -> bool:
+        """
+            Whether retrying won't help, Trello answered with a client error other than 429
+        """
+        status_code = getattr(error, "_status", None) if isinstance(error, ResourceUnavailable) else None
+        return status_code is not None and 400 <= status_code < 500 and status_code != 429
+
+    def get_retry_delay(self, attempts: int) -> float:
+        return random.uniform(0.5, 1.0) * min(self.backoff_cap, self.backoff_base * 2 ** (attempts - 1))
+
+    def on_sent(self, outcomes: dict):
+        for card_id, (sent, error) in outcomes.items():
+            update = self.in_flight.pop(card_id)
+            if error is None:
+                self.card_written.emit(card_id)
+                continue
+            if self.is_rejected(error):
+                self.log_error("Trello rejected card update, dropped", card_id=card_id, update=update, error=error)
+                continue
+
+            if "fields" in sent:
+                update["fields"] = dict()
+            update["attempts"] = update.get("attempts", 0) + 1
+            update["retry_at"] = time.time() + self.get_retry_delay(update["attempts"])
+            self.log_warning("Card update failed, will retry", card_id=card_id, attempts=update["attempts"],
+                             error=error)
+            # Updates queued meanwhile are newer
+            self.pending[card_id] = self.__merge(update, self.pending[card_id]) if card_id in self.pending else update
+
+        self.__save()
+        self.flush()
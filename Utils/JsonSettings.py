@@ -0,0 +1,34 @@
+import json
+import os
+
+
+def load_json_settings(file_name) -> dict:
+    """
+        Reads a JSON object of settings
+    :return: The settings, or None if file_name is empty, can't be read or doesn't hold a JSON object
+    """
+    if file_name is None or not len(file_name):
+        return None
+    try:
+        with open(file_name) as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def save_json_settings(file_name, data: dict) -> bool:
+    """
+        Writes settings as a JSON object, creating the directory if needed
+    """
+    if file_name is None or not len(file_name):
+        return False
+    try:
+        dir_name = os.path.dirname(file_name)
+        if len(dir_name) and not os.path.exists(dir_name):
+            os.makedirs(dir_name)
+        with open(file_name, "w") as fp:
+            json.dump(data, fp)
+    except (OSError, TypeError, ValueError):
+        return False
+    return True
@@ -1,6 +1,12 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import weakref
 from enum import IntEnum, Enum
 
-from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QObject, QThread
 from termcolor import colored
 
 class LogLevel(IntEnum):
@@ -21,11 +27,110 @@ class LogColour(Enum):
     Debug       = (None,    ["dark"])
     ExtraDebug  = (None,    ["dark"])
 
+# Python logging level of each log level, ExtraDebug being below DEBUG
+LOG_LEVEL_NUMBERS = {LogLevel.Fatal: logging.CRITICAL,
+                     LogLevel.Errors: logging.ERROR,
+                     LogLevel.Warnings: logging.WARNING,
+                     LogLevel.Info: logging.INFO,
+                     LogLevel.Debug: logging.DEBUG,
+                     LogLevel.ExtraDebug: 5}
+logging.addLevelName(LOG_LEVEL_NUMBERS[LogLevel.ExtraDebug], "EXTRADEBUG")
+
+# Logger every helper logs through
+LOG_LOGGER_NAME = "Tymbox"
+
+class LogLazy(object):
+    """
+        Message argument evaluated only when the message is logged, e.g. LogLazy(lambda: expensive(x))
+    """
+    __slots__ = ("func",)
+
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self):
+        return str(self.func())
+
+    def __repr__(self):
+        return repr(self.func())
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+        Queues records for the output thread
+        Message arguments are turned into strings here, on the logging thread, as they may be live (Qt) objects;
+        colouring, layout and output are left to the output thread
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.log_args = [str(value) for value in record.log_args]
+        record.log_kwargs = [(name, repr(value)) for name, value in record.log_kwargs]
+        record.msg = " ".join(record.log_args)
+        record.args = None
+        record.exc_info = None
+        return record
+
+class LogColourFormatter(logging.Formatter):
+    """
+        Coloured text of records queued by LogQueueHandler, the object path then one line per keyword argument
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        log_colour, log_attrs = LogColour[record.log_level.name].value
+        object_name = record.log_prefix + colored(record.log_name, color="blue", attrs=["bold"])
+        kwargs = ["%s=%s" % (colored(name, color="blue", attrs=["bold"]), colored(value, color="white", attrs=[]))
+                  for name, value in record.log_kwargs]
+        if len(record.log_args):
+            indent = "".rjust(len(record.log_prefix) + len(record.log_name) + 4)
+            return "\n".join([object_name + " " + colored(record.msg, color=log_colour, attrs=log_attrs)] +
+                             [indent + kwarg for kwarg in kwargs])
+        return object_name + " : " + " ".join(kwargs)
+
+class LogPrintHandler(logging.Handler):
+    """
+        Prints to whatever sys.stdout is at the time, like the prints logging used to be
+    """
+    def emit(self, record: logging.LogRecord):
+        try:
+            print(self.format(record), flush=True)
+        except Exception:
+            self.handleError(record)
+
+def watch_log_path_name(obj: QObject) -> bool:
+    """
+        Invalidates every cached object path prefix when obj, a parent on a logged path, is renamed
+    :return: Whether obj is watched, objects of other threads can't be
+    """
+    if obj.property("logPathWatched"):
+        return True
+    if obj.thread() != QThread.currentThread():
+        return False
+    obj.setProperty("logPathWatched", True)
+    obj.objectNameChanged.connect(on_log_path_name_changed)
+    return True
+
+def on_log_path_name_changed(name: str):
+    LogHelper.path_generation += 1
+
+log_queue = queue.SimpleQueue()
+log_logger = logging.getLogger(LOG_LOGGER_NAME)
+log_logger.setLevel(1)
+log_logger.propagate = False
+log_logger.addHandler(LogQueueHandler(log_queue))
+# Started with the first message logged
+log_listener = None
+log_listener_lock = threading.Lock()
+
 class LogHelper(object):
+    # Level of every helper while set, regardless of their own
+    global_level = None
+    # Advanced when a name on a logged path changes, invalidating every cached path prefix
+    path_generation = 0
+
     def __init__(self, name=None):
         self.__level = LogLevel.ExtraDebug
         self.__name = repr(self) if name is None else name
         self.__qobject_name = False
+        self.__path_prefix = None
+        self.__path_parents = ()
+        self.__path_generation = -1
 
         if isinstance(self, QObject):
             if name is not None:
@@ -36,66 +141,125 @@ class LogHelper(object):
     def __on_qobject_name_changed(self, name: str):
         if self.__qobject_name:
             self.__name = self.objectName()
+            LogHelper.path_generation += 1
+
+    @staticmethod
+    def set_global_log_level(level: LogLevel = None):
+        """
+            Overrides the level of every helper, None restores their own
+        """
+        LogHelper.global_level = level
 
     def set_log_level(self, level: LogLevel):
         self.__level = level
 
     def get_log_level(self):
-        return self.__level
+        return self.__level if LogHelper.global_level is None else LogHelper.global_level
+
+    def is_log_enabled(self, level: LogLevel) -> bool:
+        """
+            Cheap check to guard building costly message arguments with
+        """
+        return (self.__level if LogHelper.global_level is None else LogHelper.global_level) >= level
+
+    @staticmethod
+    def start_log_output():
+        """
+            Starts the thread messages are output on, unless it's running
+        """
+        global log_listener
+        with log_listener_lock:
+            if log_listener is not None:
+                return
+            print_handler = LogPrintHandler()
+            print_handler.setFormatter(LogColourFormatter())
+            log_listener = logging.handlers.QueueListener(log_queue, print_handler)
+            log_listener.start()
+            atexit.register(log_listener.stop)
+
+    @staticmethod
+    def flush_log_output():
+        """
+            Waits for the messages logged so far to be output
+        """
+        with log_listener_lock:
+            if log_listener is not None:
+                log_listener.stop()
+                log_listener.start()
 
     def set_log_name(self, name: str):
         self.__name = name
         self.__qobject_name = False
+        # Part of the path of its children
+        LogHelper.path_generation += 1
 
     def log_fatal(self, *args, **kwargs):
-        self.log_msg(LogLevel.Fatal, *args, **kwargs)
+        if self.is_log_enabled(LogLevel.Fatal):
+            self.log_msg(LogLevel.Fatal, *args, **kwargs)
 
     def log_error(self, *args, **kwargs):
-        self.log_msg(LogLevel.Errors, *args, **kwargs)
+        if self.is_log_enabled(LogLevel.Errors):
+            self.log_msg(LogLevel.Errors, *args, **kwargs)
 
     def log_warning(self, *args, **kwargs):
-        self.log_msg(LogLevel.Warnings, *args, **kwargs)
+        if self.is_log_enabled(LogLevel.Warnings):
+            self.log_msg(LogLevel.Warnings, *args, **kwargs)
 
     def log_info(self, *args, **kwargs):
-        self.log_msg(LogLevel.Info, *args, **kwargs)
+        if self.is_log_enabled(LogLevel.Info):
+            self.log_msg(LogLevel.Info, *args, **kwargs)
 
     def log_debug(self, *args, **kwargs):
-        self.log_msg(LogLevel.Debug, *args, **kwargs)
+        if self.is_log_enabled(LogLevel.Debug):
+            self.log_msg(LogLevel.Debug, *args, **kwargs)
 
     def log_extra_debug(self, *args, **kwargs):
-        self.log_msg(LogLevel.ExtraDebug, *args, **kwargs)
+        if self.is_log_enabled(LogLevel.ExtraDebug):
+            self.log_msg(LogLevel.ExtraDebug, *args, **kwargs)
 
     def get_qobject_path_prefix(self):
-        if isinstance(self, QObject):
-            object_path = []
-            parent = self.parent() # type: QObject
-            while parent is not None:
-                if isinstance(parent, LogHelper):
-                    object_path.insert(0, parent.__name)
-                else:
-                    object_path.insert(0, parent.objectName())
-                parent = parent.parent()
-
-            if len(object_path) > 0:
-                return ":".join(object_path) + ":"
-        return ""
+        """
+            Names of the QObject's parents, cached until an object on the path is renamed or reparented
+            Reparenting is caught by comparing the parents with those the prefix was built from
+        """
+        if not isinstance(self, QObject):
+            return ""
+        parents = []
+        parent = self.parent() # type: QObject
+        while parent is not None:
+            parents.append(parent)
+            parent = parent.parent()
+        if self.__path_generation == LogHelper.path_generation and len(parents) == len(self.__path_parents) and \
+                all(parent is path_parent() for parent, path_parent in zip(parents, self.__path_parents)):
+            return self.__path_prefix
+
+        object_path = []
+        cacheable = True
+        for parent in reversed(parents):
+            if isinstance(parent, LogHelper):
+                # Renames of helpers advance the generation themselves
+                object_path.append(parent.__name)
+            else:
+                cacheable = watch_log_path_name(parent) and cacheable
+                object_path.append(parent.objectName())
+
+        prefix = ":".join(object_path) + ":" if len(object_path) > 0 else ""
+        if cacheable:
+            self.__path_prefix = prefix
+            # Weakly, the cache mustn't keep the parents alive
+            self.__path_parents = tuple(weakref.ref(parent) for parent in parents)
+            self.__path_generation = LogHelper.path_generation
+        return prefix
 
     def log_msg(self, level: LogLevel, *args, **kwargs):
-        # TODO integrate with python logging
-        if self.__level >= level:
-            log_colour, log_attrs = LogColour.__dict__["_member_map_"][level.name].value
-            object_prefix = self.get_qobject_path_prefix()
-            name_length = len(object_prefix) + len(self.__name) + 4
-            object_name = object_prefix + colored(self.__name, color="blue", attrs=["bold"])
-            if len(args):
-                str_args = [str(v) for v in args]
-                print(object_name, colored(" ".join(str_args), color=log_colour, attrs=log_attrs))
-                if len(kwargs):
-                    print("".join([ "%s%s=%s\n" % ("".rjust(name_length),
-                                                    colored(name, color="blue", attrs=["bold"]),
-                                                    colored(repr(value), color="white", attrs=[]))
-                                    for name, value in kwargs.items()]))
-            elif len(kwargs):
-                print(object_name, ":", " ".join(["%s=%s\n" % (colored(name, color="blue", attrs=["bold"]),
-                                                               colored(repr(value), color="white", attrs=[]))
-                                                  for name, value in kwargs.items()]))
+        """
+            Queues the message for the output thread, through the Tymbox logger
+        """
+        if self.is_log_enabled(level):
+            if log_listener is None:
+                LogHelper.start_log_output()
+            log_logger.log(LOG_LEVEL_NUMBERS[level], "", extra=dict(log_level=level,
+                                                                    log_name=self.__name,
+                                                                    log_prefix=self.get_qobject_path_prefix(),
+                                                                    log_args=args,
+                                                                    log_kwargs=list(kwargs.items())))
@@ -1,15 +1,25 @@
-from PyQt5.QtCore import QModelIndex, Qt, QSize, QPoint
+from PyQt5.QtCore import QModelIndex, Qt, QSize, QPoint, QRect
 from PyQt5.QtGui import QPainter, QPalette, QColor, QCursor
 from PyQt5.QtWidgets import QStyledItemDelegate, QStyleOptionViewItem, QWidget
 
 from Models.Trello.TrelloCardsModel import TrelloCardsModelColumns
+from Trello.TrelloBoardDirectory import TrelloBoardDirectory
+
+
+# Colours of Trello's named label colours, labels without a colour are grey
+TRELLO_LABEL_COLORS = dict(green="#61bd4f", yellow="#f2d600", orange="#ff9f1a", red="#eb5a46", purple="#c377e0",
+                           blue="#0079bf", sky="#00c2e0", lime="#51e898", pink="#ff78cb", black="#344563")
+TRELLO_LABEL_NO_COLOR = "#b3bac5"
 
 
 class TrelloCardItemDelegate(QStyledItemDelegate):
 
-    def __init__(self, parent: QWidget=None):
+    def __init__(self, parent: QWidget=None, board_directory: TrelloBoardDirectory=None):
         QStyledItemDelegate.__init__(self, parent)
         self.mouse_over = False
+        self.board_directory = board_directory if board_directory is not None else TrelloBoardDirectory.shared()
+        if parent is not None:
+            self.board_directory.board_updated.connect(lambda board_id: parent.viewport().update())
 
     def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
         painter.setRenderHint(QPainter.Antialiasing, True)
@@ -74,6 +84,44 @@ class TrelloCardItemDelegate(QStyledItemDelegate):
                          Qt.AlignLeft | Qt.AlignTop,
                          data)
 
+        self.paint_labels_and_members(painter, option, index)
+
+    def paint_labels_and_members(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        """
+            Label colours along the bottom left, member initials along the bottom right, both resolved through the
+            board directory
+        """
+        model = index.model()
+        board_id = model.data(index.sibling(index.row(), TrelloCardsModelColumns.idBoard), Qt.DisplayRole)
+        label_ids = model.data(index.sibling(index.row(), TrelloCardsModelColumns.idLabels), Qt.DisplayRole)
+        member_ids = model.data(index.sibling(index.row(), TrelloCardsModelColumns.idMembers), Qt.DisplayRole)
+        bottom = option.rect.y() + option.rect.height() - 8
+
+        painter.setPen(Qt.NoPen)
+        x = option.rect.x() + 5
+        for label_id in label_ids or ():
+            label = self.board_directory.get_label(board_id, label_id)
+            if label is not None:
+                painter.setBrush(QColor(TRELLO_LABEL_COLORS.get(label.color, TRELLO_LABEL_NO_COLOR)))
+                painter.drawRoundedRect(x, bottom - 8, 24, 6, 3, 3)
+                x += 28
+
+        font = painter.font()
+        font.setPixelSize(8)
+        font.setBold(True)
+        painter.setFont(font)
+        x = option.rect.x() + option.rect.width() - 10
+        for member_id in member_ids or ():
+            member = self.board_directory.get_member(board_id, member_id)
+            if member is not None:
+                x -= 16
+                member_rect = QRect(x, bottom - 14, 14, 14)
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(option.palette.color(QPalette.Mid))
+                painter.drawEllipse(member_rect)
+                painter.setPen(option.palette.color(QPalette.BrightText))
+                painter.drawText(member_rect, Qt.AlignCenter, member.initials or member.username[:1].upper())
+
     def sizeHint(self, QStyleOptionViewItem, QModelIndex):
         return QSize(200, 64)
 
@@ -1,3 +1,4 @@
+import datetime
 import json
 
 import os
@@ -6,16 +7,27 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtCore import pyqtSlot, qDebug
 from PyQt5.QtWidgets import QMainWindow, QWidget, QDialog, QMessageBox, QFileDialog
 
-from Models.Tymbox.TymboxModel import TymboxTask
+import trello
+from Models.ExtendableSortFilterProxyModel import ExtendableSortFilterProxyModel
+from Models.Tymbox.TymboxModel import TymboxTask, TymboxTrelloTask
 from Trello.AsyncTrelloClient import AsyncTrelloClient, AsyncTrelloWrapper
+from Trello.TrelloActionSync import TrelloActionSync
+from Trello.TrelloBoardDirectory import TrelloBoardDirectory
+from Trello.TrelloCache import TrelloCache
+from Trello.TrelloPrefetcher import TrelloPrefetcher
 from Trello.TrelloConfig import TrelloConfig
+from Trello.TrelloOAuth import TrelloOAuth
+from Trello.TrelloWriteBack import TrelloWriteBack
 from Utils.LogHelper import LogLevel
 from Models.Tymbox.SequentialTymboxModel import SequentialTymboxModel
+from Models.ThrottledProxyModel import ThrottledProxyModel
+from Models.Trello.TrelloBacklogModel import TrelloBacklogModel
 from Models.Trello.TrelloBoardsModel import TrelloBoardsModel
 from Utils.TymboxAssistant import TymboxAssistant
 from Views.Trello.TrelloCardItemDelegate import TrelloCardItemDelegate
-from Models.Trello.TrelloCardsModel import TrelloCardsModel
+from Models.Trello.TrelloCardsModel import TrelloCardsModel, TrelloCardsModelColumns
 from Models.Trello.TrelloListsModel import TrelloListsModel
+from Models.Trello.TrelloSearchModel import TrelloSearchModel
 from Views.Tymbox.TymboxTimeline import TymboxTimeline
 from Views.Generated.TymBox import Ui_MainWindow
 from Views.Generated.DebugTableView import Ui_DebugTableWindow
@@ -37,10 +49,18 @@ class MainWindow(QMainWindow):
         self.cards_model = TrelloCardsModel(self)
         self.cards_model.setObjectName("CardsModel")
 
+        self.search_model = TrelloSearchModel(self)
+        self.search_model.setObjectName("SearchModel")
+
+        self.backlog_model = TrelloBacklogModel(self)
+        self.backlog_model.setObjectName("BacklogModel")
+        self.backlog_proxy = ExtendableSortFilterProxyModel(self)
+        self.backlog_proxy.setSourceModel(self.backlog_model)
+
         self.tymbox_model = SequentialTymboxModel()
         self.tymbox_model.setObjectName("TymboxModel")
         self.tymbox_model.set_cards_model(self.cards_model)
-        self.tymbox_model.set_log_level(LogLevel.ExtraDebug)
+        self.tymbox_model.set_log_level(LogLevel.Info)
 
         self.tymbox_assistant = TymboxAssistant(self, self.tymbox_model)
         self.tymbox_assistant.setObjectName("TymboxAssistant")
@@ -48,6 +68,9 @@ class MainWindow(QMainWindow):
 
         self.tray_icon = TymboxTrayIcon(self, self.tymbox_assistant)
 
+        self.trello_oauth = TrelloOAuth(parent=self)
+        self.trello_oauth.setObjectName("TrelloOAuth")
+
         self.tymbox_timeline = None
 
         self.setup_ui()
@@ -55,7 +78,10 @@ class MainWindow(QMainWindow):
         self.debug_table_view = QDialog(self)
         self.debug_table_view_ui = Ui_DebugTableWindow()
         self.debug_table_view_ui.setupUi(self.debug_table_view)
-        self.debug_table_view_ui.debugTableView.setModel(self.tymbox_model)
+        self.debug_table_model = ThrottledProxyModel(self)
+        self.debug_table_model.setObjectName("DebugTableModel")
+        self.debug_table_model.setSourceModel(self.tymbox_model)
+        self.debug_table_view_ui.debugTableView.setModel(self.debug_table_model)
         self.debug_table_view.show()
 
         self.trello_client.config_updated.connect(self.request_boards)
@@ -76,12 +102,42 @@ class MainWindow(QMainWindow):
 
         self.show()
 
-        self.trello_config = None
-
         self.app_dir_name = os.path.join(os.getenv('LOCALAPPDATA'), "Tymbox")
         self.model_file_name = os.path.join(self.app_dir_name , "model.json")
         self.trello_config_file = os.path.join(self.app_dir_name, "trello.json")
 
+        self.trello_cache = TrelloCache(os.path.join(self.app_dir_name, "TrelloCache"))
+        self.boards_model.set_cache(self.trello_cache)
+        self.lists_model.set_cache(self.trello_cache)
+        self.cards_model.set_cache(self.trello_cache)
+        # Boards not opened yet this session are searched through their cached cards
+        self.search_model.card_index.add_cached_cards(self.trello_cache.load_all_cards())
+
+        self.prefetch_file_name = os.path.join(self.app_dir_name, "prefetch.json")
+        self.trello_prefetcher = TrelloPrefetcher(self.trello_cache, parent=self)
+        self.trello_prefetcher.load_from_file(self.prefetch_file_name)
+        self.boards_model.set_prefetcher(self.trello_prefetcher)
+        self.lists_model.set_prefetcher(self.trello_prefetcher)
+        self.cards_model.set_prefetcher(self.trello_prefetcher)
+        # Reopen the last used board and list once they're known
+        self.restore_board_id = self.trello_prefetcher.last_board_id
+        self.restore_list_id = self.trello_prefetcher.last_list_id
+
+        self.sync_file_name = os.path.join(self.app_dir_name, "sync.json")
+        self.trello_action_sync = TrelloActionSync(parent=self)
+        self.trello_action_sync.load_from_file(self.sync_file_name)
+        self.cards_model.set_action_sync(self.trello_action_sync)
+        self.board_directory = TrelloBoardDirectory.shared()
+        self.board_directory.set_action_sync(self.trello_action_sync)
+        self.board_directory.board_updated.connect(self.update_backlog_labels)
+
+        self.backlog_file_name = os.path.join(self.app_dir_name, "backlog.json")
+        self.backlog_model.load_from_file(self.backlog_file_name)
+        self.backlog_model.set_action_sync(self.trello_action_sync)
+
+        self.trello_write_back = TrelloWriteBack(os.path.join(self.app_dir_name, "write_back.json"), parent=self)
+        self.trello_client.config_updated.connect(self.on_trello_config_updated)
+        self.tymbox_model.task_about_to_be_removed.connect(self.on_task_about_to_be_removed)
 
         if self.import_model_from_file(self.model_file_name):
             print("Loaded from %s" % self.model_file_name)
@@ -102,6 +158,10 @@ class MainWindow(QMainWindow):
             print("Saved to %s" % self.model_file_name)
         else:
             print("Failed to save to %s" % self.model_file_name)
+        self.trello_prefetcher.save_to_file(self.prefetch_file_name)
+        self.trello_action_sync.save_to_file(self.sync_file_name)
+        self.backlog_model.save_to_file(self.backlog_file_name)
+        self.trello_cache.flush()
 
     def retranslate_ui(self):
         self.ui.retranslateUi(self)
@@ -118,6 +178,9 @@ class MainWindow(QMainWindow):
         self.ui.list_trello_cards.setModel(self.cards_model)
         self.ui.list_trello_cards.setItemDelegate(TrelloCardItemDelegate(self.ui.list_trello_cards))
 
+        self.ui.list_backlog_cards.setModel(self.backlog_proxy)
+        self.ui.list_backlog_cards.setItemDelegate(TrelloCardItemDelegate(self.ui.list_backlog_cards))
+
         self.tymbox_timeline = TymboxTimeline(self.tymbox_timeline, self.tymbox_model)
         self.ui.tymbox_view.setWidget(self.tymbox_timeline)
 
@@ -130,14 +193,12 @@ class MainWindow(QMainWindow):
         self.ui.assistantView.set_assistant(self.tymbox_assistant)
 
     def request_boards(self):
-        self.ui.cmb_boards.clear()
         self.ui.cmb_boards.setEditable(True)
         self.ui.cmb_boards.setEnabled(False)
         self.ui.cmb_boards.setEditText("Fetching boards...")
         self.boards_model.request_boards()
 
     def request_lists(self):
-        self.ui.cmb_lists.clear()
         self.ui.cmb_lists.setEditable(True)
         self.ui.cmb_lists.setEnabled(False)
         self.ui.cmb_lists.setEditText("Fetching lists...")
@@ -145,11 +206,35 @@ class MainWindow(QMainWindow):
         selected_board_index = self.ui.cmb_boards.currentIndex()
         trello_board = self.boards_model.get_board(selected_board_index);
         self.lists_model.set_board(trello_board)
+        self.trello_action_sync.set_board(trello_board)
+        self.trello_action_sync.sync(trello_board)
+        self.board_directory.request_board(trello_board)
+
+    @pyqtSlot()
+    def on_trello_config_updated(self):
+        self.trello_write_back.set_client(self.trello_client.client)
+        self.backlog_model.set_client(self.trello_client.client)
+        self.search_model.set_client(self.trello_client.client)
+
+    def write_back_time_spent(self, task: TymboxTask, end_time: float):
+        if isinstance(task, TymboxTrelloTask) and len(task.card_id):
+            minutes = int(round((end_time - task.start_time) / 60))
+            self.trello_write_back.add_comment(task.card_id, "Spent %i minutes on this card in Tymbox" % minutes)
 
     @pyqtSlot(TymboxTask, name="on_TymboxAssistant_taskEnded")
     def on_task_ended(self, task: TymboxTask):
+        self.write_back_time_spent(task, task.end_time)
         QMessageBox.information(self, "Time's up!", "Current task has ended")
 
+    @pyqtSlot(TymboxTask)
+    def on_task_about_to_be_removed(self, task: TymboxTask):
+        """
+            Records the time spent on a task the user removed while in progress
+        """
+        current_time = datetime.datetime.today().timestamp()
+        if task.start_time <= current_time < task.end_time:
+            self.write_back_time_spent(task, current_time)
+
     @pyqtSlot(name="on_btnInsertTask_released")
     def on_show_insert_task(self):
         self.ui.btnAddTask.setText("Insert")
@@ -190,26 +275,54 @@ class MainWindow(QMainWindow):
     def on_back_to_tasks(self):
         self.ui.stackedWidget.setCurrentIndex(0)
 
-    @pyqtSlot(name="on_BoardsModel_modelReset")
-    def on_board_model_reset(self):
+    @pyqtSlot(name="on_BoardsModel_updateApplied")
+    def on_board_model_updated(self):
         self.ui.cmb_boards.setEditable(False)
         self.ui.cmb_boards.setEnabled(True)
 
-    @pyqtSlot(name="on_ListsModel_modelReset")
-    def on_lists_model_reset(self):
+        if self.restore_board_id is not None:
+            row = self.boards_model.get_board_row(self.restore_board_id)
+            self.restore_board_id = None
+            if row >= 0:
+                self.ui.cmb_boards.setCurrentIndex(row)
+                self.request_lists()
+
+    @pyqtSlot(name="on_ListsModel_updateApplied")
+    def on_lists_model_updated(self):
         self.ui.cmb_lists.setEditable(False)
         self.ui.cmb_lists.setEnabled(True)
 
+        if self.restore_list_id is not None:
+            row = self.lists_model.get_list_row(self.restore_list_id)
+            self.restore_list_id = None
+            if row >= 0:
+                self.ui.cmb_lists.setCurrentIndex(row)
+                self.cards_model.set_list(AsyncTrelloWrapper(self.lists_model.get_list(row)))
+
     @pyqtSlot(str, name="on_cmb_boards_activated")
     def on_board_selected(self, board_name):
         print("Selected board %s" % board_name)
+        self.restore_list_id = None
+        self.trello_prefetcher.remember_selection(self.boards_model.get_board(self.ui.cmb_boards.currentIndex()).id)
         self.request_lists()
 
     @pyqtSlot(str, name="on_cmb_lists_activated")
     def on_list_selected(self, list_name):
-        self.cards_model.set_list(AsyncTrelloWrapper(self.lists_model.get_list(self.ui.cmb_lists.currentIndex())))
+        trello_list = self.lists_model.get_list(self.ui.cmb_lists.currentIndex())
+        self.trello_prefetcher.remember_selection(trello_list.board.id, trello_list.id)
+        self.cards_model.set_list(AsyncTrelloWrapper(trello_list))
         print("Selected list %s" % list_name)
 
+    @pyqtSlot(str, name="on_edit_trello_search_textChanged")
+    def on_trello_search_changed(self, query):
+        """
+            Lists the cards of every fetched board matching the query instead of the selected list's cards
+        """
+        self.search_model.set_query(query)
+        model = self.search_model if len(query.strip()) else self.cards_model
+        if self.ui.list_trello_cards.model() is not model:
+            self.ui.list_trello_cards.setModel(model)
+
     @pyqtSlot(name="on_btnImport_released")
     def on_import_tasks(self):
         file_name = QFileDialog.getOpenFileName(self, "Import tasks")[0]
@@ -251,20 +364,90 @@ class MainWindow(QMainWindow):
 
     @pyqtSlot(name="on_btn_request_trello_auth_released")
     def on_request_trello_auth(self):
-        self.trello_config = TrelloConfig()
-        url = self.trello_config.request_oauth(self.ui.edit_trello_key.text(), self.ui.edit_trello_secret.text())
+        self.trello_oauth.request(self.ui.edit_trello_key.text(), self.ui.edit_trello_secret.text())
 
+    @pyqtSlot(str, name="on_edit_trello_verifier_textEdited")
+    def on_trello_verifier_edited(self, value):
+        self.trello_oauth.set_verifier(value)
+
+    @pyqtSlot(str, name="on_TrelloOAuth_authorizeUrlReady")
+    def on_trello_authorize_url_ready(self, url):
         import webbrowser
         webbrowser.open(url)
 
-    @pyqtSlot(str, name="on_edit_trello_verifier_textEdited")
-    def on_trello_verifier_edited(self, value):
-        if self.trello_config:
-            if self.trello_config.complete_oauth(value):
-                self.trello_client.setup_from_config(self.trello_config)
-                self.trello_config.save_to_file(self.trello_config_file)
-                self.trello_config = None
-                QMessageBox.information(self, "Success", "Trello authenticated")
-                self.ui.trello_stack.setCurrentIndex(0)
-            else:
-                QMessageBox.information(self, "Failed", "Trello PIN didn't seem to work...")
\ No newline at end of file
+    @pyqtSlot(TrelloConfig, name="on_TrelloOAuth_authorized")
+    def on_trello_authorized(self, trello_config: TrelloConfig):
+        self.trello_client.setup_from_config(trello_config)
+        trello_config.save_to_file(self.trello_config_file)
+        QMessageBox.information(self, "Success", "Trello authenticated")
+        self.ui.trello_stack.setCurrentIndex(0)
+
+    @pyqtSlot(str, name="on_TrelloOAuth_failed")
+    def on_trello_auth_failed(self, message):
+        QMessageBox.information(self, "Failed", message)
+
+    @pyqtSlot(name="on_btn_backlog_add_board_released")
+    def on_backlog_add_board(self):
+        selected_board_index = self.ui.cmb_boards.currentIndex()
+        if selected_board_index >= 0:
+            self.backlog_model.add_board(self.boards_model.get_board(selected_board_index).id)
+
+    @pyqtSlot(name="on_btn_backlog_add_list_released")
+    def on_backlog_add_list(self):
+        selected_list_index = self.ui.cmb_lists.currentIndex()
+        if selected_list_index >= 0:
+            self.backlog_model.add_list(self.lists_model.get_list(selected_list_index).id)
+
+    @pyqtSlot(name="on_btn_backlog_clear_released")
+    def on_backlog_clear(self):
+        for board_id in list(self.backlog_model.settings["board_ids"]):
+            self.backlog_model.remove_board(board_id)
+        for list_id in list(self.backlog_model.settings["list_ids"]):
+            self.backlog_model.remove_list(list_id)
+
+    @pyqtSlot(name="on_BacklogModel_updateApplied")
+    def on_backlog_model_updated(self):
+        client = self.backlog_model.get_client()
+        if client is not None:
+            for board_id in self.backlog_model.get_board_ids():
+                self.board_directory.request_board(trello.Board(client, board_id))
+
+    @pyqtSlot(int, name="on_cmb_backlog_due_activated")
+    def on_backlog_due_selected(self, index):
+        """
+            Any time, overdue, due today or due this week
+        """
+        now = datetime.datetime.now().astimezone()
+        end_of_today = now.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+        bounds = [None, now, end_of_today, end_of_today + datetime.timedelta(days=6 - now.weekday())]
+        bound = bounds[index] if 0 <= index < len(bounds) else None
+        self.backlog_proxy.set_column_filter(TrelloCardsModelColumns.due,
+                                             TrelloBacklogModel.due_before(bound) if bound is not None else None)
+
+    @pyqtSlot(int, name="on_cmb_backlog_label_activated")
+    def on_backlog_label_selected(self, index):
+        """
+            Labels are picked by name, so a label shared by name across the backlog's boards matches on all of them
+        """
+        if index <= 0:
+            self.backlog_proxy.set_column_filter(TrelloCardsModelColumns.idLabels, None)
+            return
+        label_name = self.ui.cmb_backlog_label.itemText(index)
+        label_ids = [label.id for board_id in self.backlog_model.get_board_ids()
+                     for label in self.board_directory.labels.get(board_id, dict()).values()
+                     if label.name == label_name]
+        self.backlog_proxy.set_column_filter(TrelloCardsModelColumns.idLabels,
+                                             TrelloBacklogModel.has_labels(label_ids))
+
+    @pyqtSlot(str)
+    def update_backlog_labels(self, board_id: str):
+        if board_id not in self.backlog_model.get_board_ids():
+            return
+        label_names = sorted({label.name for board_id in self.backlog_model.get_board_ids()
+                              for label in self.board_directory.labels.get(board_id, dict()).values()
+                              if len(label.name)})
+        current_name = self.ui.cmb_backlog_label.currentText()
+        self.ui.cmb_backlog_label.clear()
+        self.ui.cmb_backlog_label.addItem("Any label")
+        self.ui.cmb_backlog_label.addItems(label_names)
+        self.ui.cmb_backlog_label.setCurrentIndex(max(self.ui.cmb_backlog_label.findText(current_name), 0))
@@ -5,7 +5,7 @@ from PyQt5.QtWidgets import QWidget, QDataWidgetMapper, QApplication
 
 from Models.Tymbox.SequentialTymboxModel import SequentialTymboxModel
 from Models.Tymbox.TymboxModel import TymboxModelColumns
-from Utils.LogHelper import LogHelper, LogLevel
+from Utils.LogHelper import LogHelper, LogLevel, LogLazy
 from Views.Generated.TymBoxTaskView import Ui_TymboxTaskView
 
 class DragHelper(LogHelper):
@@ -65,7 +65,8 @@ class DragHelper(LogHelper):
                 self.end_drag()
 
         elif drag_pos.contains(mouse_pos):
-            self.log_extra_debug(widget=self.widget, widgetAt=QApplication.widgetAt(event.globalPos()))
+            self.log_extra_debug(widget=self.widget,
+                                 widgetAt=LogLazy(lambda: QApplication.widgetAt(event.globalPos())))
             if not self.is_over:
                 if not left_mouse_down and QApplication.widgetAt(event.globalPos()) == self.widget:
                     self.prepare_drag()
@@ -168,7 +169,8 @@ class TymboxTaskView(QWidget, LogHelper):
         self.move(x_pos, y_pos)
         self.resize(width, height)
 
-        self.log_debug("Repositioned", x=x_pos, y=y_pos, width=width, height=height)
+        if self.is_log_enabled(LogLevel.Debug):
+            self.log_debug("Repositioned", x=x_pos, y=y_pos, width=width, height=height)
 
 
     @pyqtSlot(QModelIndex, int, int)
@@ -191,7 +193,7 @@ class TymboxTaskView(QWidget, LogHelper):
     @pyqtSlot(name="on_btnRemove_released")
     def removeTask(self):
         self.log_debug("Remove requested")
-        self.model.removeRow(self.data_mapper.currentIndex())
+        self.model.remove_task(self.data_mapper.currentIndex())
 
     def handle_start_time_drag(self, drag_distance: int) -> bool:
 
@@ -203,14 +205,15 @@ class TymboxTaskView(QWidget, LogHelper):
         rounded_start_time = math.ceil(new_start_time/60 / 15) * 15*60 if start_time_delta < 0 else math.floor( new_start_time/60 / 15) * 15*60
         rounded_start_time_delta = int( rounded_start_time - start_time )
 
-        self.log_extra_debug("Start time mouse drag",
-                             pixel_distance=drag_distance,
-                             minutes_dragged=minutes_dragged,
-                             current_start_time=start_time,
-                             new_start_time=new_start_time,
-                             start_time_delta=start_time_delta,
-                             rounded_start_time=rounded_start_time,
-                             rounded_duration_delta=rounded_start_time_delta)
+        if self.is_log_enabled(LogLevel.ExtraDebug):
+            self.log_extra_debug("Start time mouse drag",
+                                 pixel_distance=drag_distance,
+                                 minutes_dragged=minutes_dragged,
+                                 current_start_time=start_time,
+                                 new_start_time=new_start_time,
+                                 start_time_delta=start_time_delta,
+                                 rounded_start_time=rounded_start_time,
+                                 rounded_duration_delta=rounded_start_time_delta)
 
         if abs(rounded_start_time_delta) >= 15:
             # Drag in 15 minute increments
@@ -233,14 +236,15 @@ class TymboxTaskView(QWidget, LogHelper):
             new_duration_m / 15) * 15
         rounded_duration_delta = rounded_duration - duration_m
 
-        self.log_extra_debug("Duration mouse drag",
-                             pixel_distance=drag_distance,
-                             minutes_dragged=minutes_dragged,
-                             current_duration=duration_m,
-                             new_duration=new_duration_m,
-                             duration_delta=duration_delta,
-                             rounded_duration=rounded_duration,
-                             rounded_duration_delta=rounded_duration_delta)
+        if self.is_log_enabled(LogLevel.ExtraDebug):
+            self.log_extra_debug("Duration mouse drag",
+                                 pixel_distance=drag_distance,
+                                 minutes_dragged=minutes_dragged,
+                                 current_duration=duration_m,
+                                 new_duration=new_duration_m,
+                                 duration_delta=duration_delta,
+                                 rounded_duration=rounded_duration,
+                                 rounded_duration_delta=rounded_duration_delta)
 
         if new_duration_m >=15 and abs(rounded_duration_delta) >= 15:
             # Drag in 15 minute increments
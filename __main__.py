@@ -4,8 +4,10 @@ from qtpy import QtCore
 from Trello.AsyncTrelloClient import AsyncTrelloClient
 from Views.Tymbox.MainWindow import MainWindow
 from Trello.TrelloConfig import TrelloConfig
+from Utils.LogHelper import LogHelper, LogLevel
 from PyQt5.QtWidgets import QApplication
 import pyqttango
+import os
 import sys
 import ctypes
 import colorama
@@ -28,6 +30,11 @@ def qt_message_handler(mode, context, message):
 QtCore.qInstallMessageHandler(qt_message_handler)
 
 def main():
+    # e.g. TYMBOX_LOG_LEVEL=Debug, overriding the level of every object
+    log_level = os.getenv("TYMBOX_LOG_LEVEL")
+    if log_level in LogLevel.__members__:
+        LogHelper.set_global_log_level(LogLevel[log_level])
+
     # Doesn't play well with pycharm console
     # colorama.init()
     app = QApplication(sys.argv)